@@ -0,0 +1,60 @@
+"""
+Накладные расходы зависимости get_current_principal на один запрос:
+разбор и проверка подписи access токена на каждом запросе и ответ
+из DecodedTokenCache. Проверка отзыва (фильтр Блума) выполняется
+в обоих случаях; для неотозванного токена Redis не нужен.
+
+Запуск:
+    python -m bench.auth_dependency --iterations 20000
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+os.environ.setdefault('POSTGRES_DB_PORT', '5432')
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from models.users import User
+from services.auth import access_token_claims, create_access_token, get_current_principal
+from services.token_cache import decoded_token_cache
+from services.token_keys import token_keyring
+
+
+async def measure(token: str, iterations: int) -> float:
+    """
+    Среднее время одного вызова зависимости в микросекундах
+    """
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await get_current_principal(token)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    user = User(id=uuid.uuid4(), is_admin=False, email_verified=True, token_version=0)
+    token = create_access_token(access_token_claims(user, family=str(uuid.uuid4())))
+
+    cache_size = decoded_token_cache.max_size
+    decoded_token_cache.max_size = 0
+    decoded_token_cache.clear()
+    uncached = await measure(token, args.iterations)
+
+    decoded_token_cache.max_size = cache_size or 1
+    await get_current_principal(token)
+    cached = await measure(token, args.iterations)
+
+    print(f"algorithm={token_keyring.algorithm}, iterations={args.iterations}")
+    print(f"{'mode':<10}{'us/request':>12}")
+    print(f"{'uncached':<10}{uncached:>12.1f}")
+    print(f"{'cached':<10}{cached:>12.1f}")
+    print(f"speedup: {uncached / cached:.1f}x")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+"""
+Задержка входа под параллельной нагрузкой: проверка bcrypt прямо в event
+loop (как было) и через PasswordHashPool.
+
+Каждый «вход» — одна проверка пароля. Параллельно работает проба,
+которая каждые 10 мс засыпает и меряет, насколько позже просыпается:
+так видно, сколько ждут остальные запросы воркера.
+
+Запуск:
+    python -m bench.password_hashing --concurrency 16 --requests 128
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault('POSTGRES_DB_PORT', '5432')
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from fastapi import HTTPException
+
+from services.users import PasswordHashPool, get_password_hash, verify_password_or_dummy
+
+
+PROBE_INTERVAL = 0.01
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+async def probe(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - started - PROBE_INTERVAL)
+
+
+async def run_mode(mode: str, password_hash: str, concurrency: int, requests: int,
+                   workers: int, max_queue: int) -> dict:
+    pool = PasswordHashPool(workers=workers, max_queue=max_queue)
+    if mode == 'pool':
+        # Процессы запускаются до замера
+        await asyncio.gather(*(pool.run(verify_password_or_dummy, 'password', password_hash)
+                               for _ in range(workers)))
+
+    latencies, lags = [], []
+    rejected = 0
+    queue = iter(range(requests))
+    stop = asyncio.Event()
+
+    async def login():
+        nonlocal rejected
+        for _ in queue:
+            started = time.perf_counter()
+            try:
+                if mode == 'pool':
+                    await pool.run(verify_password_or_dummy, 'password', password_hash)
+                else:
+                    verify_password_or_dummy('password', password_hash)
+                    await asyncio.sleep(0)
+            except HTTPException:
+                rejected += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    probe_task = asyncio.create_task(probe(lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+    pool.shutdown()
+
+    return {
+        'mode': mode,
+        'ok': len(latencies),
+        'rejected': rejected,
+        'rps': len(latencies) / elapsed,
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+        'loop_lag_p99': percentile(lags, 99),
+        'loop_lag_max': max(lags, default=0.0),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=128)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--max-queue', type=int, default=32)
+    parser.add_argument('--modes', default='inline,pool')
+    args = parser.parse_args()
+
+    password_hash = get_password_hash('password')
+    print(f"bcrypt: {password_hash[:7]}, concurrency={args.concurrency}, requests={args.requests}, "
+          f"workers={args.workers}, max_queue={args.max_queue}")
+    print(f"{'mode':<8}{'ok':>6}{'503':>6}{'rps':>8}{'p50 ms':>10}{'p99 ms':>10}{'lag p99 ms':>12}{'lag max ms':>12}")
+    for mode in args.modes.split(','):
+        result = await run_mode(mode, password_hash, args.concurrency, args.requests, args.workers, args.max_queue)
+        print(f"{result['mode']:<8}{result['ok']:>6}{result['rejected']:>6}{result['rps']:>8.1f}"
+              f"{result['p50'] * 1000:>10.1f}{result['p99'] * 1000:>10.1f}"
+              f"{result['loop_lag_p99'] * 1000:>12.1f}{result['loop_lag_max'] * 1000:>12.1f}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+Стоимость подписи и проверки токенов для каждого алгоритма TokenKeyring:
+HS256 (общий секрет) и асимметричных ES256 и RS256. Ключи создаются
+во временном каталоге при запуске.
+
+Запуск:
+    python -m bench.token_signing --iterations 2000
+"""
+import argparse
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+os.environ.setdefault('POSTGRES_DB_PORT', '5432')
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+from services.token_keys import PRIVATE_KEY_SUFFIX, TokenKeyring
+
+
+KID = 'bench'
+
+
+def _private_key(algorithm: str):
+    if algorithm == 'ES256':
+        return ec.generate_private_key(ec.SECP256R1())
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def build_keyring(algorithm: str, keys_dir: str) -> TokenKeyring:
+    if algorithm == 'HS256':
+        return TokenKeyring('HS256', secret_key=os.environ['SECRET_KEY'])
+
+    algorithm_dir = os.path.join(keys_dir, algorithm)
+    os.makedirs(algorithm_dir)
+    pem = _private_key(algorithm).private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    with open(os.path.join(algorithm_dir, KID + PRIVATE_KEY_SUFFIX), 'wb') as key_file:
+        key_file.write(pem)
+    return TokenKeyring(algorithm, keys_dir=algorithm_dir, active_kid=KID, accept_legacy=False)
+
+
+def per_call(func, iterations: int) -> float:
+    """
+    Среднее время одного вызова в микросекундах
+    """
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--algorithms', default='HS256,ES256,RS256')
+    args = parser.parse_args()
+
+    claims = {
+        'sub': str(uuid.uuid4()),
+        'adm': False,
+        'ev': True,
+        'ver': 0,
+        'fam': str(uuid.uuid4()),
+        'type': 'access',
+        'exp': datetime.utcnow() + timedelta(minutes=30),
+    }
+
+    print(f"iterations={args.iterations}")
+    print(f"{'algorithm':<10}{'sign us':>10}{'verify us':>11}{'token bytes':>13}")
+    with tempfile.TemporaryDirectory() as keys_dir:
+        for algorithm in args.algorithms.split(','):
+            keyring = build_keyring(algorithm, keys_dir)
+            token = keyring.sign(claims)
+            keyring.decode(token)
+
+            sign = per_call(lambda: keyring.sign(claims), args.iterations)
+            verify = per_call(lambda: keyring.decode(token), args.iterations)
+            print(f"{algorithm:<10}{sign:>10.1f}{verify:>11.1f}{len(token):>13}")
+
+
+if __name__ == '__main__':
+    main()
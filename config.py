@@ -13,6 +13,26 @@ class DatabaseConfig():
     POSTGRES_DB_PORT = os.getenv('POSTGRES_DB_PORT')
     POSTGRES_DB = os.getenv('POSTGRES_DB')
 
+    # Настройки пула соединений (на один воркер)
+    POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+    MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '5'))
+    POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '5'))
+    POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    # 0 отключает кэш подготовленных выражений (нужно при работе через pgbouncer)
+    STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '100'))
+
+    # Отладочный вывод SQL: выключен по умолчанию, логируется только доля запросов
+    ECHO = os.getenv('DB_ECHO', 'false').lower() == 'true'
+    ECHO_SAMPLE_RATE = float(os.getenv('DB_ECHO_SAMPLE_RATE', '0.01'))
+
+    # Реплика для чтения: если хост не задан, все запросы идут в основную базу
+    POSTGRES_REPLICA_HOST = os.getenv('POSTGRES_REPLICA_HOST')
+    POSTGRES_REPLICA_PORT = os.getenv('POSTGRES_REPLICA_PORT', POSTGRES_DB_PORT)
+    # Допустимое отставание реплики в секундах и период его проверки
+    REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', '1.0'))
+    REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_LAG_CHECK_INTERVAL', '5'))
+
 
 class RedisConfig():
     REDIS_HOST = os.getenv('REDIS_HOST')
@@ -26,6 +46,16 @@ class RedisEventsConfig():
     REDIS_PORT = os.getenv('REDIS_EV_PORT')
     REDIS_PASS = os.getenv('REDIS_EV_PASS')
     REDIS_DB = os.getenv('REDIS_EV_DB')
+    CATALOG_CHANNEL = os.getenv('REDIS_EV_CATALOG_CHANNEL', 'catalog')
+    SUBSCRIPTIONS_CHANNEL = os.getenv('REDIS_EV_SUBSCRIPTIONS_CHANNEL', 'subscriptions')
+    AUTH_CHANNEL = os.getenv('REDIS_EV_AUTH_CHANNEL', 'auth')
+
+
+class CatalogConfig():
+    # Страховочный срок жизни снимка каталога тарифов на случай потерянного события
+    TTL = float(os.getenv('CATALOG_TTL', '300'))
+    # Пауза между попытками пересборки, пока база недоступна
+    RETRY_INTERVAL = float(os.getenv('CATALOG_RETRY_INTERVAL', '5'))
 
 
 class AuthConfig():
@@ -33,6 +63,65 @@ class AuthConfig():
     ALGORITHM = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES = 30
     REFRESH_TOKEN_EXPIRE_DAYS = 7
+    # Сколько расшифрованных токенов хранит каждый воркер (0 отключает кэш)
+    TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', '10000'))
+    # Фильтр Блума отозванных семейств токенов в каждом воркере и период его пересборки
+    REVOCATION_BLOOM_CAPACITY = int(os.getenv('AUTH_REVOCATION_BLOOM_CAPACITY', '100000'))
+    REVOCATION_BLOOM_ERROR_RATE = float(os.getenv('AUTH_REVOCATION_BLOOM_ERROR_RATE', '0.01'))
+    REVOCATION_REBUILD_INTERVAL = float(os.getenv('AUTH_REVOCATION_REBUILD_INTERVAL', '3600'))
+    # Первая пауза перед повтором неудачной пересборки (удваивается до REBUILD_INTERVAL)
+    REVOCATION_RETRY_DELAY = float(os.getenv('AUTH_REVOCATION_RETRY_DELAY', '1'))
+    # Подпись access и refresh токенов: HS256 (SECRET_KEY), ES256 или RS256.
+    # Для асимметричных алгоритмов ключи лежат в каталоге как <kid>.pem
+    # (закрытые) и <kid>.pub.pem (только для проверки), SIGNING_KID — активный
+    SIGNING_ALGORITHM = os.getenv('AUTH_SIGNING_ALGORITHM', 'HS256')
+    SIGNING_KEYS_DIR = os.getenv('AUTH_SIGNING_KEYS_DIR')
+    SIGNING_KID = os.getenv('AUTH_SIGNING_KID')
+    # Принимать токены без kid, подписанные SECRET_KEY: включается явно
+    # на время перехода с HS256 и выключается после истечения старых токенов
+    ACCEPT_LEGACY_HS256 = os.getenv('AUTH_ACCEPT_LEGACY_HS256', 'false').lower() == 'true'
+    # Сколько клиенты могут кэшировать JWKS
+    JWKS_MAX_AGE = int(os.getenv('AUTH_JWKS_MAX_AGE', '300'))
+
+
+class SubscriptionCacheConfig():
+    # Сколько хранить отсутствие активной подписки
+    NEGATIVE_TTL = int(os.getenv('SUBSCRIPTION_CACHE_NEGATIVE_TTL', '30'))
+    # Верхняя граница срока жизни записи, даже если подписка заканчивается позже
+    MAX_TTL = int(os.getenv('SUBSCRIPTION_CACHE_MAX_TTL', '3600'))
+
+
+class EntitlementsConfig():
+    # Сколько хранить соответствие telegram_id пользователю
+    TELEGRAM_ID_TTL = int(os.getenv('ENTITLEMENTS_TELEGRAM_ID_TTL', '86400'))
+    # Максимум идентификаторов в одном пакетном запросе
+    BATCH_MAX_SIZE = int(os.getenv('ENTITLEMENTS_BATCH_MAX_SIZE', '5000'))
+
+
+class SubscriptionExpiryConfig():
+    # Сколько подписок закрывается одним запросом и пауза между проходами
+    BATCH_SIZE = int(os.getenv('SUBSCRIPTION_EXPIRY_BATCH_SIZE', '500'))
+    INTERVAL = float(os.getenv('SUBSCRIPTION_EXPIRY_INTERVAL', '30'))
+
+
+class MetricsConfig():
+    # Метрики воркера старше этого срока не отдаются (воркер остановлен)
+    WORKER_MAX_AGE = float(os.getenv('METRICS_WORKER_MAX_AGE', '300'))
+
+
+class LoginRateLimitConfig():
+    ENABLED = os.getenv('LOGIN_RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    # Размер корзины (всплеск) и пополнение в минуту: по IP клиента и по логину
+    IP_CAPACITY = int(os.getenv('LOGIN_RATE_LIMIT_IP_CAPACITY', '20'))
+    IP_PER_MINUTE = float(os.getenv('LOGIN_RATE_LIMIT_IP_PER_MINUTE', '10'))
+    ACCOUNT_CAPACITY = int(os.getenv('LOGIN_RATE_LIMIT_ACCOUNT_CAPACITY', '5'))
+    ACCOUNT_PER_MINUTE = float(os.getenv('LOGIN_RATE_LIMIT_ACCOUNT_PER_MINUTE', '5'))
+
+
+class PasswordHashingConfig():
+    # Количество процессов для bcrypt и сколько запросов может ждать свободный процесс
+    WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+    MAX_QUEUE = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', '32'))
 
 
 class EmailConfig():
@@ -42,9 +131,56 @@ class EmailConfig():
     SMTP_PASSWORD = os.getenv('SMTP_PASSWORD')
     SMTP_FROM_EMAIL = os.getenv('SMTP_FROM_EMAIL')
     EMAIL_VERIFICATION_URL = os.getenv('EMAIL_VERIFICATION_URL')
+    # true — TLS сразу при подключении (порт 465), иначе STARTTLS
+    SMTP_USE_TLS = os.getenv('SMTP_USE_TLS', 'false').lower() == 'true'
+    # Соединений с SMTP сервером на процесс и сколько держать простаивающее соединение
+    SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', '2'))
+    SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', '10'))
+    SMTP_IDLE_TIMEOUT = float(os.getenv('SMTP_IDLE_TIMEOUT', '60'))
+
+
+class EmailOutboxConfig():
+    # Сколько писем воркер берет за раз и пауза, когда очередь пуста
+    BATCH_SIZE = int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', '20'))
+    POLL_INTERVAL = float(os.getenv('EMAIL_OUTBOX_POLL_INTERVAL', '2'))
+    # Аренда взятого пакета: должна быть больше времени отправки всего пакета
+    LEASE_SECONDS = float(os.getenv('EMAIL_OUTBOX_LEASE_SECONDS', '300'))
+    # Повторы с экспоненциальной задержкой: BACKOFF_BASE * 2^(попытка - 1), не больше BACKOFF_MAX
+    MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', '8'))
+    BACKOFF_BASE = float(os.getenv('EMAIL_OUTBOX_BACKOFF_BASE', '30'))
+    BACKOFF_MAX = float(os.getenv('EMAIL_OUTBOX_BACKOFF_MAX', '3600'))
+
+
+class WebhookStreamConfig():
+    # Поток Redis (основной инстанс) для входящих webhook и группа его обработчиков
+    STREAM = os.getenv('WEBHOOK_STREAM', 'webhooks:yookassa')
+    DEAD_LETTER_STREAM = os.getenv('WEBHOOK_DEAD_LETTER_STREAM', 'webhooks:yookassa:dead')
+    GROUP = os.getenv('WEBHOOK_STREAM_GROUP', 'yookassa')
+    # Примерный предел длины потока (MAXLEN ~)
+    MAX_LENGTH = int(os.getenv('WEBHOOK_STREAM_MAX_LENGTH', '100000'))
+    # Обработчиков в одном процессе, событий за одно чтение и время ожидания новых, мс
+    CONSUMERS = int(os.getenv('WEBHOOK_CONSUMERS', '4'))
+    BATCH_SIZE = int(os.getenv('WEBHOOK_BATCH_SIZE', '20'))
+    BLOCK_MS = int(os.getenv('WEBHOOK_BLOCK_MS', '5000'))
+    # Событие, не подтвержденное за CLAIM_IDLE_MS, забирает другой обработчик;
+    # после MAX_DELIVERIES доставок оно переносится в DEAD_LETTER_STREAM
+    CLAIM_IDLE_MS = int(os.getenv('WEBHOOK_CLAIM_IDLE_MS', '60000'))
+    CLAIM_INTERVAL = float(os.getenv('WEBHOOK_CLAIM_INTERVAL', '30'))
+    MAX_DELIVERIES = int(os.getenv('WEBHOOK_MAX_DELIVERIES', '10'))
+    METRICS_INTERVAL = float(os.getenv('WEBHOOK_METRICS_INTERVAL', '15'))
 
 
 class YookassaConfig():
     SHOP_ID = os.getenv('YOOKASSA_SHOP_ID')
     SECRET_KEY = os.getenv('YOOKASSA_SECRET_KEY')
     PAYMENT_RETURN_URL = os.getenv('PAYMENT_RETURN_URL', 'https://ashleyvpn.com/payment/success')
+    API_URL = os.getenv('YOOKASSA_API_URL', 'https://api.yookassa.ru/v3')
+    # Таймауты запроса и подключения в секундах, размер пула соединений на процесс
+    TIMEOUT = float(os.getenv('YOOKASSA_TIMEOUT', '10'))
+    CONNECT_TIMEOUT = float(os.getenv('YOOKASSA_CONNECT_TIMEOUT', '3'))
+    MAX_CONNECTIONS = int(os.getenv('YOOKASSA_MAX_CONNECTIONS', '20'))
+    # Повторы при сетевых ошибках и 5xx с тем же ключом идемпотентности
+    RETRIES = int(os.getenv('YOOKASSA_RETRIES', '3'))
+    RETRY_DELAY = float(os.getenv('YOOKASSA_RETRY_DELAY', '0.5'))
+    # Общий предел времени на запрос со всеми повторами
+    TOTAL_TIMEOUT = float(os.getenv('YOOKASSA_TOTAL_TIMEOUT', '15'))
@@ -1,12 +1,297 @@
+import asyncio
+import logging
+import random
+import sys
+import time
+from threading import Lock
+
+from sqlalchemy import event, text, Insert, Update, Delete, Executable
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from config import DatabaseConfig
 
 
 DATABASE_URL = f"postgresql+asyncpg://{DatabaseConfig.POSTGRES_USER}:{DatabaseConfig.POSTGRES_PASSWORD}@{DatabaseConfig.POSTGRES_DB_HOST}:{DatabaseConfig.POSTGRES_DB_PORT}/{DatabaseConfig.POSTGRES_DB}"
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+REPLICA_DATABASE_URL = None
+if DatabaseConfig.POSTGRES_REPLICA_HOST:
+    REPLICA_DATABASE_URL = f"postgresql+asyncpg://{DatabaseConfig.POSTGRES_USER}:{DatabaseConfig.POSTGRES_PASSWORD}@{DatabaseConfig.POSTGRES_REPLICA_HOST}:{DatabaseConfig.POSTGRES_REPLICA_PORT}/{DatabaseConfig.POSTGRES_DB}"
+
+sql_logger = logging.getLogger("database.sql")
+
+
+class PoolMetrics():
+    """
+    Счетчики выдачи соединений из пула: количество, время ожидания и таймауты
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def observe(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.timeouts,
+                "checkout_wait_avg_ms": round(self.wait_total / attempts * 1000, 3) if attempts else 0.0,
+                "checkout_wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+# Метрики храним по имени пула, чтобы они переживали pool.recreate() (например, при engine.dispose())
+pool_metrics = {}
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, замеряющий время ожидания свободного соединения
+    """
+    def _do_get(self):
+        metrics = pool_metrics.setdefault(self._orig_logging_name or "default", PoolMetrics())
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            metrics.observe(time.perf_counter() - started, timed_out=True)
+            raise
+        metrics.observe(time.perf_counter() - started)
+        return connection
+
+
+def _attach_sampled_echo(engine, sample_rate: float):
+    """
+    Логирует случайную выборку SQL-запросов вместо echo=True для всех запросов
+    """
+    # Как echo=True в SQLAlchemy: без этого записи уровня INFO отбрасываются
+    sql_logger.setLevel(logging.INFO)
+    if not sql_logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+        sql_logger.addHandler(handler)
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def log_statement(conn, cursor, statement, parameters, context, executemany):
+        if random.random() < sample_rate:
+            sql_logger.info("%s %r", statement, parameters)
+
+
+def create_engine(url: str, name: str = "primary"):
+    """
+    Создает асинхронный движок с настройками пула из DatabaseConfig
+
+    Args:
+        url: URL подключения к базе данных
+        name: Имя пула, под которым публикуются его метрики
+
+    Returns:
+        AsyncEngine: Настроенный движок
+    """
+    url = make_url(url).update_query_dict({
+        "prepared_statement_cache_size": str(DatabaseConfig.STATEMENT_CACHE_SIZE),
+    })
+
+    engine = create_async_engine(
+        url,
+        echo=False,
+        poolclass=MeteredQueuePool,
+        pool_size=DatabaseConfig.POOL_SIZE,
+        max_overflow=DatabaseConfig.MAX_OVERFLOW,
+        pool_timeout=DatabaseConfig.POOL_TIMEOUT,
+        pool_recycle=DatabaseConfig.POOL_RECYCLE,
+        pool_pre_ping=DatabaseConfig.POOL_PRE_PING,
+        pool_logging_name=name,
+        connect_args={"statement_cache_size": DatabaseConfig.STATEMENT_CACHE_SIZE},
+    )
+
+    if DatabaseConfig.ECHO:
+        _attach_sampled_echo(engine, DatabaseConfig.ECHO_SAMPLE_RATE)
+
+    return engine
+
+
+def get_pool_stats(engine) -> dict:
+    """
+    Возвращает текущее состояние пула соединений движка
+    """
+    pool = engine.pool
+    stats = {
+        "pool_size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": DatabaseConfig.MAX_OVERFLOW,
+    }
+    metrics = pool_metrics.get(pool._orig_logging_name or "default")
+    stats.update(metrics.as_dict() if metrics else PoolMetrics().as_dict())
+    return stats
+
+
+engine = create_engine(DATABASE_URL)
+replica_engine = create_engine(REPLICA_DATABASE_URL, name="replica") if REPLICA_DATABASE_URL else None
+
+
+# Отставание реплики в секундах; 0, если реплика догнала основную базу
+REPLICA_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class ReplicaMonitor():
+    """
+    Проверяет отставание реплики в фоновой задаче (run).
+    Пока отставание неизвестно, превышает допустимое или давно не
+    обновлялось, чтение идет из основной базы.
+    """
+    def __init__(self, engine, max_lag: float, interval: float):
+        self._engine = engine
+        self.max_lag = max_lag
+        self.interval = interval
+        self.lag = None
+        self.checked_at = 0.0
+
+    def is_healthy(self) -> bool:
+        # Проверка могла зависнуть вместе с репликой: старый результат не используется
+        if time.monotonic() - self.checked_at > self.interval * 3:
+            return False
+        return self.lag is not None and self.lag <= self.max_lag
+
+    async def _query_lag(self) -> float:
+        async with self._engine.connect() as connection:
+            return float((await connection.execute(REPLICA_LAG_QUERY)).scalar())
+
+    async def refresh(self):
+        if self._engine is None:
+            return
+
+        try:
+            self.lag = await asyncio.wait_for(self._query_lag(), timeout=self.interval)
+        except Exception as e:
+            sql_logger.warning("Не удалось проверить отставание реплики: %s", e)
+            self.lag = None
+        self.checked_at = time.monotonic()
+
+    async def run(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+
+replica_monitor = ReplicaMonitor(
+    replica_engine,
+    max_lag=DatabaseConfig.REPLICA_MAX_LAG,
+    interval=DatabaseConfig.REPLICA_LAG_CHECK_INTERVAL,
+)
+
+
+def use_primary(session):
+    """
+    Закрепляет сессию за основной базой до ее закрытия (read-your-writes)
+    """
+    session.info["use_primary"] = True
+
+
+def on_primary(statement):
+    """
+    Направляет в основную базу только этот запрос, не закрепляя сессию
+    """
+    return statement.execution_options(use_primary=True)
+
+
+class RoutingSession(Session):
+    """
+    Сессия, направляющая чтение на реплику, а запись и все последующие
+    запросы той же сессии (то есть того же запроса) — в основную базу.
+    Отдельный запрос можно направить в основную базу через on_primary
+    """
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if replica_engine is None:
+            return engine.sync_engine
+
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)) \
+                or getattr(clause, "_for_update_arg", None) is not None:
+            use_primary(self)
+
+        if self.info.get("use_primary") or not replica_monitor.is_healthy() \
+                or (isinstance(clause, Executable) and clause.get_execution_options().get("use_primary")):
+            return engine.sync_engine
+
+        return replica_engine.sync_engine
+
 
 async_session = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
+    class_=AsyncSession, sync_session_class=RoutingSession, expire_on_commit=False
 )
+
+
+def in_unit_of_work(session) -> bool:
+    return session.info.get("unit_of_work_depth", 0) > 0
+
+
+class UnitOfWork():
+    """
+    Объединяет записи нескольких репозиториев в одну транзакцию.
+
+    Внутри блока репозитории только отправляют изменения в базу (flush),
+    а фиксирует их один commit при выходе. При исключении транзакция
+    откатывается целиком. Вложенные блоки присоединяются к внешнему.
+    Все запросы внутри блока идут в основную базу.
+
+    Пример:
+        async with UnitOfWork(session):
+            await payment_service.update_payment(...)
+            await subscription_service.create_subscription(...)
+    """
+    def __init__(self, session):
+        self.session = session
+
+    async def __aenter__(self):
+        use_primary(self.session)
+        self.session.info["unit_of_work_depth"] = self.session.info.get("unit_of_work_depth", 0) + 1
+        return self.session
+
+    async def __aexit__(self, exc_type, exc, tb):
+        depth = self.session.info["unit_of_work_depth"] - 1
+        self.session.info["unit_of_work_depth"] = depth
+
+        if depth > 0:
+            return False
+
+        callbacks = self.session.info.pop("after_commit", [])
+        if exc_type is not None:
+            await self.session.rollback()
+        else:
+            await self.session.commit()
+            for callback in callbacks:
+                await callback()
+        return False
+
+
+async def after_commit(session, callback):
+    """
+    Выполняет callback после фиксации изменений: внутри UnitOfWork —
+    после commit внешнего блока (при откате не выполняется), иначе сразу,
+    так как репозитории уже зафиксировали изменения сами
+    """
+    if in_unit_of_work(session):
+        session.info.setdefault("after_commit", []).append(callback)
+    else:
+        await callback()
@@ -27,9 +27,10 @@ redis_events = redis.Redis(
 )
 
 
-emiter = RedisEventEmiter(redis_events, channels=[])
+emiter = RedisEventEmiter(redis_events, channels=[RedisEventsConfig.CATALOG_CHANNEL, RedisEventsConfig.AUTH_CHANNEL])
 
 
 async def get_session() -> AsyncSession:
+    # Отставание реплики проверяет фоновая задача replica_monitor.run()
     async with async_session() as session:
         yield session
@@ -1,10 +1,17 @@
 import asyncio
 import uvicorn
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 
 from routers.api_routes import get_api_routers
+from repositories.pagination import InvalidCursor
+from database import replica_monitor, replica_engine
 from dependencies import emiter
+from services.users import password_hash_pool
+from services.token_revocation import token_revocations
+from services.email_service import email_service
+from services.yookassa_client import yookassa_client
 from config import FastAPIConfig
 
 
@@ -13,6 +20,42 @@ def init_app():
 
     for router in get_api_routers():
         app.include_router(router)
+
+    @app.exception_handler(InvalidCursor)
+    async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+        # Курсор пагинации приходит от клиента: испорченный — ошибка запроса
+        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": "Invalid cursor"})
+
+    @app.on_event("startup")
+    async def startup_event():
+        # Слушатель событий Redis: через него воркеры узнают об изменении каталога
+        app.state.emiter_task = asyncio.create_task(emiter.reader())
+        # Отставание реплики проверяется в фоне, а не в обработчиках запросов
+        app.state.replica_monitor_task = None
+        if replica_engine is not None:
+            app.state.replica_monitor_task = asyncio.create_task(replica_monitor.run())
+        # Фильтр отозванных токенов загружается до приема запросов и периодически пересобирается
+        await token_revocations.rebuild()
+        app.state.revocations_task = asyncio.create_task(token_revocations.run())
+
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        app.state.emiter_task.cancel()
+        app.state.revocations_task.cancel()
+        if app.state.replica_monitor_task is not None:
+            app.state.replica_monitor_task.cancel()
+
+    @app.on_event("shutdown")
+    async def shutdown_password_hash_pool():
+        password_hash_pool.shutdown()
+
+    @app.on_event("shutdown")
+    async def shutdown_email_service():
+        await email_service.close()
+
+    @app.on_event("shutdown")
+    async def shutdown_yookassa_client():
+        await yookassa_client.close()
     
     return app
 
@@ -20,10 +63,5 @@ def init_app():
 app = init_app()
 
 
-# @app.on_event("startup")
-# async def startup_event():
-#     asyncio.create_task(emiter.reader())
-
-
 if __name__ == '__main__':
     uvicorn.run("main:app", port=int(FastAPIConfig.PORT), host=FastAPIConfig.HOST, reload=True)
@@ -0,0 +1,156 @@
+import json
+import logging
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from redis.exceptions import RedisError
+
+
+logger = logging.getLogger("metrics")
+
+# Hash в Redis, куда фоновые воркеры публикуют свои метрики
+WORKER_METRICS_KEY = 'metrics:workers'
+
+LabelsKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels_key(labels: Dict[str, str]) -> LabelsKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Metric:
+    type_ = 'untyped'
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[LabelsKey, float] = {}
+
+    def value(self, **labels) -> float:
+        return self._values.get(_labels_key(labels), 0.0)
+
+    def samples(self) -> List[Tuple[LabelsKey, float]]:
+        return list(self._values.items())
+
+
+class Counter(Metric):
+    type_ = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = _labels_key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    type_ = 'gauge'
+
+    def set(self, value: float, **labels):
+        self._values[_labels_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = _labels_key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class MetricsRegistry:
+    """
+    Метрики процесса в формате Prometheus.
+
+    Метрики хранятся в памяти процесса: каждый воркер uvicorn отдает
+    свои, фоновые воркеры публикуют их в Redis (publish), откуда их
+    забирает /internal/metrics.
+    """
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def _register(self, cls, name: str, documentation: str):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, documentation)
+        return metric
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._register(Counter, name, documentation)
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        return self._register(Gauge, name, documentation)
+
+    def collect(self) -> List[dict]:
+        return [
+            {
+                'name': metric.name,
+                'type': metric.type_,
+                'help': metric.documentation,
+                'samples': [[dict(labels), value] for labels, value in metric.samples()],
+            }
+            for metric in self._metrics.values()
+        ]
+
+    async def publish(self, redis_client, source: str):
+        """
+        Публикует метрики фонового воркера в Redis
+        """
+        try:
+            await redis_client.hset(WORKER_METRICS_KEY, source, json.dumps({
+                'updated_at': time.time(),
+                'metrics': self.collect(),
+            }))
+        except RedisError as e:
+            logger.warning("Не удалось опубликовать метрики %s: %s", source, e)
+
+
+async def collect_published(redis_client, max_age: float) -> Dict[str, List[dict]]:
+    """
+    Метрики фоновых воркеров, опубликованные не раньше чем max_age секунд назад
+    """
+    try:
+        published = await redis_client.hgetall(WORKER_METRICS_KEY)
+    except RedisError as e:
+        logger.warning("Не удалось получить метрики воркеров: %s", e)
+        return {}
+
+    result = {}
+    for source, raw in published.items():
+        data = json.loads(raw)
+        if time.time() - data['updated_at'] <= max_age:
+            result[source] = data['metrics']
+    return result
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in sorted(labels.items())
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def render(collections: Iterable[Tuple[Dict[str, str], List[dict]]]) -> str:
+    """
+    Текстовый формат Prometheus. Каждая коллекция — метки, добавляемые
+    ко всем ее значениям (например, source воркера), и результат collect()
+    """
+    families: Dict[str, dict] = {}
+    for extra_labels, metrics in collections:
+        for metric in metrics:
+            family = families.setdefault(metric['name'], {
+                'type': metric['type'], 'help': metric['help'], 'samples': []
+            })
+            for labels, value in metric['samples']:
+                family['samples'].append(({**labels, **extra_labels}, value))
+
+    lines = []
+    for name, family in families.items():
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for labels, value in family['samples']:
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+    return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
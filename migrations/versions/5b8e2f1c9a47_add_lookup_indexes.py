@@ -0,0 +1,67 @@
+"""add lookup indexes
+
+Revision ID: 5b8e2f1c9a47
+Revises: cc3d71508515
+Create Date: 2026-10-17 12:10:42.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8e2f1c9a47'
+down_revision: Union[str, None] = 'cc3d71508515'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (имя индекса, таблица, колонки, условие частичного индекса)
+INDEXES = [
+    # get_active_subscription_for_user
+    ('ix_subscriptions_customer_active', 'subscriptions', ['customer_id', 'ends_at'], "status = 'ACTIVE'"),
+    # get_user_subscriptions
+    ('ix_subscriptions_customer_id', 'subscriptions', ['customer_id', 'id'], None),
+    # get_plan_subscriptions
+    ('ix_subscriptions_plan_id', 'subscriptions', ['plan_id', 'id'], None),
+    # выборка истекающих подписок и подсчет по статусу
+    ('ix_subscriptions_status_ends_at', 'subscriptions', ['status', 'ends_at'], None),
+    ('ix_subscriptions_invoice_id', 'subscriptions', ['invoice_id'], None),
+    ('ix_subscriptions_renewed_subscription_id', 'subscriptions', ['renewed_subscription_id'], None),
+    ('ix_subscriptions_downgraded_to_plan_id', 'subscriptions', ['downgraded_to_plan_id'], None),
+    ('ix_subscriptions_upgraded_to_plan_id', 'subscriptions', ['upgraded_to_plan_id'], None),
+    # get_user_payments
+    ('ix_payments_user_id', 'payments', ['user_id', 'id'], None),
+    ('ix_payments_subscription_plan_id', 'payments', ['subscription_plan_id'], None),
+    # get_user_payment_methods
+    ('ix_payment_methods_user', 'payment_methods', ['user'], None),
+    # get_user_referals
+    ('ix_referals_parent', 'referals', ['parent', 'id'], None),
+    ('ix_referals_child', 'referals', ['child'], None),
+    # get_plan_quotas, get_plan_prices
+    ('ix_quotas_subscription_plan_id', 'quotas', ['subscription_plan_id'], None),
+    ('ix_prices_subscription_plan_id', 'prices', ['subscription_plan_id'], None),
+    ('ix_subscription_plans_transfer_plan_id', 'subscription_plans', ['transfer_plan_id'], None),
+    ('ix_users_source_id', 'users', ['source_id'], None),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY не может выполняться внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns,
+                unique=False,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
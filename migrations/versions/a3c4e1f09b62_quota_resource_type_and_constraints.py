@@ -0,0 +1,49 @@
+"""quota resource type and constraints
+
+Revision ID: a3c4e1f09b62
+Revises: 5b8e2f1c9a47
+Create Date: 2026-10-17 15:02:11.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c4e1f09b62'
+down_revision: Union[str, None] = '5b8e2f1c9a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+resource_type = sa.Enum('LOCATIONS_COUNT', 'PROTOCOLS_COUNT', name='resourcetype')
+
+
+def upgrade() -> None:
+    # resource_type ошибочно использовал тип currency. Прежние значения
+    # (RUB, USD, EUR) не имеют смысла как тип ресурса и не приводятся
+    # к новому типу: они сбрасываются в NULL, тип квот задается заново
+    resource_type.create(op.get_bind(), checkfirst=True)
+    op.alter_column(
+        'quotas', 'resource_type',
+        type_=resource_type,
+        existing_nullable=True,
+        postgresql_using='NULL',
+    )
+    op.add_column('quotas', sa.Column(
+        'constraints', postgresql.JSONB(astext_type=sa.Text()), server_default='{}', nullable=False
+    ))
+
+
+def downgrade() -> None:
+    op.drop_column('quotas', 'constraints')
+    op.alter_column(
+        'quotas', 'resource_type',
+        type_=sa.Enum('RUB', 'USD', 'EUR', name='currency'),
+        existing_nullable=True,
+        postgresql_using='NULL',
+    )
+    resource_type.drop(op.get_bind(), checkfirst=True)
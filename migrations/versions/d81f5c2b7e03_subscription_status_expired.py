@@ -0,0 +1,29 @@
+"""subscription status expired
+
+Revision ID: d81f5c2b7e03
+Revises: a3c4e1f09b62
+Create Date: 2026-10-17 16:40:27.551093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f5c2b7e03'
+down_revision: Union[str, None] = 'a3c4e1f09b62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Новое значение enum нельзя использовать в той же транзакции, где оно добавлено
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE subscriptionstatus ADD VALUE IF NOT EXISTS 'EXPIRED'")
+
+
+def downgrade() -> None:
+    # PostgreSQL не умеет удалять значения enum; возвращаем истекшие подписки в INACTIVE
+    op.execute("UPDATE subscriptions SET status = 'INACTIVE' WHERE status = 'EXPIRED'")
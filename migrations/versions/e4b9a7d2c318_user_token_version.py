@@ -0,0 +1,26 @@
+"""user token version
+
+Revision ID: e4b9a7d2c318
+Revises: d81f5c2b7e03
+Create Date: 2026-10-17 17:25:03.118640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b9a7d2c318'
+down_revision: Union[str, None] = 'd81f5c2b7e03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,39 @@
+import enum
+from .base import Base
+
+from sqlalchemy import Enum, Integer, String,\
+     Column, Index, text
+from sqlalchemy.dialects.postgresql import TIMESTAMP, UUID, JSONB
+
+import uuid
+
+
+class EmailOutboxStatus(enum.Enum):
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+
+class EmailOutbox(Base):
+    """
+    Письма к отправке. Запись создается в одной транзакции с изменением,
+    которое требует письма, и отправляется воркером workers.email_outbox
+    """
+    __tablename__ = 'email_outbox'
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    kind = Column(String, nullable=False)  # Тип письма, например email_verification
+    recipient = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False, server_default=text("'{}'::jsonb"))
+    status = Column(Enum(EmailOutboxStatus), nullable=False, default=EmailOutboxStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    # Время следующей попытки; у взятого в работу письма — окончание аренды
+    next_attempt_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("CURRENT_TIMESTAMP"))
+    last_error = Column(String)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("CURRENT_TIMESTAMP"))
+    sent_at = Column(TIMESTAMP(timezone=True))
+
+    __table_args__ = (
+        # Выборка писем к отправке воркером
+        Index('ix_email_outbox_pending', 'next_attempt_at',
+              postgresql_where=text("status = 'PENDING'")),
+    )
@@ -2,7 +2,7 @@ import enum
 from .base import Base
 
 from sqlalchemy import Enum, Integer, String,\
-     Column, ForeignKey, Float, DateTime, Boolean, text
+     Column, ForeignKey, Float, DateTime, Boolean, Index, text
 from sqlalchemy.dialects.postgresql import TIMESTAMP, UUID
 
 from .subscription_plans import Currency
@@ -35,9 +35,14 @@ class Payment(Base):
     payment_metadata = Column(String, nullable=True)  # Метаданные платежа в формате JSON
     last_update = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("CURRENT_TIMESTAMP"))
 
+    __table_args__ = (
+        Index('ix_payments_user_id', 'user_id', 'id'),
+        Index('ix_payments_subscription_plan_id', 'subscription_plan_id'),
+    )
+
 class PaymentMethod(Base):
     __tablename__ = 'payment_methods'
     id = Column(Integer, primary_key=True, autoincrement=True)
     method_name = Column(String)
     method_id = Column(String)
-    user = Column(ForeignKey("users.id"))
+    user = Column(ForeignKey("users.id"), index=True)
@@ -1,12 +1,14 @@
 import enum
 from .base import Base
 
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Iterable, Optional, Tuple
 
 from sqlalchemy import Enum, Integer, String,\
      Column, ForeignKey, Float, Numeric, Boolean
 from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 
 import uuid
 
@@ -78,6 +80,73 @@ resources = {
 }
 
 
+class Protocol(enum.IntFlag):
+    VLESS = 1
+    OUTLINE = 2
+    WIREGUARD = 4
+
+
+# Названия протоколов, как их возвращает ProtocolsCountResource.get_available_protocols
+PROTOCOL_NAMES = {
+    'vless': Protocol.VLESS,
+    'outline': Protocol.OUTLINE,
+    'wg': Protocol.WIREGUARD,
+}
+
+PROTOCOL_CONSTRAINTS = {
+    'USE_VLESS': Protocol.VLESS,
+    'USE_OUTLINE': Protocol.OUTLINE,
+    'USE_WIREGUARD': Protocol.WIREGUARD,
+}
+
+
+def _resource_type_value(resource_type) -> str:
+    # Квоты приходят как из моделей, так и из схем со своим Enum
+    return resource_type.value if isinstance(resource_type, enum.Enum) else resource_type
+
+
+@dataclass(frozen=True)
+class PlanEntitlements:
+    """
+    Скомпилированные квоты тарифа: строится один раз на версию тарифа,
+    проверки выполняются без обхода квот и разбора ограничений
+    """
+    protocols_mask: Protocol = Protocol(0)
+    protocols_limit: Optional[int] = None
+    locations_limit: Optional[int] = None
+    simultaneous_use: bool = False
+    can_choose_location: bool = False
+    selection_by_popularity: bool = False
+    protocols: Tuple[str, ...] = ()
+
+    def allows(self, protocol: Protocol) -> bool:
+        return bool(self.protocols_mask & protocol)
+
+    @classmethod
+    def from_quotas(cls, quotas: Iterable) -> 'PlanEntitlements':
+        values = {}
+        for quota in quotas:
+            resource_type = _resource_type_value(quota.resource_type)
+            constraints = quota.constraints or {}
+
+            if resource_type == ResourceType.PROTOCOLS_COUNT.value:
+                mask = Protocol(0)
+                for name, protocol in PROTOCOL_CONSTRAINTS.items():
+                    if constraints.get(name):
+                        mask |= protocol
+                values['protocols_mask'] = mask
+                values['protocols_limit'] = quota.limit
+                values['simultaneous_use'] = bool(constraints.get('SIMULTANEOUS_USE'))
+                values['protocols'] = tuple(name for name, protocol in PROTOCOL_NAMES.items() if mask & protocol)
+
+            elif resource_type == ResourceType.LOCATIONS_COUNT.value:
+                values['locations_limit'] = quota.limit
+                values['can_choose_location'] = bool(constraints.get('CAN_CHOOSE'))
+                values['selection_by_popularity'] = bool(constraints.get('SELECTION_BY_POPULARITY'))
+
+        return cls(**values)
+
+
 class SubscriptionPlan(Base):
     __tablename__ = 'subscription_plans'
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -90,13 +159,17 @@ class SubscriptionPlan(Base):
     prices = relationship("Price")
     trial_discount = Column(Float, default=0.0, nullable=True)
 
-    transfer_plan_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    transfer_plan_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
     transfer_plan = relationship("User")
     
     created_at = Column(String, default=datetime.utcnow)
     updated_at = Column(String, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    def get_entitlements(self) -> PlanEntitlements:
+          return PlanEntitlements.from_quotas(self.quotas)
+
     async def get_quota(self, resource_type):
+          # Для проверок доступа используйте PlanEntitlements из каталога тарифов
           quota = next((q for q in self.quotas if q.resource_type == resource_type), None)
           resource = resources[resource_type]()
 
@@ -111,15 +184,20 @@ class SubscriptionPlan(Base):
 class Quota(Base):
     __tablename__ = 'quotas'
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    subscription_plan_id = Column(UUID(as_uuid=True), ForeignKey("subscription_plans.id"), nullable=False)
-    resource_type = Column(Enum(Currency))
+    subscription_plan_id = Column(UUID(as_uuid=True), ForeignKey("subscription_plans.id"), nullable=False, index=True)
+    resource_type = Column(Enum(ResourceType))
     limit = Column(Integer, nullable=True)
+    constraints = Column(JSONB, nullable=False, default=dict, server_default='{}')
+
+    def map_constarints(self, constarints):
+          constraints = self.constraints or {}
+          return {name: bool(constraints.get(name, False)) for name in constarints}
 
 
 class Price(Base):
     __tablename__ = 'prices'
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    subscription_plan_id = Column(UUID(as_uuid=True), ForeignKey("subscription_plans.id"), nullable=False)
+    subscription_plan_id = Column(UUID(as_uuid=True), ForeignKey("subscription_plans.id"), nullable=False, index=True)
     amount = Column(Float)
     currency = Column(Enum(Currency))
     interval = Column(Enum(BillingInterval))
@@ -2,7 +2,7 @@ import enum
 from .base import Base
 
 from sqlalchemy import Enum, String,\
-     Column, ForeignKey, text
+     Column, ForeignKey, Index, text
 from sqlalchemy.dialects.postgresql import TIMESTAMP, UUID
 
 import uuid
@@ -12,6 +12,7 @@ class SubscriptionStatus(enum.Enum):
     INACTIVE = 'inactive'
     ACTIVE = 'active'
     UPGRADED = 'upgraded'
+    EXPIRED = 'expired'
 
 
 class Subscription(Base):
@@ -32,3 +33,16 @@ class Subscription(Base):
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("CURRENT_TIMESTAMP"))
     deleted_at = Column(TIMESTAMP(timezone=True))
     status = Column(Enum(SubscriptionStatus))
+
+    __table_args__ = (
+        # get_active_subscription_for_user: только активные подписки пользователя
+        Index('ix_subscriptions_customer_active', 'customer_id', 'ends_at',
+              postgresql_where=text("status = 'ACTIVE'")),
+        Index('ix_subscriptions_customer_id', 'customer_id', 'id'),
+        Index('ix_subscriptions_plan_id', 'plan_id', 'id'),
+        Index('ix_subscriptions_status_ends_at', 'status', 'ends_at'),
+        Index('ix_subscriptions_invoice_id', 'invoice_id'),
+        Index('ix_subscriptions_renewed_subscription_id', 'renewed_subscription_id'),
+        Index('ix_subscriptions_downgraded_to_plan_id', 'downgraded_to_plan_id'),
+        Index('ix_subscriptions_upgraded_to_plan_id', 'upgraded_to_plan_id'),
+    )
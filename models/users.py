@@ -2,7 +2,7 @@ from .base import Base
 
 from datetime import datetime
 from sqlalchemy import BigInteger, Integer, String,\
-     Column, ForeignKey, Float, DateTime, Boolean
+     Column, ForeignKey, Float, DateTime, Boolean, Index
 from sqlalchemy.dialects.postgresql import UUID
 
 import uuid
@@ -21,24 +21,30 @@ class User(Base):
      id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
      telegram_id = Column(BigInteger, unique=True, nullable=True)
      is_admin = Column(Boolean, default=False)
-     joined_at = Column(DateTime, default=datetime.now(), nullable=True)
-     ref_id = Column(String, default=generate_ref_id(), unique=True, nullable=True)
-     source_id = Column(ForeignKey('sources.id', ondelete='SET NULL'), nullable=True)
+     joined_at = Column(DateTime, default=datetime.now, nullable=True)
+     ref_id = Column(String, default=generate_ref_id, unique=True, nullable=True)
+     source_id = Column(ForeignKey('sources.id', ondelete='SET NULL'), nullable=True, index=True)
      username = Column(String, unique=True, nullable=False)
      email = Column(String, unique=True, nullable=True)
      password = Column(String, unique=False, nullable=True)
      email_verified = Column(Boolean, default=False)
+     # Увеличивается при смене пароля или прав: выданные ранее токены перестают обновляться
+     token_version = Column(Integer, nullable=False, default=0, server_default='0')
 
 
 class Referals(Base):
      __tablename__ = 'referals'
      id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
      parent = Column(ForeignKey('users.id'), nullable=True)
-     child = Column(ForeignKey('users.id'), nullable=True)
+     child = Column(ForeignKey('users.id'), nullable=True, index=True)
+
+     __table_args__ = (
+          Index('ix_referals_parent', 'parent', 'id'),
+     )
 
 
 class Sources(Base):
      __tablename__ = 'sources'
      id = Column(Integer, primary_key=True, autoincrement=True)
      name = Column(String)
-     src_id = Column(String, default=generate_ref_id(), unique=True, nullable=True)
\ No newline at end of file
+     src_id = Column(String, default=generate_ref_id, unique=True, nullable=True)
\ No newline at end of file
@@ -1,8 +1,20 @@
+import asyncio
+import logging
 import redis.asyncio as redis
+from redis.exceptions import RedisError
 from functools import wraps
 import json 
 
 
+logger = logging.getLogger("redis_events")
+
+# Пауза перед переподключением читателя после ошибки Redis
+RECONNECT_DELAY = 1.0
+# Локальное событие: подписка на каналы (пере)установлена. События,
+# отправленные, пока ее не было, потеряны, и подписчики могут догрузить состояние
+SUBSCRIBED_EVENT = 'redis_events_subscribed'
+
+
 class RedisEventEmiter():
     _instance = None
     _subs = {}
@@ -32,10 +44,32 @@ class RedisEventEmiter():
             for sub in subs:
                 await sub(data)
 
+    async def publish(self, channel, event, data):
+        """
+        Отправляет событие всем воркерам, подписанным на канал
+        (включая текущий — он получит его через reader)
+        """
+        await self._client.publish(channel, json.dumps({**data, 'type_event': event}))
+
     async def reader(self):
+        while True:
+            try:
+                await self._read()
+            except asyncio.CancelledError:
+                raise
+            except RedisError as e:
+                logger.warning("Потеряно соединение с Redis событий: %s", e)
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    async def _read(self):
         async with self._client.pubsub(ignore_subscribe_messages=True) as pubsub:
             for channel in self._channels:
                 await pubsub.subscribe(channel)
+
+            try:
+                await self.emit(SUBSCRIBED_EVENT, {})
+            except Exception:
+                logger.exception("Ошибка обработки события %s", SUBSCRIBED_EVENT)
             
             async for message in pubsub.listen():
                 if message is not None:
@@ -46,4 +80,7 @@ class RedisEventEmiter():
                     
                     type_event = data.get('type_event')
                     
-                    await self.emit(type_event, data)
+                    try:
+                        await self.emit(type_event, data)
+                    except Exception:
+                        logger.exception("Ошибка обработки события %s", type_event)
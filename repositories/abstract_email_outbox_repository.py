@@ -0,0 +1,31 @@
+from abc import ABC, abstractmethod
+from typing import Optional, List, Any, Dict
+from datetime import datetime
+from models.email_outbox import EmailOutbox
+from repositories.base_repository import BaseRepository
+
+class AbstractEmailOutboxRepository(BaseRepository, ABC):
+    """
+    Абстрактный класс для репозитория исходящих писем.
+    Определяет методы, которые должны быть реализованы в конкретных репозиториях исходящих писем.
+    """
+
+    @abstractmethod
+    async def add_email(self, kind: str, recipient: str, payload: Dict[str, Any]) -> EmailOutbox:
+        pass
+
+    @abstractmethod
+    async def claim_due(self, limit: int, lease_seconds: float) -> List[Any]:
+        pass
+
+    @abstractmethod
+    async def mark_sent(self, email_ids: List[Any]) -> None:
+        pass
+
+    @abstractmethod
+    async def mark_failed(self, email_id: Any, error: str, retry_in: Optional[float]) -> None:
+        pass
+
+    @abstractmethod
+    async def get_queue_stats(self) -> Any:
+        pass
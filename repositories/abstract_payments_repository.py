@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator
 from models.payments import Payment, PaymentMethod
 from repositories.base_repository import BaseRepository
+from repositories.pagination import Page, DEFAULT_PAGE_SIZE
 
 class AbstractPaymentRepository(BaseRepository, ABC):
     """
@@ -21,7 +22,11 @@ class AbstractPaymentRepository(BaseRepository, ABC):
         pass
 
     @abstractmethod
-    async def get_user_payments(self, user_id: str) -> List[Payment]:
+    async def get_user_payments(self, user_id: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Page:
+        pass
+
+    @abstractmethod
+    def stream_payments(self) -> AsyncIterator[Dict[str, Any]]:
         pass
 
     @abstractmethod
@@ -33,7 +38,7 @@ class AbstractPaymentRepository(BaseRepository, ABC):
         pass
 
     @abstractmethod
-    async def get_user_payment_methods(self, user_id: str) -> List[PaymentMethod]:
+    async def get_user_payment_methods(self, user_id: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Page:
         pass
 
     @abstractmethod
@@ -41,5 +46,5 @@ class AbstractPaymentRepository(BaseRepository, ABC):
         pass
         
     @abstractmethod
-    async def get_payment_by_transaction_id(self, transaction_id: str) -> Optional[Payment]:
+    async def get_payment_by_transaction_id(self, transaction_id: str, for_update: bool = False) -> Optional[Payment]:
         pass
\ No newline at end of file
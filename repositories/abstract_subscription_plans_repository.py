@@ -23,6 +23,14 @@ class AbstractSubscriptionPlanRepository(BaseRepository, ABC):
     async def get_all_subscription_plans(self, active_only: bool = False) -> List[SubscriptionPlan]:
         pass
 
+    @abstractmethod
+    async def get_subscription_plan_with_catalog(self, plan_id: str) -> Optional[SubscriptionPlan]:
+        pass
+
+    @abstractmethod
+    async def get_all_subscription_plans_with_catalog(self, active_only: bool = False) -> List[SubscriptionPlan]:
+        pass
+
     @abstractmethod
     async def update_subscription_plan(self, plan_id: str, **kwargs) -> Optional[SubscriptionPlan]:
         pass
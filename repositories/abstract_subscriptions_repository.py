@@ -1,8 +1,10 @@
 from abc import ABC, abstractmethod
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, List, AsyncIterator, Dict, Any, Sequence
+import uuid
+from datetime import datetime, timedelta
 from models.subscriptions import Subscription, SubscriptionStatus
 from repositories.base_repository import BaseRepository
+from repositories.pagination import Page, DEFAULT_PAGE_SIZE
 
 class AbstractSubscriptionRepository(BaseRepository, ABC):
     """
@@ -21,17 +23,26 @@ class AbstractSubscriptionRepository(BaseRepository, ABC):
         pass
 
     @abstractmethod
-    async def get_user_subscriptions(self, customer_id: str, active_only: bool = False) -> List[Subscription]:
+    async def get_user_subscriptions(self, customer_id: str, active_only: bool = False,
+                                     limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Page:
         pass
 
     @abstractmethod
-    async def get_plan_subscriptions(self, plan_id: str) -> List[Subscription]:
+    async def get_plan_subscriptions(self, plan_id: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Page:
+        pass
+
+    @abstractmethod
+    def stream_subscriptions(self) -> AsyncIterator[Dict[str, Any]]:
         pass
 
     @abstractmethod
     async def update_subscription(self, subscription_id: str, **kwargs) -> Optional[Subscription]:
         pass
 
+    @abstractmethod
+    async def extend_subscription(self, subscription_id: str, period: timedelta) -> Optional[Subscription]:
+        pass
+
     @abstractmethod
     async def delete_subscription(self, subscription_id: str) -> bool:
         pass
@@ -57,5 +68,19 @@ class AbstractSubscriptionRepository(BaseRepository, ABC):
         pass
     
     @abstractmethod
-    async def get_active_subscription_for_user(self, customer_id: str) -> Optional[Subscription]:
-        pass
\ No newline at end of file
+    async def get_active_subscription_for_user(self, customer_id: str,
+                                              for_update: bool = False) -> Optional[Subscription]:
+        pass
+
+    @abstractmethod
+    async def get_active_subscriptions_for_users(self, customer_ids: Sequence[uuid.UUID] = (),
+                                                 telegram_ids: Sequence[int] = ()) -> List[Any]:
+        pass
+
+    @abstractmethod
+    async def get_expiry_lag(self) -> float:
+        pass
+
+    @abstractmethod
+    async def expire_due_subscriptions(self, limit: int) -> List[Any]:
+        pass
@@ -1,7 +1,9 @@
 from abc import ABC, abstractmethod
-from typing import Optional, List
+from typing import Optional, List, AsyncIterator, Dict, Any
 from models.users import User, Referals, Sources
+import uuid
 from repositories.base_repository import BaseRepository
+from repositories.pagination import Page, DEFAULT_PAGE_SIZE
 
 class AbstractUserRepository(BaseRepository, ABC):
     """
@@ -12,7 +14,12 @@ class AbstractUserRepository(BaseRepository, ABC):
     @abstractmethod
     async def create_user(self, username: str, email: Optional[str] = None, 
                    telegram_id: Optional[int] = None, password: Optional[str] = None, 
-                   is_admin: bool = False) -> User:
+                   is_admin: bool = False) -> Optional[User]:
+        pass
+
+    @abstractmethod
+    async def get_conflicting_user(self, username: str, email: Optional[str] = None,
+                                   telegram_id: Optional[int] = None) -> Optional[User]:
         pass
 
     @abstractmethod
@@ -27,12 +34,24 @@ class AbstractUserRepository(BaseRepository, ABC):
     async def get_user_by_email(self, email: str) -> Optional[User]:
         pass
     
+    @abstractmethod
+    async def get_user_by_username_or_email(self, login: str) -> Optional[User]:
+        pass
+    
     @abstractmethod
     async def get_user_by_telegram_id(self, telegram_id: int) -> Optional[User]:
         pass
 
     @abstractmethod
-    async def get_all_users(self) -> List[User]:
+    async def get_user_id_by_telegram_id(self, telegram_id: int) -> Optional[uuid.UUID]:
+        pass
+
+    @abstractmethod
+    async def get_all_users(self, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Page:
+        pass
+
+    @abstractmethod
+    def stream_users(self) -> AsyncIterator[Dict[str, Any]]:
         pass
 
     @abstractmethod
@@ -49,7 +68,7 @@ class AbstractUserRepository(BaseRepository, ABC):
         pass
     
     @abstractmethod
-    async def get_user_referals(self, parent_id: str) -> List[Referals]:
+    async def get_user_referals(self, parent_id: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Page:
         pass
     
     # Методы для работы с источниками
@@ -66,5 +85,5 @@ class AbstractUserRepository(BaseRepository, ABC):
         pass
     
     @abstractmethod
-    async def get_all_sources(self) -> List[Sources]:
+    async def get_all_sources(self, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Page:
         pass
\ No newline at end of file
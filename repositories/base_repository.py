@@ -1,10 +1,94 @@
 from abc import ABC, abstractmethod
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+from sqlalchemy import select, update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from database import after_commit, in_unit_of_work
+from repositories.pagination import Page, encode_cursor, decode_cursor
+
+# Сколько строк за раз забирается из серверного курсора при выгрузках
+STREAM_BATCH_SIZE = 1000
+
 class BaseRepository(ABC):
     """
     Абстрактный базовый класс для всех репозиториев.
     Определяет общий интерфейс и функциональность для работы с базой данных.
     """
     def __init__(self, db: AsyncSession):
-        self.db = db
\ No newline at end of file
+        self.db = db
+
+    async def _commit(self):
+        """
+        Фиксирует изменения. Внутри UnitOfWork только отправляет их в базу,
+        commit выполнит сам UnitOfWork.
+        """
+        if in_unit_of_work(self.db):
+            await self.db.flush()
+        else:
+            await self.db.commit()
+
+    async def _invalidate(self, invalidate: Callable[..., Awaitable[None]], *args):
+        """
+        Сбрасывает кэш вызовом invalidate(*args) сразу и еще раз после
+        фиксации: иначе чтение между ними вернет в кэш старые данные
+        """
+        await invalidate(*args)
+        await after_commit(self.db, partial(invalidate, *args))
+
+    async def _update(self, model, object_id, values: Dict[str, Any]):
+        """
+        Обновляет запись одним запросом UPDATE ... RETURNING и возвращает ее.
+        Значения для несуществующих колонок игнорируются.
+        """
+        values = {key: value for key, value in values.items() if key in model.__table__.c}
+        if not values:
+            result = await self.db.execute(select(model).where(model.id == object_id))
+            return result.scalars().first()
+
+        result = await self.db.scalars(
+            update(model)
+            .where(model.id == object_id)
+            .values(**values)
+            .returning(model)
+            .execution_options(populate_existing=True)
+        )
+        instance = result.first()
+        await self._commit()
+        return instance
+
+    async def _delete(self, model, object_id) -> bool:
+        """
+        Удаляет запись одним запросом DELETE ... RETURNING
+        """
+        result = await self.db.execute(delete(model).where(model.id == object_id).returning(model.id))
+        deleted = result.first() is not None
+        await self._commit()
+        return deleted
+
+    async def _paginate(self, query, key_column, limit: int, cursor: Optional[str] = None) -> Page:
+        """
+        Keyset-пагинация по уникальной колонке key_column: вместо OFFSET
+        следующая страница начинается сразу после ключа из курсора.
+        """
+        if cursor:
+            query = query.where(key_column > decode_cursor(cursor, key_column))
+
+        result = await self.db.execute(query.order_by(key_column).limit(limit + 1))
+        items = result.scalars().all()
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_cursor(getattr(items[-1], key_column.key))
+        return Page(items=items, next_cursor=next_cursor)
+
+    async def _stream(self, query, batch_size: int = STREAM_BATCH_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Читает результат запроса через серверный курсор порциями по batch_size строк.
+        Строки отдаются словарями без создания ORM-объектов, поэтому расход памяти
+        не зависит от размера таблицы.
+        """
+        result = await self.db.stream(query.execution_options(yield_per=batch_size))
+        async for row in result.mappings():
+            yield dict(row)
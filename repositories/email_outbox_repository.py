@@ -0,0 +1,92 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, func
+from models.email_outbox import EmailOutbox, EmailOutboxStatus
+from typing import Optional, List, Any, Dict
+from datetime import timedelta
+
+from repositories.abstract_email_outbox_repository import AbstractEmailOutboxRepository
+
+# Длина сохраняемого текста ошибки отправки
+MAX_ERROR_LENGTH = 1000
+
+class EmailOutboxRepository(AbstractEmailOutboxRepository):
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def add_email(self, kind: str, recipient: str, payload: Dict[str, Any]) -> EmailOutbox:
+        email = EmailOutbox(kind=kind, recipient=recipient, payload=payload,
+                            status=EmailOutboxStatus.PENDING)
+        self.db.add(email)
+        await self._commit()
+        return email
+
+    async def claim_due(self, limit: int, lease_seconds: float) -> List[Any]:
+        """
+        Берет в работу до limit писем, время отправки которых наступило.
+        Аренда — перенос next_attempt_at на lease_seconds вперед: если воркер
+        упадет, письмо снова станет доступным после ее окончания. Строки,
+        заблокированные другим воркером, пропускаются (SKIP LOCKED).
+        Фиксирует вызывающий
+        """
+        due = select(EmailOutbox.id)\
+            .where(EmailOutbox.status == EmailOutboxStatus.PENDING)\
+            .where(EmailOutbox.next_attempt_at <= func.now())\
+            .order_by(EmailOutbox.next_attempt_at)\
+            .limit(limit)\
+            .with_for_update(skip_locked=True)
+        result = await self.db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(due.scalar_subquery()))
+            .values(
+                attempts=EmailOutbox.attempts + 1,
+                next_attempt_at=func.now() + timedelta(seconds=lease_seconds),
+            )
+            .returning(EmailOutbox.id, EmailOutbox.kind, EmailOutbox.recipient, EmailOutbox.payload,
+                       EmailOutbox.attempts, EmailOutbox.created_at)
+            .execution_options(synchronize_session=False)
+        )
+        return result.all()
+
+    async def mark_sent(self, email_ids: List[Any]) -> None:
+        if not email_ids:
+            return
+        await self.db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(email_ids))
+            .values(status=EmailOutboxStatus.SENT, sent_at=func.now(), last_error=None)
+            .execution_options(synchronize_session=False)
+        )
+        await self._commit()
+
+    async def mark_failed(self, email_id: Any, error: str, retry_in: Optional[float]) -> None:
+        """
+        Записывает ошибку отправки. retry_in — через сколько секунд повторить,
+        None — попытки исчерпаны
+        """
+        values = {'last_error': error[:MAX_ERROR_LENGTH]}
+        if retry_in is None:
+            values['status'] = EmailOutboxStatus.FAILED
+        else:
+            values['next_attempt_at'] = func.now() + timedelta(seconds=retry_in)
+        await self.db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id == email_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await self._commit()
+
+    async def get_queue_stats(self) -> Any:
+        """
+        Число неотправленных писем и возраст самого старого из них в секундах
+        """
+        result = await self.db.execute(
+            select(
+                func.count(EmailOutbox.id).label('pending'),
+                func.coalesce(
+                    func.extract('epoch', func.now() - func.min(EmailOutbox.created_at)), 0
+                ).label('oldest_age'),
+            )
+            .where(EmailOutbox.status == EmailOutboxStatus.PENDING)
+        )
+        return result.one()
@@ -0,0 +1,41 @@
+import base64
+import binascii
+import json
+from typing import Any, List, NamedTuple, Optional
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class Page(NamedTuple):
+    """
+    Страница результатов keyset-пагинации.
+    next_cursor равен None, если это последняя страница.
+    """
+    items: List[Any]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(value) -> str:
+    """
+    Кодирует значение ключа последней записи страницы в непрозрачный курсор
+    """
+    raw = json.dumps({"k": str(value)}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key_column):
+    """
+    Декодирует курсор в значение ключа с типом колонки key_column
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value = json.loads(raw)["k"]
+        return key_column.type.python_type(value)
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursor("Invalid cursor")
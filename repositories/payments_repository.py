@@ -1,11 +1,12 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from models.payments import Payment, PaymentMethod
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator
 from datetime import datetime
 import json
 
 from repositories.abstract_payments_repository import AbstractPaymentRepository
+from repositories.pagination import Page, DEFAULT_PAGE_SIZE
 
 class PaymentRepository(AbstractPaymentRepository):
     def __init__(self, db: AsyncSession):
@@ -27,39 +28,30 @@ class PaymentRepository(AbstractPaymentRepository):
             payment_metadata=json.dumps(metadata) if metadata else None
         )
         self.db.add(payment)
-        await self.db.commit()
-        await self.db.refresh(payment)
+        await self._commit()
         return payment
 
     async def get_payment(self, payment_id: str) -> Optional[Payment]:
         result = await self.db.execute(select(Payment).where(Payment.id == payment_id))
         return result.scalars().first()
 
-    async def get_user_payments(self, user_id: str) -> List[Payment]:
-        result = await self.db.execute(select(Payment).where(Payment.user_id == user_id))
-        return result.scalars().all()
+    async def get_user_payments(self, user_id: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Page:
+        query = select(Payment).where(Payment.user_id == user_id)
+        return await self._paginate(query, Payment.id, limit, cursor)
+
+    async def stream_payments(self) -> AsyncIterator[Dict[str, Any]]:
+        async for row in self._stream(select(Payment.__table__)):
+            yield row
 
     async def update_payment(self, payment_id: str, **kwargs) -> Optional[Payment]:
-        payment = await self.get_payment(payment_id)
-        if payment:
-            for key, value in kwargs.items():
-                setattr(payment, key, value)
-            payment.last_update = datetime.utcnow()
-            await self.db.commit()
-            await self.db.refresh(payment)
-        return payment
+        return await self._update(Payment, payment_id, {**kwargs, "last_update": datetime.utcnow()})
 
     async def delete_payment(self, payment_id: str) -> bool:
-        payment = await self.get_payment(payment_id)
-        if payment:
-            await self.db.delete(payment)
-            await self.db.commit()
-            return True
-        return False
+        return await self._delete(Payment, payment_id)
 
-    async def get_user_payment_methods(self, user_id: str) -> List[PaymentMethod]:
-        result = await self.db.execute(select(PaymentMethod).where(PaymentMethod.user == user_id))
-        return result.scalars().all()
+    async def get_user_payment_methods(self, user_id: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Page:
+        query = select(PaymentMethod).where(PaymentMethod.user == user_id)
+        return await self._paginate(query, PaymentMethod.id, limit, cursor)
 
     async def add_payment_method(self, user_id: str, method_name: str, method_id: str) -> PaymentMethod:
         payment_method = PaymentMethod(
@@ -68,10 +60,13 @@ class PaymentRepository(AbstractPaymentRepository):
             method_id=method_id
         )
         self.db.add(payment_method)
-        await self.db.commit()
-        await self.db.refresh(payment_method)
+        await self._commit()
         return payment_method
         
-    async def get_payment_by_transaction_id(self, transaction_id: str) -> Optional[Payment]:
-        result = await self.db.execute(select(Payment).where(Payment.transaction_id == transaction_id))
+    async def get_payment_by_transaction_id(self, transaction_id: str, for_update: bool = False) -> Optional[Payment]:
+        query = select(Payment).where(Payment.transaction_id == transaction_id)
+        if for_update:
+            # Блокировка строки до конца транзакции: параллельные обработчики одного платежа ждут друг друга
+            query = query.with_for_update().execution_options(populate_existing=True)
+        result = await self.db.execute(query)
         return result.scalars().first()
\ No newline at end of file
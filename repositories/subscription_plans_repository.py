@@ -1,5 +1,6 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 from models.subscription_plans import SubscriptionPlan, Quota, Price, ResourceType
 from typing import Optional, List, Dict, Any
 from datetime import datetime
@@ -23,8 +24,7 @@ class SubscriptionPlanRepository(AbstractSubscriptionPlanRepository):
             transfer_plan_id=transfer_plan_id
         )
         self.db.add(subscription_plan)
-        await self.db.commit()
-        await self.db.refresh(subscription_plan)
+        await self._commit()
         return subscription_plan
 
     async def get_subscription_plan(self, plan_id: str) -> Optional[SubscriptionPlan]:
@@ -38,23 +38,29 @@ class SubscriptionPlanRepository(AbstractSubscriptionPlanRepository):
         result = await self.db.execute(query)
         return result.scalars().all()
 
+    # Загрузка планов вместе с квотами и ценами: фиксированное число запросов
+    # (планы + квоты + цены) независимо от количества планов
+    def _catalog_query(self):
+        return select(SubscriptionPlan)\
+            .options(selectinload(SubscriptionPlan.quotas), selectinload(SubscriptionPlan.prices))\
+            .execution_options(populate_existing=True)
+
+    async def get_subscription_plan_with_catalog(self, plan_id: str) -> Optional[SubscriptionPlan]:
+        result = await self.db.execute(self._catalog_query().where(SubscriptionPlan.id == plan_id))
+        return result.scalars().first()
+
+    async def get_all_subscription_plans_with_catalog(self, active_only: bool = False) -> List[SubscriptionPlan]:
+        query = self._catalog_query()
+        if active_only:
+            query = query.where(SubscriptionPlan.is_active == True)
+        result = await self.db.execute(query)
+        return result.scalars().all()
+
     async def update_subscription_plan(self, plan_id: str, **kwargs) -> Optional[SubscriptionPlan]:
-        plan = await self.get_subscription_plan(plan_id)
-        if plan:
-            for key, value in kwargs.items():
-                setattr(plan, key, value)
-            plan.updated_at = datetime.utcnow()
-            await self.db.commit()
-            await self.db.refresh(plan)
-        return plan
+        return await self._update(SubscriptionPlan, plan_id, {**kwargs, "updated_at": datetime.utcnow()})
 
     async def delete_subscription_plan(self, plan_id: str) -> bool:
-        plan = await self.get_subscription_plan(plan_id)
-        if plan:
-            await self.db.delete(plan)
-            await self.db.commit()
-            return True
-        return False
+        return await self._delete(SubscriptionPlan, plan_id)
     
     # Методы для работы с квотами
     async def add_quota(self, plan_id: str, resource_type: ResourceType, limit: int, 
@@ -66,8 +72,7 @@ class SubscriptionPlanRepository(AbstractSubscriptionPlanRepository):
             constraints=constraints or {}
         )
         self.db.add(quota)
-        await self.db.commit()
-        await self.db.refresh(quota)
+        await self._commit()
         return quota
     
     async def get_plan_quotas(self, plan_id: str) -> List[Quota]:
@@ -75,23 +80,10 @@ class SubscriptionPlanRepository(AbstractSubscriptionPlanRepository):
         return result.scalars().all()
     
     async def update_quota(self, quota_id: str, **kwargs) -> Optional[Quota]:
-        result = await self.db.execute(select(Quota).where(Quota.id == quota_id))
-        quota = result.scalars().first()
-        if quota:
-            for key, value in kwargs.items():
-                setattr(quota, key, value)
-            await self.db.commit()
-            await self.db.refresh(quota)
-        return quota
+        return await self._update(Quota, quota_id, kwargs)
     
     async def delete_quota(self, quota_id: str) -> bool:
-        result = await self.db.execute(select(Quota).where(Quota.id == quota_id))
-        quota = result.scalars().first()
-        if quota:
-            await self.db.delete(quota)
-            await self.db.commit()
-            return True
-        return False
+        return await self._delete(Quota, quota_id)
     
     # Методы для работы с ценами
     async def add_price(self, plan_id: str, amount: float, currency: str) -> Price:
@@ -101,8 +93,7 @@ class SubscriptionPlanRepository(AbstractSubscriptionPlanRepository):
             currency=currency
         )
         self.db.add(price)
-        await self.db.commit()
-        await self.db.refresh(price)
+        await self._commit()
         return price
     
     async def get_plan_prices(self, plan_id: str) -> List[Price]:
@@ -110,20 +101,7 @@ class SubscriptionPlanRepository(AbstractSubscriptionPlanRepository):
         return result.scalars().all()
     
     async def update_price(self, price_id: str, **kwargs) -> Optional[Price]:
-        result = await self.db.execute(select(Price).where(Price.id == price_id))
-        price = result.scalars().first()
-        if price:
-            for key, value in kwargs.items():
-                setattr(price, key, value)
-            await self.db.commit()
-            await self.db.refresh(price)
-        return price
+        return await self._update(Price, price_id, kwargs)
     
     async def delete_price(self, price_id: str) -> bool:
-        result = await self.db.execute(select(Price).where(Price.id == price_id))
-        price = result.scalars().first()
-        if price:
-            await self.db.delete(price)
-            await self.db.commit()
-            return True
-        return False
\ No newline at end of file
+        return await self._delete(Price, price_id)
\ No newline at end of file
@@ -1,10 +1,90 @@
+import json
+import logging
+from redis.exceptions import RedisError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, func, or_, any_, bindparam, BigInteger
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, TIMESTAMP
 from models.subscriptions import Subscription, SubscriptionStatus
-from typing import Optional, List
-from datetime import datetime
+from models.users import User
+from typing import Optional, List, AsyncIterator, Dict, Any, Sequence
+from datetime import datetime, timedelta, timezone
 import uuid
+from config import SubscriptionCacheConfig
+from database import in_unit_of_work, on_primary
+from dependencies import redis_client
 from repositories.abstract_subscriptions_repository import AbstractSubscriptionRepository
+from repositories.pagination import Page, DEFAULT_PAGE_SIZE
+
+logger = logging.getLogger("subscriptions_cache")
+
+ACTIVE_SUBSCRIPTION_KEY = 'subscription:active:{customer_id}'
+
+
+def _dump_subscription(subscription: Subscription) -> str:
+    data = {}
+    for column in Subscription.__table__.c:
+        value = getattr(subscription, column.key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, SubscriptionStatus):
+            value = value.name
+        elif value is not None and not isinstance(value, (str, int, float)):
+            value = str(value)
+        data[column.key] = value
+    return json.dumps(data)
+
+
+def _load_subscription(raw: str) -> Subscription:
+    # Объект не привязан к сессии: только для чтения и передачи в запросы по id
+    data = json.loads(raw)
+    values = {}
+    for column in Subscription.__table__.c:
+        value = data.get(column.key)
+        if value is not None:
+            if isinstance(column.type, UUID):
+                value = uuid.UUID(value)
+            elif column.key == 'status':
+                value = SubscriptionStatus[value]
+            elif isinstance(column.type, TIMESTAMP):
+                value = datetime.fromisoformat(value)
+        values[column.key] = value
+    return Subscription(**values)
+
+
+def _cache_key(customer_id) -> str:
+    try:
+        customer_id = uuid.UUID(str(customer_id))
+    except ValueError:
+        pass
+    return ACTIVE_SUBSCRIPTION_KEY.format(customer_id=customer_id)
+
+
+async def invalidate_active_subscription(customer_id):
+    """
+    Сбрасывает закэшированную активную подписку пользователя
+    """
+    try:
+        await redis_client.delete(_cache_key(customer_id))
+    except RedisError as e:
+        logger.warning("Не удалось сбросить кэш подписки %s: %s", customer_id, e)
+
+
+def active_subscription_query(customer_id):
+    """
+    Активная подписка пользователя с самым поздним ends_at.
+    Статус подставляется в SQL литералом: с параметром в обобщенном плане
+    подготовленного запроса не совпадет условие частичного индекса
+    ix_subscriptions_customer_active
+    """
+    return select(Subscription)\
+        .where(Subscription.customer_id == customer_id)\
+        .where(Subscription.status == bindparam('active_status', SubscriptionStatus.ACTIVE,
+                                                type_=Subscription.status.type, literal_execute=True))\
+        .where(Subscription.ends_at > datetime.utcnow())\
+        .where(Subscription.deleted_at.is_(None))\
+        .order_by(Subscription.ends_at.desc())\
+        .limit(1)
+
 
 class SubscriptionRepository(AbstractSubscriptionRepository):
     def __init__(self, db: AsyncSession):
@@ -23,41 +103,43 @@ class SubscriptionRepository(AbstractSubscriptionRepository):
             status=status
         )
         self.db.add(subscription)
-        await self.db.commit()
-        await self.db.refresh(subscription)
+        await self._commit()
+        await self._invalidate(invalidate_active_subscription, customer_id)
         return subscription
 
     async def get_subscription(self, subscription_id: str) -> Optional[Subscription]:
         result = await self.db.execute(select(Subscription).where(Subscription.id == subscription_id))
         return result.scalars().first()
 
-    async def get_user_subscriptions(self, customer_id: str, active_only: bool = False) -> List[Subscription]:
+    async def get_user_subscriptions(self, customer_id: str, active_only: bool = False,
+                                     limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Page:
         query = select(Subscription).where(Subscription.customer_id == customer_id)
         if active_only:
             query = query.where(Subscription.status == SubscriptionStatus.ACTIVE)
-        result = await self.db.execute(query)
-        return result.scalars().all()
+        return await self._paginate(query, Subscription.id, limit, cursor)
+
+    async def get_plan_subscriptions(self, plan_id: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Page:
+        query = select(Subscription).where(Subscription.plan_id == plan_id)
+        return await self._paginate(query, Subscription.id, limit, cursor)
 
-    async def get_plan_subscriptions(self, plan_id: str) -> List[Subscription]:
-        result = await self.db.execute(select(Subscription).where(Subscription.plan_id == plan_id))
-        return result.scalars().all()
+    async def stream_subscriptions(self) -> AsyncIterator[Dict[str, Any]]:
+        async for row in self._stream(select(Subscription.__table__)):
+            yield row
 
     async def update_subscription(self, subscription_id: str, **kwargs) -> Optional[Subscription]:
-        subscription = await self.get_subscription(subscription_id)
-        if subscription:
-            for key, value in kwargs.items():
-                setattr(subscription, key, value)
-            await self.db.commit()
-            await self.db.refresh(subscription)
+        subscription = await self._update(Subscription, subscription_id, kwargs)
+        if subscription is not None:
+            await self._invalidate(invalidate_active_subscription, subscription.customer_id)
         return subscription
 
+    async def extend_subscription(self, subscription_id: str, period: timedelta) -> Optional[Subscription]:
+        # Новый срок считается в самом UPDATE (ends_at = ends_at + period),
+        # поэтому параллельные продления не затирают друг друга
+        return await self.update_subscription(subscription_id, ends_at=Subscription.ends_at + period)
+
     async def delete_subscription(self, subscription_id: str) -> bool:
-        subscription = await self.get_subscription(subscription_id)
-        if subscription:
-            subscription.deleted_at = datetime.utcnow()
-            await self.db.commit()
-            return True
-        return False
+        subscription = await self.update_subscription(subscription_id, deleted_at=datetime.utcnow())
+        return subscription is not None
     
     async def activate_subscription(self, subscription_id: str) -> Optional[Subscription]:
         return await self.update_subscription(subscription_id, status=SubscriptionStatus.ACTIVE)
@@ -90,10 +172,109 @@ class SubscriptionRepository(AbstractSubscriptionRepository):
             cancelled_at=datetime.utcnow()
         )
     
-    async def get_active_subscription_for_user(self, customer_id: str) -> Optional[Subscription]:
-        query = select(Subscription)\
-            .where(Subscription.customer_id == customer_id)\
+    async def get_active_subscription_for_user(self, customer_id: str,
+                                              for_update: bool = False) -> Optional[Subscription]:
+        """
+        Активная подписка пользователя через кэш в Redis. Запись живет до
+        ends_at (но не дольше MAX_TTL), отсутствие подписки — NEGATIVE_TTL.
+        Если Redis недоступен, запрос идет в базу.
+
+        Кэш только для чтения: внутри UnitOfWork и с for_update подписка
+        читается из основной базы в обход кэша (for_update — с блокировкой
+        строки до конца транзакции), чтобы изменения строились на текущих
+        данных, а не на отсоединенной копии
+        """
+        if for_update or in_unit_of_work(self.db):
+            return await self._get_active_subscription_for_user(customer_id, for_update=for_update)
+
+        key = _cache_key(customer_id)
+        try:
+            cached = await redis_client.get(key)
+            if cached is not None:
+                return _load_subscription(cached) if cached else None
+        except RedisError as e:
+            logger.warning("Кэш подписок недоступен: %s", e)
+
+        subscription = await self._get_active_subscription_for_user(customer_id)
+
+        try:
+            if subscription is None:
+                await redis_client.set(key, '', ex=SubscriptionCacheConfig.NEGATIVE_TTL)
+            else:
+                ends_at = subscription.ends_at
+                if ends_at.tzinfo is None:
+                    ends_at = ends_at.replace(tzinfo=timezone.utc)
+                ttl = min(int((ends_at - datetime.now(timezone.utc)).total_seconds()), SubscriptionCacheConfig.MAX_TTL)
+                if ttl > 0:
+                    await redis_client.set(key, _dump_subscription(subscription), ex=ttl)
+        except RedisError as e:
+            logger.warning("Не удалось записать подписку в кэш: %s", e)
+        return subscription
+
+    async def _get_active_subscription_for_user(self, customer_id: str,
+                                                for_update: bool = False) -> Optional[Subscription]:
+        query = active_subscription_query(customer_id)
+        if for_update:
+            query = query.with_for_update()
+        # Только основная база: отстающая реплика вернула бы подписку до
+        # последнего изменения, и в кэше она хранилась бы до MAX_TTL.
+        # Остальные запросы сессии по-прежнему идут на реплику
+        result = await self.db.execute(on_primary(query))
+        return result.scalars().first()
+
+    async def get_active_subscriptions_for_users(self, customer_ids: Sequence[uuid.UUID] = (),
+                                                 telegram_ids: Sequence[int] = ()) -> List[Any]:
+        """
+        Активные подписки сразу для многих пользователей одним запросом.
+        Идентификаторы передаются массивами (= ANY), по одной подписке
+        с самым поздним ends_at на пользователя
+        """
+        query = select(Subscription.customer_id, User.telegram_id, Subscription.plan_id, Subscription.ends_at)\
+            .join(User, User.id == Subscription.customer_id)\
+            .where(or_(
+                Subscription.customer_id == any_(bindparam('customer_ids', list(customer_ids), type_=ARRAY(UUID(as_uuid=True)))),
+                # Условие тоже по customer_id, чтобы оба варианта шли по индексу подписок
+                Subscription.customer_id.in_(
+                    select(User.id).where(User.telegram_id == any_(bindparam('telegram_ids', list(telegram_ids), type_=ARRAY(BigInteger))))
+                ),
+            ))\
             .where(Subscription.status == SubscriptionStatus.ACTIVE)\
-            .where(Subscription.ends_at > datetime.utcnow())
+            .where(Subscription.ends_at > datetime.utcnow())\
+            .where(Subscription.deleted_at.is_(None))\
+            .distinct(Subscription.customer_id)\
+            .order_by(Subscription.customer_id, Subscription.ends_at.desc())
         result = await self.db.execute(query)
-        return result.scalars().first()
\ No newline at end of file
+        return result.all()
+
+    async def get_expiry_lag(self) -> float:
+        """
+        Сколько секунд назад истекла самая старая еще активная подписка
+        (0, если таких нет). Идет по индексу ix_subscriptions_status_ends_at
+        """
+        result = await self.db.execute(
+            select(func.coalesce(func.extract('epoch', func.now() - func.min(Subscription.ends_at)), 0))
+            .where(Subscription.status == SubscriptionStatus.ACTIVE)
+            .where(Subscription.ends_at <= func.now())
+        )
+        return float(result.scalar())
+
+    async def expire_due_subscriptions(self, limit: int) -> List[Any]:
+        """
+        Переводит в EXPIRED до limit активных подписок с прошедшим ends_at
+        одним UPDATE ... RETURNING. Строки, заблокированные другим
+        обработчиком, пропускаются (SKIP LOCKED). Фиксирует вызывающий
+        """
+        due = select(Subscription.id)\
+            .where(Subscription.status == SubscriptionStatus.ACTIVE)\
+            .where(Subscription.ends_at <= func.now())\
+            .order_by(Subscription.ends_at)\
+            .limit(limit)\
+            .with_for_update(skip_locked=True)
+        result = await self.db.execute(
+            update(Subscription)
+            .where(Subscription.id.in_(due.scalar_subquery()))
+            .values(status=SubscriptionStatus.EXPIRED)
+            .returning(Subscription.id, Subscription.customer_id, Subscription.plan_id, Subscription.ends_at)
+            .execution_options(synchronize_session=False)
+        )
+        return result.all()
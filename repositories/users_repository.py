@@ -1,11 +1,38 @@
+import logging
+from redis.exceptions import RedisError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, delete, or_
+from sqlalchemy.dialects.postgresql import insert
 from models.users import User, Referals, Sources
-from typing import Optional, List
+from typing import Optional, List, AsyncIterator, Dict, Any
 from datetime import datetime
 import uuid
 
+from dependencies import redis_client
 from repositories.abstract_users_repository import AbstractUserRepository
+from repositories.pagination import Page, DEFAULT_PAGE_SIZE
+
+logger = logging.getLogger("users_cache")
+
+# Соответствие telegram_id пользователю, кэширует EntitlementService
+TELEGRAM_USER_KEY = 'entitlements:telegram:{telegram_id}'
+
+# Колонки выгрузки пользователей: хеш пароля в нее не попадает
+STREAM_COLUMNS = [column for column in User.__table__.c if column.key != 'password']
+
+
+async def invalidate_telegram_user(*telegram_ids):
+    """
+    Сбрасывает закэшированного пользователя для указанных telegram_id
+    """
+    keys = [TELEGRAM_USER_KEY.format(telegram_id=telegram_id) for telegram_id in telegram_ids if telegram_id]
+    if not keys:
+        return
+    try:
+        await redis_client.delete(*keys)
+    except RedisError as e:
+        logger.warning("Не удалось сбросить кэш пользователей %s: %s", telegram_ids, e)
+
 
 class UserRepository(AbstractUserRepository):
     def __init__(self, db: AsyncSession):
@@ -13,19 +40,35 @@ class UserRepository(AbstractUserRepository):
 
     async def create_user(self, username: str, email: Optional[str] = None, 
                    telegram_id: Optional[int] = None, password: Optional[str] = None, 
-                   is_admin: bool = False) -> User:
-        user = User(
-            username=username,
-            email=email,
-            telegram_id=telegram_id,
-            password=password,
-            is_admin=is_admin
+                   is_admin: bool = False) -> Optional[User]:
+        # Один запрос INSERT ... ON CONFLICT DO NOTHING RETURNING вместо проверок перед вставкой.
+        # Если пользователь с такими уникальными полями уже есть, возвращается None
+        result = await self.db.scalars(
+            insert(User)
+            .values(
+                username=username,
+                email=email,
+                telegram_id=telegram_id,
+                password=password,
+                is_admin=is_admin
+            )
+            .on_conflict_do_nothing()
+            .returning(User)
         )
-        self.db.add(user)
-        await self.db.commit()
-        await self.db.refresh(user)
+        user = result.first()
+        await self._commit()
         return user
 
+    async def get_conflicting_user(self, username: str, email: Optional[str] = None,
+                                   telegram_id: Optional[int] = None) -> Optional[User]:
+        conditions = [User.username == username]
+        if email:
+            conditions.append(User.email == email)
+        if telegram_id:
+            conditions.append(User.telegram_id == telegram_id)
+        result = await self.db.execute(select(User).filter(or_(*conditions)).limit(1))
+        return result.scalars().first()
+
     async def get_user(self, user_id: str) -> Optional[User]:
         result = await self.db.execute(select(User).filter(User.id == user_id))
         return result.scalars().first()
@@ -38,30 +81,51 @@ class UserRepository(AbstractUserRepository):
         result = await self.db.execute(select(User).filter(User.email == email))
         return result.scalars().first()
     
+    async def get_user_by_username_or_email(self, login: str) -> Optional[User]:
+        # Совпадение по username приоритетнее совпадения по email
+        result = await self.db.execute(
+            select(User)
+            .filter(or_(User.username == login, User.email == login))
+            .order_by((User.username == login).desc())
+            .limit(1)
+        )
+        return result.scalars().first()
+    
     async def get_user_by_telegram_id(self, telegram_id: int) -> Optional[User]:
         result = await self.db.execute(select(User).filter(User.telegram_id == telegram_id))
         return result.scalars().first()
 
-    async def get_all_users(self) -> List[User]:
-        result = await self.db.execute(select(User))
-        return result.scalars().all()
+    async def get_user_id_by_telegram_id(self, telegram_id: int) -> Optional[uuid.UUID]:
+        result = await self.db.execute(select(User.id).filter(User.telegram_id == telegram_id))
+        return result.scalars().first()
+
+    async def get_all_users(self, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Page:
+        return await self._paginate(select(User), User.id, limit, cursor)
+
+    async def stream_users(self) -> AsyncIterator[Dict[str, Any]]:
+        async for row in self._stream(select(*STREAM_COLUMNS)):
+            yield row
 
     async def update_user(self, user_id: str, **kwargs) -> Optional[User]:
-        user = await self.get_user(user_id)
-        if user:
-            for key, value in kwargs.items():
-                setattr(user, key, value)
-            await self.db.commit()
-            await self.db.refresh(user)
+        # При смене telegram_id сбрасывается и прежнее соответствие
+        previous_telegram_id = None
+        if 'telegram_id' in kwargs:
+            result = await self.db.execute(select(User.telegram_id).where(User.id == user_id))
+            previous_telegram_id = result.scalar()
+
+        user = await self._update(User, user_id, kwargs)
+        if user is not None:
+            await self._invalidate(invalidate_telegram_user, previous_telegram_id, user.telegram_id)
         return user
 
     async def delete_user(self, user_id: str) -> bool:
-        user = await self.get_user(user_id)
-        if user:
-            await self.db.delete(user)
-            await self.db.commit()
-            return True
-        return False
+        result = await self.db.execute(delete(User).where(User.id == user_id).returning(User.telegram_id))
+        deleted = result.first()
+        await self._commit()
+        if deleted is None:
+            return False
+        await self._invalidate(invalidate_telegram_user, deleted.telegram_id)
+        return True
     
     # Методы для работы с рефералами
     async def create_referal(self, parent_id: str, child_id: str) -> Referals:
@@ -70,20 +134,18 @@ class UserRepository(AbstractUserRepository):
             child=child_id
         )
         self.db.add(referal)
-        await self.db.commit()
-        await self.db.refresh(referal)
+        await self._commit()
         return referal
     
-    async def get_user_referals(self, parent_id: str) -> List[Referals]:
-        result = await self.db.execute(select(Referals).filter(Referals.parent == parent_id))
-        return result.scalars().all()
+    async def get_user_referals(self, parent_id: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Page:
+        query = select(Referals).filter(Referals.parent == parent_id)
+        return await self._paginate(query, Referals.id, limit, cursor)
     
     # Методы для работы с источниками
     async def create_source(self, name: str) -> Sources:
         source = Sources(name=name)
         self.db.add(source)
-        await self.db.commit()
-        await self.db.refresh(source)
+        await self._commit()
         return source
     
     async def get_source(self, source_id: int) -> Optional[Sources]:
@@ -94,6 +156,5 @@ class UserRepository(AbstractUserRepository):
         result = await self.db.execute(select(Sources).filter(Sources.src_id == src_id))
         return result.scalars().first()
     
-    async def get_all_sources(self) -> List[Sources]:
-        result = await self.db.execute(select(Sources))
-        return result.scalars().all()
\ No newline at end of file
+    async def get_all_sources(self, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Page:
+        return await self._paginate(select(Sources), Sources.id, limit, cursor)
\ No newline at end of file
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from .api_v1 import  users, subscription_plans, subscriptions, payments, auth, registration, yookassa_payments, webhooks
+from .api_v1 import  users, subscription_plans, subscriptions, payments, auth, registration, yookassa_payments, webhooks, internal, exports, entitlements
 
 routes = {
     'api_v1' : [
@@ -12,6 +12,9 @@ routes = {
         registration.router,
         yookassa_payments.router,
         webhooks.router,
+        internal.router,
+        exports.router,
+        entitlements.router,
     ]
 }
 
@@ -1,7 +1,6 @@
-from datetime import timedelta
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -9,8 +8,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from config import AuthConfig
 from dependencies import get_session
 
-from .schemas.auth_schemas import Token
-from services.auth import authenticate_user, create_access_token, create_refresh_token, verify_refresh_token
+from .schemas.auth_schemas import Token, TokenData
+from services.auth import authenticate_user, create_token_pair, rotate_refresh_token, revoke_session, \
+    get_current_principal
+from services.rate_limiter import limit_login_attempts
+from services.token_keys import token_keyring
 
 router = APIRouter(
     prefix="",
@@ -21,6 +23,8 @@ router = APIRouter(
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+    # Ограничение проверяется до открытия сессии и проверки пароля
+    _: None = Depends(limit_login_attempts),
     session: AsyncSession = Depends(get_session)
 ):
     user = await authenticate_user(session, form_data.username, form_data.password)
@@ -30,20 +34,7 @@ async def login_for_access_token(
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=AuthConfig.ACCESS_TOKEN_EXPIRE_MINUTES)
-    refresh_token_expires = timedelta(days=AuthConfig.REFRESH_TOKEN_EXPIRE_DAYS)
-
-    access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
-    )
-    refresh_token = create_refresh_token(
-        data={"sub": str(user.id)}, expires_delta=refresh_token_expires
-    )
-    return {
-        "access_token": access_token,
-        "refresh_token": refresh_token,
-        "token_type": "bearer",
-    }
+    return await create_token_pair(user)
 
 
 @router.post("/refresh", response_model=Token)
@@ -51,20 +42,26 @@ async def refresh_access_token(
     refresh_token: str,
     session: AsyncSession = Depends(get_session)
 ):
-    token_data = verify_refresh_token(refresh_token)
-    if not token_data:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired refresh token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    user_id = token_data["sub"]
-    access_token_expires = timedelta(minutes=AuthConfig.ACCESS_TOKEN_EXPIRE_MINUTES)
+    # Refresh токен одноразовый: в ответе новая пара токенов
+    return await rotate_refresh_token(session, refresh_token)
+
+
+@router.post("/logout")
+async def logout(current_user: TokenData = Depends(get_current_principal)):
+    """
+    Завершает сессию: отзывает access и refresh токены, выданные при входе
+    """
+    await revoke_session(current_user)
+    return {"detail": "Logged out"}
+
 
-    access_token = create_access_token(
-        data={"sub": user_id}, expires_delta=access_token_expires
+@router.get("/.well-known/jwks.json")
+async def get_jwks():
+    """
+    Открытые ключи для проверки токенов на стороне узлов VPN и бота
+    """
+    return Response(
+        content=token_keyring.jwks_json,
+        media_type="application/json",
+        headers={"Cache-Control": f"public, max-age={AuthConfig.JWKS_MAX_AGE}"},
     )
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-    }
@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from uuid import UUID
+
+from dependencies import get_session
+from services.auth import get_admin_principal
+from services.entitlement_service import EntitlementService, EntitlementCheck
+from .schemas.entitlements_schemas import ProtocolEnum, EntitlementCheckResponse, EntitlementBatchRequest, EntitlementBatchResponse
+from models.subscription_plans import PROTOCOL_NAMES
+from .schemas.auth_schemas import TokenData
+
+router = APIRouter(prefix="/entitlements", tags=["entitlements"])
+
+
+def _check_response(check: EntitlementCheck) -> EntitlementCheckResponse:
+    response = EntitlementCheckResponse(
+        allowed=check.allowed,
+        reason=check.reason,
+        user_id=check.user_id,
+        plan_id=check.plan_id,
+        ends_at=check.ends_at,
+    )
+    if check.entitlements is not None:
+        response.protocols = list(check.entitlements.protocols)
+        response.simultaneous_use = check.entitlements.simultaneous_use
+        response.locations_limit = check.entitlements.locations_limit
+        response.can_choose_location = check.entitlements.can_choose_location
+        response.selection_by_popularity = check.entitlements.selection_by_popularity
+    return response
+
+
+@router.get("/check", response_model=EntitlementCheckResponse)
+async def check_entitlement(
+    protocol: ProtocolEnum,
+    user_id: Optional[UUID] = None,
+    telegram_id: Optional[int] = None,
+    current_user: TokenData = Depends(get_admin_principal),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Может ли пользователь подключиться по протоколу прямо сейчас.
+    Пользователь задается через user_id или telegram_id
+    """
+    entitlement_service = EntitlementService(session)
+    check = await entitlement_service.check(PROTOCOL_NAMES[protocol.value], user_id=user_id, telegram_id=telegram_id)
+    return _check_response(check)
+
+
+@router.post("/check/batch", response_model=EntitlementBatchResponse)
+async def check_entitlements_batch(
+    request: EntitlementBatchRequest,
+    current_user: TokenData = Depends(get_admin_principal),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Активные подписки и права сразу для многих пользователей,
+    например при перезапуске узла VPN
+    """
+    entitlement_service = EntitlementService(session)
+    return {"subscriptions": await entitlement_service.check_batch(request.user_ids, request.telegram_ids)}
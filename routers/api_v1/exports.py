@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from services.auth import get_admin_principal
+from services.export_service import ExportService, ExportFormat, MEDIA_TYPES
+from .schemas.auth_schemas import TokenData
+
+router = APIRouter(prefix="/admin/export", tags=["export"])
+
+
+def _streaming_response(chunks, name: str, export_format: ExportFormat) -> StreamingResponse:
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{export_format.value}"'},
+    )
+
+
+@router.get("/users")
+async def export_users(
+    format: ExportFormat = ExportFormat.NDJSON,
+    current_user: TokenData = Depends(get_admin_principal)
+):
+    """
+    Потоковая выгрузка пользователей в NDJSON или CSV
+    """
+    export_service = ExportService()
+    return _streaming_response(export_service.export_users(format), "users", format)
+
+
+@router.get("/subscriptions")
+async def export_subscriptions(
+    format: ExportFormat = ExportFormat.NDJSON,
+    current_user: TokenData = Depends(get_admin_principal)
+):
+    """
+    Потоковая выгрузка подписок в NDJSON или CSV
+    """
+    export_service = ExportService()
+    return _streaming_response(export_service.export_subscriptions(format), "subscriptions", format)
+
+
+@router.get("/payments")
+async def export_payments(
+    format: ExportFormat = ExportFormat.NDJSON,
+    current_user: TokenData = Depends(get_admin_principal)
+):
+    """
+    Потоковая выгрузка платежей в NDJSON или CSV
+    """
+    export_service = ExportService()
+    return _streaming_response(export_service.export_payments(format), "payments", format)
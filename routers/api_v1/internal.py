@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+import metrics
+from config import MetricsConfig
+from database import engine, replica_engine, replica_monitor, get_pool_stats
+from dependencies import redis_client
+from services.auth import get_admin_principal
+from .schemas.auth_schemas import TokenData
+
+router = APIRouter(prefix="/internal", tags=["internal"])
+
+
+@router.get("/db-pool")
+async def get_db_pool_stats(current_user: TokenData = Depends(get_admin_principal)):
+    """
+    Текущее состояние пулов соединений с базой данных
+    """
+    stats = {"primary": get_pool_stats(engine)}
+    if replica_engine is not None:
+        stats["replica"] = get_pool_stats(replica_engine)
+        stats["replica"]["lag_seconds"] = replica_monitor.lag
+        stats["replica"]["healthy"] = replica_monitor.is_healthy()
+    return stats
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(current_user: TokenData = Depends(get_admin_principal)):
+    """
+    Метрики текущего процесса и фоновых воркеров в формате Prometheus
+    """
+    collections = [({}, metrics.registry.collect())]
+    published = await metrics.collect_published(redis_client, MetricsConfig.WORKER_MAX_AGE)
+    for source, worker_metrics in published.items():
+        collections.append(({"source": source}, worker_metrics))
+    return metrics.render(collections)
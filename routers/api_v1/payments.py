@@ -1,19 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 
 from dependencies import get_session
-from services.auth import get_current_user
+from services.auth import get_current_principal
 from services.payments_service import PaymentService
 from .schemas.payments_schemas import PaymentCreate, PaymentInput, PaymentResponse, PaymentMethodResponse
-from models.users import User
+from .schemas.pagination_schemas import PageResponse
+from .schemas.auth_schemas import TokenData
+from repositories.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter(prefix="/payments", tags=["payments"])
 
 @router.post("/", response_model=PaymentResponse)
 async def create_payment(
     payment: PaymentCreate, 
-    current_user: User = Depends(get_current_user),
+    current_user: TokenData = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session)
 ):
     # Проверяем, что пользователь создает платеж для себя
@@ -33,7 +35,7 @@ async def create_payment(
 @router.get("/{payment_id}", response_model=PaymentResponse)
 async def get_payment(
     payment_id: str, 
-    current_user: User = Depends(get_current_user),
+    current_user: TokenData = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session)
 ):
     payment_service = PaymentService(session)
@@ -45,10 +47,12 @@ async def get_payment(
         
     return payment
 
-@router.get("/user/{user_id}", response_model=List[PaymentResponse])
+@router.get("/user/{user_id}", response_model=PageResponse[PaymentResponse])
 async def get_user_payments(
     user_id: str, 
-    current_user: User = Depends(get_current_user),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: TokenData = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session)
 ):
     # Проверяем, что пользователь запрашивает свои платежи или является администратором
@@ -56,13 +60,13 @@ async def get_user_payments(
         raise HTTPException(status_code=403, detail="У вас нет доступа к платежам этого пользователя")
         
     payment_service = PaymentService(session)
-    return await payment_service.get_user_payments(user_id)
+    return await payment_service.get_user_payments(user_id, limit, cursor)
 
 @router.put("/{payment_id}", response_model=PaymentResponse)
 async def update_payment(
     payment_id: str, 
     payment_data: PaymentInput, 
-    current_user: User = Depends(get_current_user),
+    current_user: TokenData = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session)
 ):
     # Только администратор может обновлять платежи
@@ -78,7 +82,7 @@ async def update_payment(
 @router.delete("/{payment_id}")
 async def delete_payment(
     payment_id: str, 
-    current_user: User = Depends(get_current_user),
+    current_user: TokenData = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session)
 ):
     # Только администратор может удалять платежи
@@ -88,10 +92,12 @@ async def delete_payment(
     payment_service = PaymentService(session)
     return await payment_service.delete_payment(payment_id)
 
-@router.get("/methods/{user_id}", response_model=List[PaymentMethodResponse])
+@router.get("/methods/{user_id}", response_model=PageResponse[PaymentMethodResponse])
 async def get_user_payment_methods(
     user_id: str, 
-    current_user: User = Depends(get_current_user),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: TokenData = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session)
 ):
     # Проверяем, что пользователь запрашивает свои методы оплаты или является администратором
@@ -99,14 +105,14 @@ async def get_user_payment_methods(
         raise HTTPException(status_code=403, detail="У вас нет доступа к методам оплаты этого пользователя")
         
     payment_service = PaymentService(session)
-    return await payment_service.get_user_payment_methods(user_id)
+    return await payment_service.get_user_payment_methods(user_id, limit, cursor)
 
 @router.post("/methods", response_model=PaymentMethodResponse)
 async def add_payment_method(
     user_id: str,
     method_name: str,
     method_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenData = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session)
 ):
     # Проверяем, что пользователь добавляет метод оплаты для себя или является администратором
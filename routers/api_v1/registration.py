@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-import os
 
+from database import UnitOfWork
 from dependencies import get_session
 from services.users_service import UserService
-from services.email_service import EmailService
+from services.email_service import email_service
+from services.email_outbox_service import EmailOutboxService
 from .schemas.users_schemas import UserCreate, UserResponse
 from .schemas.auth_schemas import Token
 from services.auth import create_access_token, create_refresh_token
@@ -14,18 +15,8 @@ from config import AuthConfig
 
 router = APIRouter(prefix="/registration", tags=["registration"])
 
-# Инициализация сервиса для отправки email
-email_service = EmailService(
-    smtp_server=os.getenv("SMTP_SERVER"),
-    smtp_port=int(os.getenv("SMTP_PORT", "587")),
-    smtp_username=os.getenv("SMTP_USERNAME"),
-    smtp_password=os.getenv("SMTP_PASSWORD"),
-    from_email=os.getenv("SMTP_FROM_EMAIL"),
-    verification_url=os.getenv("EMAIL_VERIFICATION_URL")
-)
-
 @router.post("/email", response_model=UserResponse)
-async def register_with_email(user_data: UserCreate, background_tasks: BackgroundTasks, session: AsyncSession = Depends(get_session)):
+async def register_with_email(user_data: UserCreate, session: AsyncSession = Depends(get_session)):
     """
     Регистрация пользователя через email с отправкой ссылки для подтверждения
     """
@@ -37,20 +28,16 @@ async def register_with_email(user_data: UserCreate, background_tasks: Backgroun
     
     user_service = UserService(session)
     
-    # Создаем пользователя
-    user = await user_service.create_user(
-        username=user_data.username,
-        email=user_data.email,
-        password=user_data.password,
-        is_admin=user_data.is_admin
-    )
-    
-    # Отправляем email для подтверждения в фоновом режиме
-    background_tasks.add_task(
-        email_service.send_verification_email,
-        str(user.id),
-        user.email
-    )
+    # Пользователь и письмо для подтверждения сохраняются одной транзакцией,
+    # письмо отправит воркер email_outbox
+    async with UnitOfWork(session):
+        user = await user_service.create_user(
+            username=user_data.username,
+            email=user_data.email,
+            password=user_data.password,
+            is_admin=user_data.is_admin
+        )
+        await EmailOutboxService(session).enqueue_verification_email(str(user.id), user.email)
     
     return user
 
@@ -97,7 +84,7 @@ async def verify_email(token: str = Query(...), session: AsyncSession = Depends(
     return {"message": "Email успешно подтвержден"}
 
 @router.post("/resend-verification", response_model=dict)
-async def resend_verification_email(email: str, background_tasks: BackgroundTasks, session: AsyncSession = Depends(get_session)):
+async def resend_verification_email(email: str, session: AsyncSession = Depends(get_session)):
     """
     Повторная отправка письма для подтверждения email
     """
@@ -109,11 +96,7 @@ async def resend_verification_email(email: str, background_tasks: BackgroundTask
         # Не сообщаем, что пользователь не существует, чтобы избежать утечки информации
         return {"message": "Если указанный email зарегистрирован, письмо с инструкциями было отправлено"}
     
-    # Отправляем email для подтверждения в фоновом режиме
-    background_tasks.add_task(
-        email_service.send_verification_email,
-        str(user.id),
-        user.email
-    )
+    # Письмо отправит воркер email_outbox
+    await EmailOutboxService(session).enqueue_verification_email(str(user.id), user.email)
     
     return {"message": "Письмо с инструкциями отправлено"}
\ No newline at end of file
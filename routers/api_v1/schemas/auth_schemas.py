@@ -3,9 +3,17 @@ from pydantic import BaseModel
 
 class Token(BaseModel):
     access_token: str
-    refresh_token: str
+    refresh_token: str | None = None
     token_type: str
 
 
 class TokenData(BaseModel):
+    """
+    Данные пользователя из access токена: их достаточно для проверки
+    прав без обращения к базе
+    """
     id: str | None = None
+    is_admin: bool = False
+    email_verified: bool = False
+    token_version: int = 0
+    family: str | None = None
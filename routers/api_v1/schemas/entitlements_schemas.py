@@ -0,0 +1,37 @@
+from typing import Optional, List, Dict
+from pydantic import BaseModel
+from uuid import UUID
+from datetime import datetime
+from enum import Enum
+
+class ProtocolEnum(str, Enum):
+    VLESS = 'vless'
+    OUTLINE = 'outline'
+    WIREGUARD = 'wg'
+
+class EntitlementCheckResponse(BaseModel):
+    allowed: bool
+    reason: Optional[str] = None
+    user_id: Optional[UUID] = None
+    plan_id: Optional[UUID] = None
+    ends_at: Optional[datetime] = None
+    protocols: List[str] = []
+    simultaneous_use: bool = False
+    locations_limit: Optional[int] = None
+    can_choose_location: bool = False
+    selection_by_popularity: bool = False
+
+class EntitlementBatchRequest(BaseModel):
+    user_ids: List[UUID] = []
+    telegram_ids: List[int] = []
+
+class EntitlementBatchItem(BaseModel):
+    plan_id: UUID
+    ends_at: int
+    protocols: List[str]
+    simultaneous_use: bool
+    locations_limit: Optional[int] = None
+
+class EntitlementBatchResponse(BaseModel):
+    # Ключ — переданный user_id или telegram_id; без активной подписки ключа нет
+    subscriptions: Dict[str, EntitlementBatchItem]
@@ -1,5 +1,5 @@
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from uuid import UUID
 from enum import Enum
 from datetime import datetime
@@ -27,10 +27,16 @@ class QuotaBase(BaseModel):
 class QuotaCreate(QuotaBase):
     pass
 
+def _enum_value(value):
+    # Модели хранят собственные Enum, схемы принимают их значения
+    return value.value if isinstance(value, Enum) else value
+
 class QuotaResponse(QuotaBase):
     id: UUID
     subscription_plan_id: UUID
 
+    _resource_type_value = field_validator('resource_type', mode='before')(_enum_value)
+
     class Config:
         from_attributes = True
 
@@ -43,9 +49,11 @@ class PriceCreate(PriceBase):
     pass
 
 class PriceResponse(PriceBase):
-    id: str
+    id: UUID
     subscription_plan_id: UUID
 
+    _currency_value = field_validator('currency', mode='before')(_enum_value)
+
     class Config:
         from_attributes = True
 
@@ -77,6 +85,7 @@ class SubscriptionPlanResponse(SubscriptionPlanBase):
     description: str
     has_trial: bool
     trial_discount: float
+    transfer_plan_id: Optional[UUID] = None
     quotas: List[QuotaResponse] = []
     prices: List[PriceResponse] = []
 
@@ -1,5 +1,5 @@
 from typing import Optional, List
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from uuid import UUID
 from datetime import datetime
 from enum import Enum
@@ -8,6 +8,7 @@ class SubscriptionStatusEnum(str, Enum):
     INACTIVE = 'inactive'
     ACTIVE = 'active'
     UPGRADED = 'upgraded'
+    EXPIRED = 'expired'
 
 class SubscriptionBase(BaseModel):
     customer_id: str
@@ -31,16 +32,25 @@ class SubscriptionUpdate(BaseModel):
     status: Optional[SubscriptionStatusEnum] = None
 
 class SubscriptionResponse(SubscriptionBase):
-    id: str
+    id: UUID
+    customer_id: UUID
+    plan_id: UUID
+    invoice_id: UUID
     renewed_at: Optional[datetime] = None
-    renewed_subscription_id: Optional[str] = None
+    renewed_subscription_id: Optional[UUID] = None
     downgraded_at: Optional[datetime] = None
-    downgraded_to_plan_id: Optional[str] = None
+    downgraded_to_plan_id: Optional[UUID] = None
     upgraded_at: Optional[datetime] = None
-    upgraded_to_plan_id: Optional[str] = None
+    upgraded_to_plan_id: Optional[UUID] = None
     cancelled_at: Optional[datetime] = None
     created_at: datetime
     deleted_at: Optional[datetime] = None
 
+    @field_validator('status', mode='before')
+    @classmethod
+    def _status_value(cls, value):
+        # Модель хранит собственный Enum, схема принимает его значение
+        return value.value if isinstance(value, Enum) else value
+
     class Config:
         from_attributes = True
\ No newline at end of file
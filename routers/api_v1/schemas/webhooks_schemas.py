@@ -0,0 +1,18 @@
+from typing import Any, Dict
+
+from pydantic import BaseModel, Field
+
+
+class YookassaWebhookObject(BaseModel):
+    id: str
+    status: str
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+
+    class Config:
+        extra = 'allow'
+
+
+class YookassaWebhookEvent(BaseModel):
+    type: str
+    event: str
+    object: YookassaWebhookObject
@@ -1,21 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 from dependencies import get_session
-from services.auth import get_current_user
+from services.auth import get_current_principal
 from services.subscriptions_service import SubscriptionService
 from .schemas.subscriptions_schemas import SubscriptionCreate, SubscriptionUpdate, SubscriptionResponse
+from .schemas.pagination_schemas import PageResponse
 from models.subscriptions import Subscription, SubscriptionStatus
-from models.users import User
+from repositories.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from .schemas.auth_schemas import TokenData
 
 router = APIRouter(prefix="/subscriptions", tags=["subscriptions"])
 
 @router.post("/", response_model=SubscriptionResponse)
 async def create_subscription(
     subscription: SubscriptionCreate, 
-    current_user: User = Depends(get_current_user),
+    current_user: TokenData = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session)
 ):
     # Только администратор может создавать подписки напрямую
@@ -35,7 +37,7 @@ async def create_subscription(
 @router.get("/{subscription_id}", response_model=SubscriptionResponse)
 async def get_subscription(
     subscription_id: str, 
-    current_user: User = Depends(get_current_user),
+    current_user: TokenData = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session)
 ):
     subscription_service = SubscriptionService(session)
@@ -47,11 +49,13 @@ async def get_subscription(
         
     return subscription
 
-@router.get("/user/{customer_id}", response_model=List[SubscriptionResponse])
+@router.get("/user/{customer_id}", response_model=PageResponse[SubscriptionResponse])
 async def get_user_subscriptions(
     customer_id: str, 
     active_only: bool = False, 
-    current_user: User = Depends(get_current_user),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: TokenData = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session)
 ):
     # Проверяем права доступа: пользователь может видеть только свои подписки, админ - любые
@@ -59,12 +63,14 @@ async def get_user_subscriptions(
         raise HTTPException(status_code=403, detail="У вас нет доступа к подпискам этого пользователя")
         
     subscription_service = SubscriptionService(session)
-    return await subscription_service.get_user_subscriptions(customer_id, active_only)
+    return await subscription_service.get_user_subscriptions(customer_id, active_only, limit, cursor)
 
-@router.get("/plan/{plan_id}", response_model=List[SubscriptionResponse])
+@router.get("/plan/{plan_id}", response_model=PageResponse[SubscriptionResponse])
 async def get_plan_subscriptions(
     plan_id: str, 
-    current_user: User = Depends(get_current_user),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: TokenData = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session)
 ):
     # Только администратор может просматривать все подписки на тариф
@@ -72,13 +78,13 @@ async def get_plan_subscriptions(
         raise HTTPException(status_code=403, detail="Только администратор может выполнять эту операцию")
         
     subscription_service = SubscriptionService(session)
-    return await subscription_service.get_plan_subscriptions(plan_id)
+    return await subscription_service.get_plan_subscriptions(plan_id, limit, cursor)
 
 @router.put("/{subscription_id}", response_model=SubscriptionResponse)
 async def update_subscription(
     subscription_id: str, 
     subscription_data: SubscriptionUpdate, 
-    current_user: User = Depends(get_current_user),
+    current_user: TokenData = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session)
 ):
     # Только администратор может обновлять подписки
@@ -94,7 +100,7 @@ async def update_subscription(
 @router.delete("/{subscription_id}")
 async def delete_subscription(
     subscription_id: str, 
-    current_user: User = Depends(get_current_user),
+    current_user: TokenData = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session)
 ):
     # Только администратор может удалять подписки
@@ -107,7 +113,7 @@ async def delete_subscription(
 @router.post("/{subscription_id}/activate", response_model=SubscriptionResponse)
 async def activate_subscription(
     subscription_id: str, 
-    current_user: User = Depends(get_current_user),
+    current_user: TokenData = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session)
 ):
     # Только администратор может активировать подписки
@@ -121,7 +127,7 @@ async def activate_subscription(
 async def renew_subscription(
     subscription_id: str, 
     new_subscription_id: str, 
-    current_user: User = Depends(get_current_user),
+    current_user: TokenData = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session)
 ):
     # Только администратор может обновлять подписки
@@ -135,7 +141,7 @@ async def renew_subscription(
 async def upgrade_subscription(
     subscription_id: str, 
     new_plan_id: str, 
-    current_user: User = Depends(get_current_user),
+    current_user: TokenData = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session)
 ):
     # Только администратор может обновлять подписки
@@ -149,7 +155,7 @@ async def upgrade_subscription(
 async def downgrade_subscription(
     subscription_id: str, 
     new_plan_id: str, 
-    current_user: User = Depends(get_current_user),
+    current_user: TokenData = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session)
 ):
     # Только администратор может обновлять подписки
@@ -162,7 +168,7 @@ async def downgrade_subscription(
 @router.post("/{subscription_id}/cancel", response_model=SubscriptionResponse)
 async def cancel_subscription(
     subscription_id: str, 
-    current_user: User = Depends(get_current_user),
+    current_user: TokenData = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session)
 ):
     subscription_service = SubscriptionService(session)
@@ -177,7 +183,7 @@ async def cancel_subscription(
 @router.get("/active/user/{customer_id}", response_model=SubscriptionResponse)
 async def get_active_subscription_for_user(
     customer_id: str, 
-    current_user: User = Depends(get_current_user),
+    current_user: TokenData = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session)
 ):
     # Проверяем права доступа: пользователь может видеть только свои подписки, админ - любые
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 
 from dependencies import get_session
 from services.users_service import UserService
 from .schemas.users_schemas import UserCreate, UserUpdate, UserResponse, ReferalCreate, ReferalResponse, SourceCreate, SourceResponse
+from .schemas.pagination_schemas import PageResponse
 from models.users import User, Referals, Sources
+from repositories.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -40,10 +42,14 @@ async def get_user_by_telegram_id(telegram_id: int, session: AsyncSession = Depe
     user_service = UserService(session)
     return await user_service.get_user_by_telegram_id(telegram_id)
 
-@router.get("/", response_model=List[UserResponse])
-async def get_all_users(session: AsyncSession = Depends(get_session)):
+@router.get("/", response_model=PageResponse[UserResponse])
+async def get_all_users(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_session)
+):
     user_service = UserService(session)
-    return await user_service.get_all_users()
+    return await user_service.get_all_users(limit, cursor)
 
 @router.put("/{user_id}", response_model=UserResponse)
 async def update_user(user_id: str, user_data: UserUpdate, session: AsyncSession = Depends(get_session)):
@@ -64,10 +70,15 @@ async def create_referal(referal: ReferalCreate, session: AsyncSession = Depends
     user_service = UserService(session)
     return await user_service.create_referal(referal.parent, referal.child)
 
-@router.get("/referals/{parent_id}", response_model=List[ReferalResponse])
-async def get_user_referals(parent_id: str, session: AsyncSession = Depends(get_session)):
+@router.get("/referals/{parent_id}", response_model=PageResponse[ReferalResponse])
+async def get_user_referals(
+    parent_id: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_session)
+):
     user_service = UserService(session)
-    return await user_service.get_user_referals(parent_id)
+    return await user_service.get_user_referals(parent_id, limit, cursor)
 
 # Эндпоинты для источников
 @router.post("/sources", response_model=SourceResponse)
@@ -85,7 +96,11 @@ async def get_source_by_src_id(src_id: str, session: AsyncSession = Depends(get_
     user_service = UserService(session)
     return await user_service.get_source_by_src_id(src_id)
 
-@router.get("/sources", response_model=List[SourceResponse])
-async def get_all_sources(session: AsyncSession = Depends(get_session)):
+@router.get("/sources", response_model=PageResponse[SourceResponse])
+async def get_all_sources(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_session)
+):
     user_service = UserService(session)
-    return await user_service.get_all_sources()
\ No newline at end of file
+    return await user_service.get_all_sources(limit, cursor)
\ No newline at end of file
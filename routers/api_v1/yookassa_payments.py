@@ -1,33 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any, Optional
-import os
 
 from dependencies import get_session
 
-from services.auth import get_current_user, get_admin_user
+from services.auth import get_current_principal, get_admin_principal
 from services.yookassa_service import YookassaService
 from services.payments_service import PaymentService
-from services.subscriptions_service import SubscriptionService
 
 from config import YookassaConfig
 
 from .schemas.payments_schemas import PaymentInput
 
-from models.users import User
+from .schemas.auth_schemas import TokenData
 
 router = APIRouter(prefix="/yookassa", tags=["yookassa"])
 
-# Инициализация сервиса Yookassa
-yookassa_service = YookassaService(
-    shop_id=YookassaConfig.SHOP_ID,
-    secret_key=YookassaConfig.SECRET_KEY
-)
-
 @router.post("/create-payment")
 async def create_payment(
     payment_data: PaymentInput,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenData = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session)
 ):
     """
@@ -37,16 +29,14 @@ async def create_payment(
     if payment_data.customer_id and payment_data.customer_id != str(current_user.id):
         raise HTTPException(status_code=403, detail="Вы можете создавать платежи только для своего аккаунта")
     
-    # Инициализируем сервисы
-    payment_service = PaymentService(session)
-    subscription_service = SubscriptionService(session)
-    yookassa_service.set_services(payment_service, subscription_service)
+    # Сервис создается на запрос: он работает с сессией этого запроса
+    yookassa_service = YookassaService(session)
     
     # Формируем описание платежа
     description = f"Оплата подписки на AshleyVPN, тариф: {payment_data.tarrif_id}"
     
     # URL для возврата после оплаты
-    return_url = os.getenv("PAYMENT_RETURN_URL", "https://ashleyvpn.com/payment/success")
+    return_url = YookassaConfig.PAYMENT_RETURN_URL
     
     # Создаем платеж в Yookassa
     payment_result = await yookassa_service.create_payment(
@@ -67,7 +57,7 @@ async def create_payment(
 @router.get("/payment/{payment_id}")
 async def get_payment_status(
     payment_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenData = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session)
 ):
     """
@@ -82,7 +72,7 @@ async def get_payment_status(
         # Проверяем, что пользователь запрашивает свой платеж
         if payment.user_id != str(current_user.id):
             # Если не свой платеж, проверяем права администратора
-            admin_user = await get_admin_user(current_user)
+            admin_user = await get_admin_principal(current_user)
         
         return {
             "payment_id": payment.id,
@@ -100,7 +90,7 @@ async def get_payment_status(
                 # Проверяем, что пользователь запрашивает свой платеж
                 if payment.user_id != str(current_user.id):
                     # Если не свой платеж, проверяем права администратора
-                    admin_user = await get_admin_user(current_user)
+                    admin_user = await get_admin_principal(current_user)
                 
                 return {
                     "payment_id": payment.id,
@@ -1,7 +1,9 @@
 from datetime import datetime, timedelta
 from typing import Annotated, Optional
+from uuid import uuid4
 from fastapi import Depends, HTTPException, status
-from jose import JWTError, jwt
+from jose import JWTError
+from redis.exceptions import RedisError
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -9,6 +11,9 @@ from dependencies import get_session
 from models.users import User
 from services.users import get_user
 from services.users_service import UserService
+from services.token_cache import decoded_token_cache
+from services.token_keys import token_keyring
+from services.token_revocation import token_revocations
 from routers.api_v1.schemas.auth_schemas import TokenData
 from config import AuthConfig
 
@@ -32,29 +37,44 @@ async def authenticate_user(database: AsyncSession, email_or_username: str, pass
     # Создаем экземпляр UserService
     user_service = UserService(database)
     
-    # Проверяем, является ли введенное значение email или username
     try:
-        # Сначала пробуем найти пользователя по username
+        # Пользователь ищется по username или email одним запросом, пароль проверяется один раз
         user = await user_service.verify_user_password(email_or_username, password)
         if user:
             return user
-            
-        # Если не нашли по username, пробуем по email
-        if '@' in email_or_username:
-            # Получаем пользователя по email
-            try:
-                user = await user_service.get_user_by_email(email_or_username)
-                # Проверяем пароль
-                if user and await user_service.verify_user_password(user.username, password):
-                    return user
-            except HTTPException:
-                pass
                 
         return False
+    except HTTPException:
+        # Например, 503 при переполнении очереди хеширования паролей
+        raise
     except Exception:
         return False
 
 
+def access_token_claims(user: User, family: str | None = None) -> dict:
+    """
+    Данные пользователя, которые включаются в access токен
+    """
+    return {
+        "sub": str(user.id),
+        "adm": bool(user.is_admin),
+        "ev": bool(user.email_verified),
+        "ver": user.token_version or 0,
+        "fam": family,
+        "type": "access",
+    }
+
+
+def refresh_token_claims(user: User, family: str, jti: str) -> dict:
+    return {
+        "sub": str(user.id),
+        "ver": user.token_version or 0,
+        "fam": family,
+        "jti": jti,
+        "type": "refresh",
+    }
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     """
     Создание JWT access токена
@@ -75,8 +95,7 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
         expire = datetime.utcnow() + timedelta(minutes=AuthConfig.ACCESS_TOKEN_EXPIRE_MINUTES)
         
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, AuthConfig.SECRET_KEY, algorithm=AuthConfig.ALGORITHM)
-    return encoded_jwt
+    return token_keyring.sign(to_encode)
 
 
 def create_refresh_token(data: dict, expires_delta: timedelta | None = None) -> str:
@@ -99,8 +118,28 @@ def create_refresh_token(data: dict, expires_delta: timedelta | None = None) ->
         expire = datetime.utcnow() + timedelta(days=AuthConfig.REFRESH_TOKEN_EXPIRE_DAYS)
         
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, AuthConfig.SECRET_KEY, algorithm=AuthConfig.ALGORITHM)
-    return encoded_jwt
+    return token_keyring.sign(to_encode)
+
+
+def decode_token(token: str) -> dict:
+    """
+    Проверка подписи и срока действия JWT с кэшированием результата
+    до exp токена. Проверки отзыва в кэш не попадают
+    
+    Args:
+        token: JWT токен для проверки
+        
+    Returns:
+        dict: Данные из токена
+        
+    Raises:
+        JWTError: Если токен недействителен
+    """
+    payload = decoded_token_cache.get(token)
+    if payload is None:
+        payload = token_keyring.decode(token)
+        decoded_token_cache.put(token, payload)
+    return payload
 
 
 def verify_refresh_token(token: str) -> Optional[dict]:
@@ -114,11 +153,14 @@ def verify_refresh_token(token: str) -> Optional[dict]:
         dict: Данные из токена или None при ошибке
     """
     try:
-        payload = jwt.decode(token, AuthConfig.SECRET_KEY, algorithms=[AuthConfig.ALGORITHM])
-        return payload
+        payload = decode_token(token)
     except JWTError:
         return None
 
+    if payload.get("type") != "refresh" or not payload.get("jti") or not payload.get("fam"):
+        return None
+    return payload
+
 
 def verify_token(token: str) -> Optional[TokenData]:
     """
@@ -131,22 +173,179 @@ def verify_token(token: str) -> Optional[TokenData]:
         TokenData: Данные из токена или None при ошибке
     """
     try:
-        payload = jwt.decode(token, AuthConfig.SECRET_KEY, algorithms=[AuthConfig.ALGORITHM])
+        payload = decode_token(token)
         user_id = payload.get("sub")
 
-        if user_id is None:
+        if user_id is None or payload.get("type") != "access":
             return None
             
-        token_data = TokenData(id=user_id)
+        token_data = TokenData(
+            id=user_id,
+            is_admin=payload.get("adm", False),
+            email_verified=payload.get("ev", False),
+            token_version=payload.get("ver", 0),
+            family=payload.get("fam"),
+        )
         return token_data
     except JWTError:
         return None
 
 
+def _token_pair(user: User, family: str, jti: str) -> dict:
+    return {
+        "access_token": create_access_token(
+            data=access_token_claims(user, family),
+            expires_delta=timedelta(minutes=AuthConfig.ACCESS_TOKEN_EXPIRE_MINUTES),
+        ),
+        "refresh_token": create_refresh_token(
+            data=refresh_token_claims(user, family, jti),
+            expires_delta=timedelta(days=AuthConfig.REFRESH_TOKEN_EXPIRE_DAYS),
+        ),
+        "token_type": "bearer",
+    }
+
+
+def _auth_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is temporarily unavailable",
+    )
+
+
+async def create_token_pair(user: User) -> dict:
+    """
+    Выдача access и refresh токенов при входе: открывает новое семейство
+    refresh токенов
+    
+    Args:
+        user: Аутентифицированный пользователь
+        
+    Returns:
+        dict: access_token, refresh_token и token_type
+    """
+    family, jti = uuid4().hex, uuid4().hex
+    try:
+        await token_revocations.start_family(family, jti)
+    except RedisError:
+        raise _auth_unavailable()
+    return _token_pair(user, family, jti)
+
+
+async def rotate_refresh_token(database: AsyncSession, refresh_token: str) -> dict:
+    """
+    Обновление токенов: refresh токен одноразовый, взамен выдается новый
+    того же семейства. Повторное предъявление уже использованного токена
+    отзывает все семейство
+    
+    Args:
+        database: Асинхронная сессия базы данных
+        refresh_token: Refresh токен
+        
+    Returns:
+        dict: access_token, refresh_token и token_type
+        
+    Raises:
+        HTTPException: Если токен недействителен, отозван или уже использован
+    """
+    invalid_token = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    payload = verify_refresh_token(refresh_token)
+    if payload is None:
+        raise invalid_token
+
+    family = payload["fam"]
+    if await token_revocations.is_revoked(family):
+        raise invalid_token
+
+    # Данные для access токена берутся из базы: права могли измениться
+    user = await get_user(database, user_id=payload["sub"])
+    if user is None or payload.get("ver", 0) != (user.token_version or 0):
+        raise invalid_token
+
+    new_jti = uuid4().hex
+    try:
+        if not await token_revocations.rotate(family, payload["jti"], new_jti):
+            await token_revocations.revoke(family)
+            raise invalid_token
+    except RedisError:
+        raise _auth_unavailable()
+
+    return _token_pair(user, family, new_jti)
+
+
+async def revoke_session(principal: TokenData):
+    """
+    Выход: отзывает семейство токенов текущей сессии
+    
+    Args:
+        principal: Данные пользователя из access токена
+    """
+    if not principal.family:
+        return
+    try:
+        await token_revocations.revoke(principal.family)
+    except RedisError:
+        raise _auth_unavailable()
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def get_current_principal(token: Annotated[str, Depends(oauth2_scheme)]) -> TokenData:
+    """
+    Текущий пользователь по данным access токена, без запроса в базу.
+    Достаточно для проверки id и прав администратора
+    
+    Args:
+        token: JWT токен из заголовка Authorization
+        
+    Returns:
+        TokenData: Данные пользователя из токена
+        
+    Raises:
+        HTTPException: Если токен недействителен
+    """
+    token_data = verify_token(token)
+    if token_data is None or await token_revocations.is_revoked(token_data.family):
+        raise _credentials_exception()
+    return token_data
+
+
+async def get_admin_principal(principal: TokenData = Depends(get_current_principal)) -> TokenData:
+    """
+    Проверяет по данным токена, что текущий пользователь является администратором
+    
+    Args:
+        principal: Данные пользователя из токена
+        
+    Returns:
+        TokenData: Данные пользователя-администратора
+        
+    Raises:
+        HTTPException: Если пользователь не является администратором
+    """
+    if not principal.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Только администратор может выполнять эту операцию"
+        )
+    return principal
+
+
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], 
                            session: AsyncSession = Depends(get_session)) -> User:
     """
-    Получение текущего пользователя по токену
+    Получение текущего пользователя по токену с загрузкой из базы.
+    Нужно только обработчикам, которым требуется полный объект User
     
     Args:
         token: JWT токен из заголовка Authorization
@@ -158,19 +357,15 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)],
     Raises:
         HTTPException: Если токен недействителен или пользователь не найден
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    credentials_exception = _credentials_exception()
 
     token_data = verify_token(token)
 
-    if token_data is None:
+    if token_data is None or await token_revocations.is_revoked(token_data.family):
         raise credentials_exception
 
     user = await get_user(session, user_id=token_data.id)
-    if user is None:
+    if user is None or token_data.token_version != (user.token_version or 0):
         raise credentials_exception
         
     return user
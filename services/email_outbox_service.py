@@ -0,0 +1,20 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.email_outbox import EmailOutbox
+from repositories.email_outbox_repository import EmailOutboxRepository
+
+# Типы писем в outbox, их отправку выполняет workers.email_outbox
+EMAIL_VERIFICATION = 'email_verification'
+
+
+class EmailOutboxService:
+    """
+    Постановка писем в очередь отправки. Письмо сохраняется в той же
+    транзакции, что и вызвавшее его изменение: внутри UnitOfWork оно
+    будет записано только вместе с ним
+    """
+    def __init__(self, db: AsyncSession):
+        self.repository = EmailOutboxRepository(db)
+
+    async def enqueue_verification_email(self, user_id: str, email: str) -> EmailOutbox:
+        return await self.repository.add_email(EMAIL_VERIFICATION, email, {'user_id': str(user_id)})
@@ -1,51 +1,67 @@
-import os
-import smtplib
+import logging
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Optional
+from typing import Optional, Tuple
 from jose import jwt
 from datetime import datetime, timedelta
 from fastapi import HTTPException
 
-from config import AuthConfig
+from config import AuthConfig, EmailConfig
+from services.smtp_pool import SMTPConnectionPool
 
 
+logger = logging.getLogger("email_service")
+
 class EmailService:
     def __init__(self, smtp_server: str, smtp_port: int, smtp_username: str, smtp_password: str, 
-                 from_email: str, verification_url: str):
+                 from_email: str, verification_url: str, pool: Optional[SMTPConnectionPool] = None):
         self.smtp_server = smtp_server
         self.smtp_port = smtp_port
         self.smtp_username = smtp_username
         self.smtp_password = smtp_password
         self.from_email = from_email
         self.verification_url = verification_url
+        self.pool = pool or SMTPConnectionPool(
+            hostname=smtp_server,
+            port=smtp_port,
+            username=smtp_username,
+            password=smtp_password,
+            size=EmailConfig.SMTP_POOL_SIZE,
+            timeout=EmailConfig.SMTP_TIMEOUT,
+            idle_timeout=EmailConfig.SMTP_IDLE_TIMEOUT,
+            use_tls=EmailConfig.SMTP_USE_TLS,
+        )
+    
+    async def deliver_email(self, to_email: str, subject: str, body: str, is_html: bool = False):
+        """
+        Отправляет email через пул SMTP соединений, ошибки отправки не перехватываются
+        """
+        msg = MIMEMultipart()
+        msg['From'] = self.from_email
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        
+        if is_html:
+            msg.attach(MIMEText(body, 'html'))
+        else:
+            msg.attach(MIMEText(body, 'plain'))
+        
+        await self.pool.send(msg)
     
-    def send_email(self, to_email: str, subject: str, body: str, is_html: bool = False) -> bool:
+    async def send_email(self, to_email: str, subject: str, body: str, is_html: bool = False) -> bool:
         """
         Отправляет email
         """
         try:
-            msg = MIMEMultipart()
-            msg['From'] = self.from_email
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            if is_html:
-                msg.attach(MIMEText(body, 'html'))
-            else:
-                msg.attach(MIMEText(body, 'plain'))
-            
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.smtp_username, self.smtp_password)
-            server.send_message(msg)
-            server.quit()
-            
+            await self.deliver_email(to_email, subject, body, is_html)
             return True
         except Exception as e:
-            print(f"Ошибка при отправке email: {str(e)}")
+            logger.warning("Ошибка при отправке email: %s", e)
             return False
     
+    async def close(self):
+        await self.pool.close()
+    
     def create_verification_token(self, user_id: str, expires_delta: Optional[timedelta] = None) -> str:
         """
         Создает токен для подтверждения email
@@ -77,9 +93,9 @@ class EmailService:
         except jwt.JWTError:
             return None
     
-    def send_verification_email(self, user_id: str, email: str) -> bool:
+    def verification_email(self, user_id: str) -> Tuple[str, str]:
         """
-        Отправляет email с ссылкой для подтверждения
+        Тема и текст письма с ссылкой для подтверждения
         """
         token = self.create_verification_token(user_id)
         verification_link = f"{self.verification_url}?token={token}"
@@ -96,5 +112,24 @@ class EmailService:
         </body>
         </html>
         """
-        
-        return self.send_email(email, subject, body, is_html=True)
\ No newline at end of file
+        return subject, body
+    
+    async def deliver_verification_email(self, user_id: str, email: str):
+        subject, body = self.verification_email(user_id)
+        await self.deliver_email(email, subject, body, is_html=True)
+    
+    async def send_verification_email(self, user_id: str, email: str) -> bool:
+        """
+        Отправляет email с ссылкой для подтверждения
+        """
+        subject, body = self.verification_email(user_id)
+        return await self.send_email(email, subject, body, is_html=True)
+
+email_service = EmailService(
+    smtp_server=EmailConfig.SMTP_SERVER,
+    smtp_port=EmailConfig.SMTP_PORT,
+    smtp_username=EmailConfig.SMTP_USERNAME,
+    smtp_password=EmailConfig.SMTP_PASSWORD,
+    from_email=EmailConfig.SMTP_FROM_EMAIL,
+    verification_url=EmailConfig.EMAIL_VERIFICATION_URL,
+)
@@ -0,0 +1,152 @@
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional
+from uuid import UUID
+
+from fastapi import HTTPException
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import EntitlementsConfig
+from dependencies import redis_client
+from models.subscription_plans import Protocol, PlanEntitlements
+from repositories.subscriptions_repository import SubscriptionRepository
+from repositories.users_repository import UserRepository, TELEGRAM_USER_KEY
+from services.plan_catalog import plan_catalog
+
+
+logger = logging.getLogger("entitlements")
+
+
+class ActiveSubscription(NamedTuple):
+    plan_id: str
+    ends_at: datetime
+
+
+class EntitlementCheck(NamedTuple):
+    allowed: bool
+    reason: Optional[str] = None
+    user_id: Optional[str] = None
+    plan_id: Optional[str] = None
+    ends_at: Optional[datetime] = None
+    entitlements: Optional[PlanEntitlements] = None
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class EntitlementService:
+    """
+    Проверка права пользователя подключиться к узлу VPN.
+
+    Активная подписка (кэш SubscriptionRepository) и соответствие telegram_id
+    пользователю берутся из Redis, права плана — из каталога тарифов
+    в памяти, поэтому при попадании в кэш база не используется. Если Redis
+    недоступен, данные читаются из базы.
+    """
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.subscriptions_repository = SubscriptionRepository(db)
+        self.users_repository = UserRepository(db)
+
+    async def resolve_user_id(self, telegram_id: int) -> Optional[str]:
+        key = TELEGRAM_USER_KEY.format(telegram_id=telegram_id)
+        try:
+            cached = await redis_client.get(key)
+            if cached is not None:
+                return cached
+        except RedisError as e:
+            logger.warning("Кэш пользователей недоступен: %s", e)
+
+        user_id = await self.users_repository.get_user_id_by_telegram_id(telegram_id)
+        if user_id is None:
+            return None
+
+        await self._cache_set(key, str(user_id), ex=EntitlementsConfig.TELEGRAM_ID_TTL)
+        return str(user_id)
+
+    async def get_active_subscription(self, customer_id: str) -> Optional[ActiveSubscription]:
+        # Репозиторий кэширует активную подписку в Redis
+        subscription = await self.subscriptions_repository.get_active_subscription_for_user(customer_id)
+        if subscription is None:
+            return None
+
+        ends_at = _as_utc(subscription.ends_at)
+        if ends_at <= datetime.now(timezone.utc):
+            return None
+        return ActiveSubscription(str(subscription.plan_id), ends_at)
+
+    async def _cache_set(self, key: str, value: str, **kwargs):
+        try:
+            await redis_client.set(key, value, **kwargs)
+        except RedisError as e:
+            logger.warning("Не удалось записать %s в кэш: %s", key, e)
+
+    async def check(self, protocol: Protocol, user_id: Optional[UUID] = None,
+                    telegram_id: Optional[int] = None) -> EntitlementCheck:
+        if (user_id is None) == (telegram_id is None):
+            raise HTTPException(status_code=400, detail="Exactly one of user_id or telegram_id is required")
+
+        if telegram_id is not None:
+            customer_id = await self.resolve_user_id(telegram_id)
+            if customer_id is None:
+                return EntitlementCheck(allowed=False, reason="user_not_found")
+        else:
+            customer_id = str(user_id)
+
+        subscription = await self.get_active_subscription(customer_id)
+        if subscription is None:
+            return EntitlementCheck(allowed=False, reason="no_active_subscription", user_id=customer_id)
+
+        entitlements = await plan_catalog.get_entitlements(subscription.plan_id)
+        if entitlements is None:
+            return EntitlementCheck(allowed=False, reason="plan_not_found", user_id=customer_id,
+                                    plan_id=subscription.plan_id, ends_at=subscription.ends_at)
+
+        allowed = entitlements.allows(protocol)
+        return EntitlementCheck(
+            allowed=allowed,
+            reason=None if allowed else "protocol_not_allowed",
+            user_id=customer_id,
+            plan_id=subscription.plan_id,
+            ends_at=subscription.ends_at,
+            entitlements=entitlements,
+        )
+
+    async def check_batch(self, user_ids: List[UUID], telegram_ids: List[int]) -> Dict[str, dict]:
+        """
+        Активные подписки и права для многих пользователей одним запросом.
+        Результат по каждому переданному идентификатору (user_id или
+        telegram_id); пользователей без активной подписки в нем нет
+        """
+        if len(user_ids) + len(telegram_ids) > EntitlementsConfig.BATCH_MAX_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"No more than {EntitlementsConfig.BATCH_MAX_SIZE} ids per request"
+            )
+        if not user_ids and not telegram_ids:
+            return {}
+
+        rows = await self.subscriptions_repository.get_active_subscriptions_for_users(user_ids, telegram_ids)
+        snapshot = await plan_catalog.get()
+        requested_users = set(user_ids)
+        requested_telegram = set(telegram_ids)
+
+        results = {}
+        for row in rows:
+            entitlements = snapshot.entitlements.get(str(row.plan_id))
+            if entitlements is None:
+                continue
+            item = {
+                'plan_id': str(row.plan_id),
+                'ends_at': int(_as_utc(row.ends_at).timestamp()),
+                'protocols': entitlements.protocols,
+                'simultaneous_use': entitlements.simultaneous_use,
+                'locations_limit': entitlements.locations_limit,
+            }
+            if row.customer_id in requested_users:
+                results[str(row.customer_id)] = item
+            if row.telegram_id in requested_telegram:
+                results[str(row.telegram_id)] = item
+        return results
@@ -0,0 +1,99 @@
+import csv
+import enum
+import io
+import json
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict, List
+from uuid import UUID
+
+from database import async_session
+from models.subscriptions import Subscription
+from models.payments import Payment
+from repositories import users_repository
+from repositories.users_repository import UserRepository
+from repositories.subscriptions_repository import SubscriptionRepository
+from repositories.payments_repository import PaymentRepository
+
+
+# Размер буфера, после которого накопленные строки отправляются клиенту
+CHUNK_SIZE = 64 * 1024
+
+
+class ExportFormat(str, enum.Enum):
+    NDJSON = 'ndjson'
+    CSV = 'csv'
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: 'application/x-ndjson',
+    ExportFormat.CSV: 'text/csv',
+}
+
+
+def _to_primitive(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+class ExportService:
+    """
+    Потоковые выгрузки. Ответ передается клиенту уже после завершения
+    обработчика, когда сессия запроса может быть закрыта, поэтому каждая
+    выгрузка открывает собственную сессию внутри генератора
+    """
+    def __init__(self, session_factory=async_session):
+        self.session_factory = session_factory
+
+    def export_users(self, export_format: ExportFormat) -> AsyncIterator[str]:
+        fieldnames = [column.key for column in users_repository.STREAM_COLUMNS]
+        return self._export(lambda db: UserRepository(db).stream_users(), fieldnames, export_format)
+
+    def export_subscriptions(self, export_format: ExportFormat) -> AsyncIterator[str]:
+        fieldnames = [column.key for column in Subscription.__table__.c]
+        return self._export(lambda db: SubscriptionRepository(db).stream_subscriptions(), fieldnames, export_format)
+
+    def export_payments(self, export_format: ExportFormat) -> AsyncIterator[str]:
+        fieldnames = [column.key for column in Payment.__table__.c]
+        return self._export(lambda db: PaymentRepository(db).stream_payments(), fieldnames, export_format)
+
+    async def _export(self, stream, fieldnames: List[str], export_format: ExportFormat) -> AsyncIterator[str]:
+        async with self.session_factory() as session:
+            async for chunk in self._encode(stream(session), fieldnames, export_format):
+                yield chunk
+
+    async def _encode(self, rows: AsyncIterator[Dict[str, Any]], fieldnames: List[str],
+                      export_format: ExportFormat) -> AsyncIterator[str]:
+        """
+        Кодирует строки в NDJSON или CSV и отдает их частями по CHUNK_SIZE.
+        Первая часть отправляется сразу, чтобы клиент быстро получил первый байт.
+        Заголовок CSV пишется и для пустой выгрузки.
+        """
+        buffer = io.StringIO()
+        writer = None
+        if export_format == ExportFormat.CSV:
+            writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+            writer.writeheader()
+        first = True
+
+        async for row in rows:
+            row = {key: _to_primitive(value) for key, value in row.items()}
+
+            if writer is not None:
+                writer.writerow(row)
+            else:
+                buffer.write(json.dumps(row, ensure_ascii=False))
+                buffer.write('\n')
+
+            if first or buffer.tell() >= CHUNK_SIZE:
+                first = False
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
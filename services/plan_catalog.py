@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import List, Mapping, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+from redis.exceptions import RedisError
+from sqlalchemy.exc import SQLAlchemyError
+
+from config import CatalogConfig, RedisEventsConfig
+from database import async_session, use_primary
+from dependencies import redis_client, emiter
+from redis_events import SUBSCRIBED_EVENT
+from models.subscription_plans import PlanEntitlements
+from repositories.subscription_plans_repository import SubscriptionPlanRepository
+from routers.api_v1.schemas.subscription_plans_schemas import SubscriptionPlanResponse, QuotaResponse, PriceResponse
+
+
+logger = logging.getLogger("plan_catalog")
+
+# Счетчик версий каталога, общий для всех воркеров
+CATALOG_VERSION_KEY = 'catalog:version'
+CATALOG_INVALIDATED_EVENT = 'catalog_invalidated'
+# Сколько раз подряд get() пересобирает каталог, если он меняется во время загрузки
+MAX_REBUILD_ATTEMPTS = 3
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """
+    Неизменяемый снимок каталога тарифов: планы вместе с квотами и ценами
+    и скомпилированные права доступа каждого плана
+    """
+    version: int
+    built_at: float
+    plans: Tuple[SubscriptionPlanResponse, ...]
+    plans_by_id: Mapping[str, SubscriptionPlanResponse]
+    entitlements: Mapping[str, PlanEntitlements]
+
+
+def _normalize_id(plan_id) -> Optional[str]:
+    try:
+        return str(plan_id if isinstance(plan_id, UUID) else UUID(plan_id))
+    except ValueError:
+        return None
+
+
+class PlanCatalog:
+    """
+    Каталог тарифов в памяти воркера.
+
+    Снимок пересобирается только после изменения каталога (событие от
+    SubscriptionPlanService любого воркера) или по истечении TTL. Если база
+    недоступна, продолжает отдаваться последний удачный снимок.
+
+    Каждая пометка «устарел» увеличивает поколение: пересборка, во время
+    которой пришла новая пометка, не снимает ее, и каталог загружается снова.
+    """
+    def __init__(self, ttl: float = CatalogConfig.TTL, retry_interval: float = CatalogConfig.RETRY_INTERVAL):
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._stale = True
+        self._generation = 0
+        self._retry_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def snapshot(self) -> Optional[CatalogSnapshot]:
+        return self._snapshot
+
+    def _needs_rebuild(self) -> bool:
+        if self._snapshot is None:
+            return True
+        if time.monotonic() < self._retry_at:
+            return False
+        return self._stale or time.monotonic() - self._snapshot.built_at > self.ttl
+
+    async def get(self) -> CatalogSnapshot:
+        if self._needs_rebuild():
+            async with self._lock:
+                for _ in range(MAX_REBUILD_ATTEMPTS):
+                    if not self._needs_rebuild():
+                        break
+                    await self._rebuild()
+
+        if self._snapshot is None:
+            raise HTTPException(status_code=503, detail="Subscription plans are temporarily unavailable")
+        return self._snapshot
+
+    async def _current_version(self) -> int:
+        try:
+            return int(await redis_client.get(CATALOG_VERSION_KEY) or 0)
+        except RedisError as e:
+            logger.warning("Не удалось получить версию каталога: %s", e)
+            return self._snapshot.version if self._snapshot else 0
+
+    async def _load(self) -> Tuple[Tuple[SubscriptionPlanResponse, ...], dict]:
+        async with async_session() as session:
+            # Сразу после изменения реплика может еще не содержать его
+            use_primary(session)
+            plans = await SubscriptionPlanRepository(session).get_all_subscription_plans_with_catalog()
+            items = tuple(SubscriptionPlanResponse.model_validate(plan) for plan in plans)
+            entitlements = {str(plan.id): plan.get_entitlements() for plan in plans}
+        return items, entitlements
+
+    async def _rebuild(self):
+        # Версия и поколение читаются до загрузки: изменение во время загрузки
+        # даст более новую версию и оставит снимок устаревшим
+        generation = self._generation
+        version = await self._current_version()
+        try:
+            items, entitlements = await self._load()
+        except (SQLAlchemyError, OSError) as e:
+            logger.warning("Не удалось пересобрать каталог тарифов, используется версия %s: %s",
+                           self._snapshot.version if self._snapshot else None, e)
+            self._retry_at = time.monotonic() + self.retry_interval
+            return
+
+        self._snapshot = CatalogSnapshot(
+            version=version,
+            built_at=time.monotonic(),
+            plans=items,
+            plans_by_id=MappingProxyType({str(plan.id): plan for plan in items}),
+            entitlements=MappingProxyType(entitlements),
+        )
+        self._stale = self._generation != generation
+        self._retry_at = 0.0
+
+    def mark_stale(self):
+        self._stale = True
+        self._generation += 1
+        self._retry_at = 0.0
+
+    async def invalidate(self):
+        """
+        Помечает снимок устаревшим и оповещает остальные воркеры
+        """
+        self.mark_stale()
+        try:
+            version = await redis_client.incr(CATALOG_VERSION_KEY)
+            await emiter.publish(RedisEventsConfig.CATALOG_CHANNEL, CATALOG_INVALIDATED_EVENT, {'version': version})
+        except RedisError as e:
+            logger.warning("Не удалось оповестить воркеры об изменении каталога: %s", e)
+
+    def on_invalidated(self, version: int):
+        if self._snapshot is None or self._snapshot.version < version:
+            self.mark_stale()
+
+    async def get_plans(self, active_only: bool = False) -> List[SubscriptionPlanResponse]:
+        snapshot = await self.get()
+        if active_only:
+            return [plan for plan in snapshot.plans if plan.is_active]
+        return list(snapshot.plans)
+
+    async def get_plan(self, plan_id: str) -> SubscriptionPlanResponse:
+        snapshot = await self.get()
+        plan = snapshot.plans_by_id.get(_normalize_id(plan_id))
+        if plan is None:
+            raise HTTPException(status_code=404, detail="Subscription plan not found")
+        return plan
+
+    async def get_entitlements(self, plan_id) -> Optional[PlanEntitlements]:
+        snapshot = await self.get()
+        return snapshot.entitlements.get(_normalize_id(plan_id))
+
+    async def get_plan_quotas(self, plan_id: str) -> List[QuotaResponse]:
+        return list((await self.get_plan(plan_id)).quotas)
+
+    async def get_plan_prices(self, plan_id: str) -> List[PriceResponse]:
+        return list((await self.get_plan(plan_id)).prices)
+
+
+plan_catalog = PlanCatalog()
+
+
+@emiter.subscribe_on(CATALOG_INVALIDATED_EVENT)
+async def on_catalog_invalidated(data):
+    plan_catalog.on_invalidated(int(data.get('version', 0)))
+
+
+@emiter.subscribe_on(SUBSCRIBED_EVENT)
+async def on_events_subscribed(data):
+    # События об изменениях за время обрыва соединения потеряны
+    plan_catalog.mark_stale()
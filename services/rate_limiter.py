@@ -0,0 +1,135 @@
+import hashlib
+import logging
+from typing import List, NamedTuple, Sequence
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+from redis.exceptions import ConnectionError, RedisError, TimeoutError
+
+from config import LoginRateLimitConfig
+from dependencies import redis_client
+from metrics import registry
+
+
+logger = logging.getLogger("rate_limiter")
+
+# Несколько token bucket проверяются и списываются атомарно: попытка
+# списывается из всех корзин, только если в каждой есть токен.
+# ARGV: по паре (емкость, пополнение в секунду) на каждый ключ.
+# Возвращает индекс отказавшей корзины (0 — разрешено) и время до
+# появления токена в секундах строкой (Lua числа с дробью обрезаются)
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local tokens = {}
+local denied = 0
+local retry_after = 0
+
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2 - 1])
+    local rate = tonumber(ARGV[i * 2])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local available = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    available = math.min(capacity, available + math.max(0, now - ts) * rate)
+    tokens[i] = available
+    if available < 1 and denied == 0 then
+        denied = i
+        retry_after = (1 - available) / rate
+    end
+end
+
+if denied == 0 then
+    for i, key in ipairs(KEYS) do
+        local capacity = tonumber(ARGV[i * 2 - 1])
+        local rate = tonumber(ARGV[i * 2])
+        redis.call('HSET', key, 'tokens', tokens[i] - 1, 'ts', now)
+        redis.call('EXPIRE', key, math.ceil(capacity / rate))
+    end
+end
+
+return {denied, tostring(retry_after)}
+"""
+
+rate_limited_total = registry.counter(
+    'login_rate_limited_total', 'Попытки входа, отклоненные ограничителем')
+rate_limiter_errors_total = registry.counter(
+    'login_rate_limiter_errors_total', 'Ошибки Redis в ограничителе (попытка пропускается)')
+
+
+class Bucket(NamedTuple):
+    scope: str
+    key: str
+    capacity: int
+    refill_per_second: float
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    scope: str = None
+    retry_after: float = 0.0
+
+
+class TokenBucketLimiter:
+    """
+    Ограничитель на token bucket в Redis. Все корзины одной попытки
+    проверяются одним вызовом Lua-скрипта. Если Redis недоступен,
+    попытки пропускаются; ошибки самого скрипта не скрываются
+    """
+    def __init__(self, redis):
+        self._script = redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def acquire(self, buckets: Sequence[Bucket]) -> RateLimitResult:
+        args: List = []
+        for bucket in buckets:
+            args.extend([bucket.capacity, bucket.refill_per_second])
+
+        try:
+            denied, retry_after = await self._script(keys=[bucket.key for bucket in buckets], args=args)
+        except (ConnectionError, TimeoutError) as e:
+            rate_limiter_errors_total.inc()
+            logger.warning("Ограничитель недоступен, попытка пропущена: %s", e)
+            return RateLimitResult(allowed=True)
+        except RedisError:
+            # Ошибка в скрипте или его аргументах: пропуск всех попыток
+            # отключил бы защиту незаметно
+            logger.exception("Ошибка скрипта ограничителя")
+            raise
+
+        denied = int(denied)
+        if denied == 0:
+            return RateLimitResult(allowed=True)
+        return RateLimitResult(allowed=False, scope=buckets[denied - 1].scope, retry_after=float(retry_after))
+
+
+login_limiter = TokenBucketLimiter(redis_client)
+
+
+def login_buckets(ip: str, login: str) -> List[Bucket]:
+    # Логин хранится в ключе только в виде хеша
+    account = hashlib.sha256(login.strip().lower().encode()).hexdigest()
+    return [
+        Bucket('ip', f'ratelimit:login:ip:{ip}',
+               LoginRateLimitConfig.IP_CAPACITY, LoginRateLimitConfig.IP_PER_MINUTE / 60),
+        Bucket('account', f'ratelimit:login:account:{account}',
+               LoginRateLimitConfig.ACCOUNT_CAPACITY, LoginRateLimitConfig.ACCOUNT_PER_MINUTE / 60),
+    ]
+
+
+async def limit_login_attempts(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    """
+    Зависимость для эндпоинта входа: отклоняет лишние попытки с 429
+    до обращения к базе и проверки пароля
+    """
+    if not LoginRateLimitConfig.ENABLED:
+        return
+
+    ip = request.client.host if request.client else 'unknown'
+    result = await login_limiter.acquire(login_buckets(ip, form_data.username))
+    if not result.allowed:
+        rate_limited_total.inc(scope=result.scope)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, try again later",
+            headers={"Retry-After": str(max(1, int(result.retry_after + 0.999)))},
+        )
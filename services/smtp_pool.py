@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+from email.message import Message
+from typing import List, Optional, Tuple
+
+import aiosmtplib
+
+
+logger = logging.getLogger("smtp_pool")
+
+# Ошибки подключения: письмо еще не передано, его можно отправить через
+# новое соединение
+CONNECT_ERRORS = (
+    aiosmtplib.SMTPConnectError,
+    aiosmtplib.SMTPTimeoutError,
+    OSError,
+    asyncio.TimeoutError,
+)
+
+# Обрыв соединения из пула при отправке: обычно сервер уже закрыл
+# простоявшее соединение и письмо не принял, повтор безопасен
+DISCONNECT_ERRORS = (
+    aiosmtplib.SMTPServerDisconnected,
+    ConnectionError,
+)
+
+# Таймаут во время отправки окончательный: сервер мог уже принять письмо
+# и не успеть ответить, повтор отправил бы его второй раз
+SEND_TIMEOUT_ERRORS = (
+    aiosmtplib.SMTPTimeoutError,
+    asyncio.TimeoutError,
+)
+
+
+class SMTPConnectionPool:
+    """
+    Пул авторизованных соединений с SMTP сервером.
+
+    Соединения открываются по мере надобности (не больше size) и после
+    отправки возвращаются в пул, поэтому TLS и авторизация выполняются
+    один раз на соединение, а не на каждое письмо. Соединение, простоявшее
+    дольше idle_timeout, закрывается: сервер мог уже разорвать его сам.
+    При ошибке подключения или обрыве соединения письмо один раз
+    повторяется через новое соединение; таймаут во время отправки не
+    повторяется, чтобы не отправить письмо дважды.
+    """
+    def __init__(self, hostname: str, port: int, username: Optional[str], password: Optional[str],
+                 size: int, timeout: float, idle_timeout: float, use_tls: bool = False,
+                 start_tls: bool = True):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.use_tls = use_tls
+        self.start_tls = start_tls and not use_tls
+        self._idle: List[Tuple[aiosmtplib.SMTP, float]] = []
+        self._semaphore = asyncio.Semaphore(size)
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        client = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            timeout=self.timeout,
+            use_tls=self.use_tls,
+            start_tls=self.start_tls,
+        )
+        await client.connect()
+        try:
+            if self.username:
+                await client.login(self.username, self.password)
+        except BaseException:
+            await self._discard(client)
+            raise
+        return client
+
+    async def _discard(self, client: Optional[aiosmtplib.SMTP]):
+        if client is None or not client.is_connected:
+            return
+        try:
+            await client.quit()
+        except (aiosmtplib.SMTPException, OSError, asyncio.TimeoutError):
+            client.close()
+
+    async def _take(self) -> Optional[aiosmtplib.SMTP]:
+        while self._idle:
+            client, released_at = self._idle.pop()
+            if client.is_connected and time.monotonic() - released_at < self.idle_timeout:
+                return client
+            await self._discard(client)
+        return None
+
+    def _release(self, client: aiosmtplib.SMTP):
+        self._idle.append((client, time.monotonic()))
+
+    async def send(self, message: Message):
+        """
+        Отправляет письмо через свободное соединение пула
+
+        Raises:
+            aiosmtplib.SMTPException, OSError: Если письмо не удалось отправить
+        """
+        async with self._semaphore:
+            client = await self._take()
+            for attempt in range(2):
+                try:
+                    if client is None:
+                        client = await self._connect()
+                except CONNECT_ERRORS as e:
+                    if attempt:
+                        raise
+                    logger.info("Не удалось подключиться к SMTP серверу, повторная попытка: %s", e)
+                    continue
+
+                try:
+                    await client.send_message(message)
+                except SEND_TIMEOUT_ERRORS:
+                    await self._discard(client)
+                    raise
+                except DISCONNECT_ERRORS as e:
+                    await self._discard(client)
+                    client = None
+                    if attempt:
+                        raise
+                    logger.info("Соединение с SMTP сервером потеряно, повторная отправка: %s", e)
+                    continue
+                except BaseException:
+                    # Отказ сервера принять письмо: состояние соединения неизвестно
+                    await self._discard(client)
+                    raise
+                self._release(client)
+                return
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for client, _ in idle:
+            await self._discard(client)
@@ -3,16 +3,19 @@ from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from repositories.subscription_plans_repository import SubscriptionPlanRepository
 from models.subscription_plans import SubscriptionPlan, Quota, Price, ResourceType
+from database import after_commit
+from services.plan_catalog import plan_catalog
 
 class SubscriptionPlanService:
     def __init__(self, db: Session):
+        self.db = db
         self.repository = SubscriptionPlanRepository(db)
 
     async def create_subscription_plan(self, name: str, description: str, billing_interval: int,
                                     is_active: bool = True, has_trial: bool = False,
                                     trial_discount: float = 0.0, transfer_plan_id: str = None) -> SubscriptionPlan:
         try:
-            return self.repository.create_subscription_plan(
+            plan = await self.repository.create_subscription_plan(
                 name=name,
                 description=description,
                 billing_interval=billing_interval,
@@ -23,25 +26,43 @@ class SubscriptionPlanService:
             )
         except Exception as e:
             raise HTTPException(status_code=400, detail=str(e))
+        await self._invalidate_catalog()
+        return plan
+
+    async def _invalidate_catalog(self):
+        # Снимок каталога в воркерах пересобирается только после фиксации изменений
+        await after_commit(self.db, plan_catalog.invalidate)
 
     async def get_subscription_plan(self, plan_id: str) -> Optional[SubscriptionPlan]:
-        plan = self.repository.get_subscription_plan(plan_id)
+        plan = await self.repository.get_subscription_plan(plan_id)
         if not plan:
             raise HTTPException(status_code=404, detail="Subscription plan not found")
         return plan
 
     async def get_all_subscription_plans(self, active_only: bool = False) -> List[SubscriptionPlan]:
-        return self.repository.get_all_subscription_plans(active_only)
+        return await self.repository.get_all_subscription_plans(active_only)
 
-    async def update_subscription_plan(self, plan_id: str, **kwargs) -> SubscriptionPlan:
-        plan = self.repository.update_subscription_plan(plan_id, **kwargs)
+    async def get_subscription_plan_with_catalog(self, plan_id: str) -> SubscriptionPlan:
+        plan = await self.repository.get_subscription_plan_with_catalog(plan_id)
         if not plan:
             raise HTTPException(status_code=404, detail="Subscription plan not found")
         return plan
 
+    async def get_all_subscription_plans_with_catalog(self, active_only: bool = False) -> List[SubscriptionPlan]:
+        return await self.repository.get_all_subscription_plans_with_catalog(active_only)
+
+    async def update_subscription_plan(self, plan_id: str, **kwargs) -> SubscriptionPlan:
+        plan = await self.repository.update_subscription_plan(plan_id, **kwargs)
+        if not plan:
+            raise HTTPException(status_code=404, detail="Subscription plan not found")
+        await self._invalidate_catalog()
+        # Ответ содержит квоты и цены, загружаем их сразу, а не ленивой подгрузкой
+        return await self.get_subscription_plan_with_catalog(plan_id)
+
     async def delete_subscription_plan(self, plan_id: str) -> bool:
-        if not self.repository.delete_subscription_plan(plan_id):
+        if not await self.repository.delete_subscription_plan(plan_id):
             raise HTTPException(status_code=404, detail="Subscription plan not found")
+        await self._invalidate_catalog()
         return True
     
     # Методы для работы с квотами
@@ -51,27 +72,31 @@ class SubscriptionPlanService:
             # Проверка существования плана подписки
             await self.get_subscription_plan(plan_id)
             
-            return self.repository.add_quota(plan_id, resource_type, limit, constraints)
+            quota = await self.repository.add_quota(plan_id, resource_type, limit, constraints)
         except Exception as e:
             if isinstance(e, HTTPException):
                 raise e
             raise HTTPException(status_code=400, detail=str(e))
+        await self._invalidate_catalog()
+        return quota
     
     async def get_plan_quotas(self, plan_id: str) -> List[Quota]:
         # Проверка существования плана подписки
         await self.get_subscription_plan(plan_id)
         
-        return self.repository.get_plan_quotas(plan_id)
+        return await self.repository.get_plan_quotas(plan_id)
     
     async def update_quota(self, quota_id: str, **kwargs) -> Optional[Quota]:
-        quota = self.repository.update_quota(quota_id, **kwargs)
+        quota = await self.repository.update_quota(quota_id, **kwargs)
         if not quota:
             raise HTTPException(status_code=404, detail="Quota not found")
+        await self._invalidate_catalog()
         return quota
     
     async def delete_quota(self, quota_id: str) -> bool:
-        if not self.repository.delete_quota(quota_id):
+        if not await self.repository.delete_quota(quota_id):
             raise HTTPException(status_code=404, detail="Quota not found")
+        await self._invalidate_catalog()
         return True
     
     # Методы для работы с ценами
@@ -80,25 +105,29 @@ class SubscriptionPlanService:
             # Проверка существования плана подписки
             await self.get_subscription_plan(plan_id)
             
-            return self.repository.add_price(plan_id, amount, currency)
+            price = await self.repository.add_price(plan_id, amount, currency)
         except Exception as e:
             if isinstance(e, HTTPException):
                 raise e
             raise HTTPException(status_code=400, detail=str(e))
+        await self._invalidate_catalog()
+        return price
     
     async def get_plan_prices(self, plan_id: str) -> List[Price]:
         # Проверка существования плана подписки
         await self.get_subscription_plan(plan_id)
         
-        return self.repository.get_plan_prices(plan_id)
+        return await self.repository.get_plan_prices(plan_id)
     
     async def update_price(self, price_id: str, **kwargs) -> Optional[Price]:
-        price = self.repository.update_price(price_id, **kwargs)
+        price = await self.repository.update_price(price_id, **kwargs)
         if not price:
             raise HTTPException(status_code=404, detail="Price not found")
+        await self._invalidate_catalog()
         return price
     
     async def delete_price(self, price_id: str) -> bool:
-        if not self.repository.delete_price(price_id):
+        if not await self.repository.delete_price(price_id):
             raise HTTPException(status_code=404, detail="Price not found")
+        await self._invalidate_catalog()
         return True
\ No newline at end of file
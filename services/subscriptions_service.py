@@ -3,17 +3,19 @@ from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from repositories.subscriptions_repository import SubscriptionRepository
 from models.subscriptions import Subscription, SubscriptionStatus
-from datetime import datetime
+from datetime import datetime, timedelta
+from repositories.pagination import Page, DEFAULT_PAGE_SIZE
 
 class SubscriptionService:
     def __init__(self, db: Session):
+        self.db = db
         self.repository = SubscriptionRepository(db)
 
     async def create_subscription(self, customer_id: str, plan_id: str, invoice_id: str,
                                starts_at: datetime, ends_at: datetime,
                                status: SubscriptionStatus = SubscriptionStatus.INACTIVE) -> Subscription:
         try:
-            return self.repository.create_subscription(
+            return await self.repository.create_subscription(
                 customer_id=customer_id,
                 plan_id=plan_id,
                 invoice_id=invoice_id,
@@ -25,57 +27,65 @@ class SubscriptionService:
             raise HTTPException(status_code=400, detail=str(e))
 
     async def get_subscription(self, subscription_id: str) -> Optional[Subscription]:
-        subscription = self.repository.get_subscription(subscription_id)
+        subscription = await self.repository.get_subscription(subscription_id)
         if not subscription:
             raise HTTPException(status_code=404, detail="Subscription not found")
         return subscription
 
-    async def get_user_subscriptions(self, customer_id: str, active_only: bool = False) -> List[Subscription]:
-        return self.repository.get_user_subscriptions(customer_id, active_only)
+    async def get_user_subscriptions(self, customer_id: str, active_only: bool = False,
+                                     limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Page:
+        return await self.repository.get_user_subscriptions(customer_id, active_only, limit, cursor)
 
-    async def get_plan_subscriptions(self, plan_id: str) -> List[Subscription]:
-        return self.repository.get_plan_subscriptions(plan_id)
+    async def get_plan_subscriptions(self, plan_id: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Page:
+        return await self.repository.get_plan_subscriptions(plan_id, limit, cursor)
 
     async def update_subscription(self, subscription_id: str, **kwargs) -> Subscription:
-        subscription = self.repository.update_subscription(subscription_id, **kwargs)
+        subscription = await self.repository.update_subscription(subscription_id, **kwargs)
+        if not subscription:
+            raise HTTPException(status_code=404, detail="Subscription not found")
+        return subscription
+
+    async def extend_subscription(self, subscription_id: str, period: timedelta) -> Subscription:
+        subscription = await self.repository.extend_subscription(subscription_id, period)
         if not subscription:
             raise HTTPException(status_code=404, detail="Subscription not found")
         return subscription
 
     async def delete_subscription(self, subscription_id: str) -> bool:
-        if not self.repository.delete_subscription(subscription_id):
+        if not await self.repository.delete_subscription(subscription_id):
             raise HTTPException(status_code=404, detail="Subscription not found")
         return True
     
     async def activate_subscription(self, subscription_id: str) -> Subscription:
-        subscription = self.repository.activate_subscription(subscription_id)
+        subscription = await self.repository.activate_subscription(subscription_id)
         if not subscription:
             raise HTTPException(status_code=404, detail="Subscription not found")
         return subscription
     
     async def renew_subscription(self, subscription_id: str, new_subscription_id: str) -> Subscription:
-        subscription = self.repository.renew_subscription(subscription_id, new_subscription_id)
+        subscription = await self.repository.renew_subscription(subscription_id, new_subscription_id)
         if not subscription:
             raise HTTPException(status_code=404, detail="Subscription not found")
         return subscription
     
     async def upgrade_subscription(self, subscription_id: str, new_plan_id: str) -> Subscription:
-        subscription = self.repository.upgrade_subscription(subscription_id, new_plan_id)
+        subscription = await self.repository.upgrade_subscription(subscription_id, new_plan_id)
         if not subscription:
             raise HTTPException(status_code=404, detail="Subscription not found")
         return subscription
     
     async def downgrade_subscription(self, subscription_id: str, new_plan_id: str) -> Subscription:
-        subscription = self.repository.downgrade_subscription(subscription_id, new_plan_id)
+        subscription = await self.repository.downgrade_subscription(subscription_id, new_plan_id)
         if not subscription:
             raise HTTPException(status_code=404, detail="Subscription not found")
         return subscription
     
     async def cancel_subscription(self, subscription_id: str) -> Subscription:
-        subscription = self.repository.cancel_subscription(subscription_id)
+        subscription = await self.repository.cancel_subscription(subscription_id)
         if not subscription:
             raise HTTPException(status_code=404, detail="Subscription not found")
         return subscription
     
-    async def get_active_subscription_for_user(self, customer_id: str) -> Optional[Subscription]:
-        return self.repository.get_active_subscription_for_user(customer_id)
\ No newline at end of file
+    async def get_active_subscription_for_user(self, customer_id: str,
+                                              for_update: bool = False) -> Optional[Subscription]:
+        return await self.repository.get_active_subscription_for_user(customer_id, for_update=for_update)
\ No newline at end of file
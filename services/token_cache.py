@@ -0,0 +1,55 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from config import AuthConfig
+
+
+class DecodedTokenCache:
+    """
+    Ограниченный LRU-кэш расшифрованных JWT в памяти воркера.
+
+    Ключ — sha256 токена, запись живет до exp токена. Кэшируется только
+    результат проверки подписи и разбора, проверки отзыва выполняются
+    вызывающим кодом при каждом обращении.
+    """
+    def __init__(self, max_size: int = AuthConfig.TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, dict]" = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        payload = self._entries.get(key)
+        if payload is None:
+            return None
+
+        if payload["exp"] <= time.time():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return payload
+
+    def put(self, token: str, payload: dict):
+        if self.max_size <= 0 or not isinstance(payload.get("exp"), (int, float)):
+            return
+
+        key = self._key(token)
+        self._entries[key] = payload
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+decoded_token_cache = DecodedTokenCache()
@@ -0,0 +1,125 @@
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from jose import JWTError, jwk, jwt
+
+from config import AuthConfig
+
+
+logger = logging.getLogger("token_keys")
+
+ASYMMETRIC_ALGORITHMS = ('ES256', 'RS256')
+PRIVATE_KEY_SUFFIX = '.pem'
+PUBLIC_KEY_SUFFIX = '.pub.pem'
+
+
+@dataclass(frozen=True)
+class VerificationKey:
+    kid: str
+    algorithm: str
+    # Ключ jose, разобранный один раз: разбор PEM на каждый токен дорог
+    key: Any
+    public_jwk: dict
+
+
+class TokenKeyring:
+    """
+    Ключи подписи токенов.
+
+    Токены подписываются активным ключом алгоритма ES256 или RS256, в
+    заголовке указывается его kid; открытые ключи публикуются в JWKS, и узлы
+    VPN и бот проверяют токены без обращения к API. Для ротации новый ключ
+    сначала добавляется в каталог неактивным (попадает в JWKS), а после
+    истечения кэша JWKS у клиентов становится активным; прежний ключ
+    остается (можно только открытый, <kid>.pub.pem), пока не истекут
+    подписанные им refresh токены.
+
+    Без каталога ключей токены подписываются HS256 секретом SECRET_KEY,
+    как раньше. При асимметричной подписи токены без kid проверяются этим
+    секретом, только если явно включен ACCEPT_LEGACY_HS256.
+    """
+    def __init__(self, algorithm: str = AuthConfig.SIGNING_ALGORITHM,
+                 keys_dir: Optional[str] = AuthConfig.SIGNING_KEYS_DIR,
+                 active_kid: Optional[str] = AuthConfig.SIGNING_KID,
+                 secret_key: Optional[str] = AuthConfig.SECRET_KEY,
+                 accept_legacy: bool = AuthConfig.ACCEPT_LEGACY_HS256):
+        self.algorithm = algorithm
+        self.secret_key = secret_key
+        self.accept_legacy = accept_legacy or algorithm == 'HS256'
+        self._keys: Dict[str, VerificationKey] = {}
+        self._signing_key: Optional[Any] = None
+        self.active_kid: Optional[str] = None
+
+        if algorithm != 'HS256':
+            if algorithm not in ASYMMETRIC_ALGORITHMS:
+                raise ValueError(f"Unsupported token signing algorithm: {algorithm}")
+            self._load(keys_dir, active_kid)
+            if self.accept_legacy:
+                logger.warning("Принимаются токены без kid, подписанные SECRET_KEY: "
+                               "выключите AUTH_ACCEPT_LEGACY_HS256 после окончания перехода")
+
+        self.jwks_json = json.dumps({'keys': [key.public_jwk for key in self._keys.values()]})
+
+    def _load(self, keys_dir: Optional[str], active_kid: Optional[str]):
+        if not keys_dir or not active_kid:
+            raise ValueError(f"{self.algorithm} signing requires AUTH_SIGNING_KEYS_DIR and AUTH_SIGNING_KID")
+
+        private_keys = {}
+        for name in sorted(os.listdir(keys_dir)):
+            if name.endswith(PUBLIC_KEY_SUFFIX):
+                kid, private = name[:-len(PUBLIC_KEY_SUFFIX)], False
+            elif name.endswith(PRIVATE_KEY_SUFFIX):
+                kid, private = name[:-len(PRIVATE_KEY_SUFFIX)], True
+            else:
+                continue
+
+            with open(os.path.join(keys_dir, name)) as key_file:
+                pem = key_file.read()
+            if private:
+                private_keys[kid] = pem
+            # Открытый ключ выводится и из закрытого
+            if private or kid not in self._keys:
+                self._add_verification_key(kid, pem)
+
+        if active_kid not in private_keys:
+            raise ValueError(f"Private key {active_kid}{PRIVATE_KEY_SUFFIX} not found in {keys_dir}")
+        self._signing_key = jwk.construct(private_keys[active_kid], self.algorithm)
+        self.active_kid = active_kid
+        logger.info("Токены подписываются %s, ключ %s; ключей проверки: %s",
+                    self.algorithm, active_kid, len(self._keys))
+
+    def _add_verification_key(self, kid: str, pem: str):
+        public_key = jwk.construct(pem, self.algorithm).public_key()
+        public_jwk = {**public_key.to_dict(), 'kid': kid, 'use': 'sig', 'alg': self.algorithm}
+        self._keys[kid] = VerificationKey(kid, self.algorithm, public_key, public_jwk)
+
+    def sign(self, claims: dict) -> str:
+        if self._signing_key is None:
+            return jwt.encode(claims, self.secret_key, algorithm='HS256')
+        return jwt.encode(claims, self._signing_key, algorithm=self.algorithm,
+                          headers={'kid': self.active_kid})
+
+    def decode(self, token: str) -> dict:
+        """
+        Проверяет подпись и срок действия токена.
+        Алгоритм определяется ключом, а не заголовком токена
+
+        Raises:
+            JWTError: Если токен недействителен или ключ неизвестен
+        """
+        kid = jwt.get_unverified_header(token).get('kid')
+        if kid is None:
+            if not self.accept_legacy or not self.secret_key:
+                raise JWTError("Token without kid is not accepted")
+            return jwt.decode(token, self.secret_key, algorithms=['HS256'])
+
+        key = self._keys.get(kid)
+        if key is None:
+            raise JWTError(f"Unknown signing key: {kid}")
+        return jwt.decode(token, key.key, algorithms=[key.algorithm])
+
+
+token_keyring = TokenKeyring()
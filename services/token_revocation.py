@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from typing import Iterable, Optional
+
+from redis.exceptions import RedisError
+
+from config import AuthConfig, RedisEventsConfig
+from dependencies import redis_client, emiter
+from redis_events import SUBSCRIBED_EVENT
+
+
+logger = logging.getLogger("token_revocation")
+
+FAMILY_KEY = 'auth:family:{family}'
+REVOKED_KEY = 'auth:revoked:{family}'
+# Индекс отозванных семейств: score — время, после которого запись не нужна
+REVOKED_INDEX_KEY = 'auth:revoked'
+FAMILY_REVOKED_EVENT = 'token_family_revoked'
+
+# Ротация refresh токена: текущий jti семейства меняется на новый,
+# только если предъявлен именно текущий (иначе это повторное использование)
+ROTATE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+
+def _refresh_lifetime() -> int:
+    return AuthConfig.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
+
+
+class BloomFilter:
+    """
+    Фильтр Блума: False — значения точно нет, True — возможно есть
+    """
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: str):
+        digest = hashlib.sha256(value.encode()).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:16], 'little') | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, value: str):
+        for position in self._positions(value):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class TokenRevocationStore:
+    """
+    Семейства refresh токенов и их отзыв.
+
+    Каждый вход открывает семейство, в Redis хранится jti его последнего
+    refresh токена. Обновление заменяет его новым; предъявление старого
+    токена означает кражу, и семейство отзывается целиком вместе
+    с выданными ему access токенами.
+
+    Отозванные семейства хранятся в Redis со сроком жизни refresh токена,
+    а у каждого воркера есть фильтр Блума по ним: обычная проверка
+    «не отозван» обходится без обращения к Redis. Фильтр пополняется
+    событиями других воркеров и периодически пересобирается из Redis,
+    чтобы избавиться от истекших записей. Пересборка также выполняется
+    после переподключения к каналу событий (отзывы за время обрыва
+    не пришли), а неудачная повторяется с нарастающей паузой.
+    """
+    def __init__(self, redis, capacity: int = AuthConfig.REVOCATION_BLOOM_CAPACITY,
+                 error_rate: float = AuthConfig.REVOCATION_BLOOM_ERROR_RATE):
+        self._redis = redis
+        self._rotate = redis.register_script(ROTATE_SCRIPT)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filter = BloomFilter(capacity, error_rate)
+        self._building: Optional[set] = None
+        self._rebuild_requested = asyncio.Event()
+
+    async def start_family(self, family: str, jti: str):
+        await self._redis.set(FAMILY_KEY.format(family=family), jti, ex=_refresh_lifetime())
+
+    async def rotate(self, family: str, jti: str, new_jti: str) -> bool:
+        """
+        Заменяет текущий jti семейства новым. False — предъявлен не текущий токен
+        """
+        result = await self._rotate(
+            keys=[FAMILY_KEY.format(family=family)],
+            args=[jti, new_jti, _refresh_lifetime()],
+        )
+        return bool(int(result))
+
+    async def revoke(self, family: str):
+        """
+        Отзывает семейство: ни его refresh, ни access токены больше не принимаются
+        """
+        lifetime = _refresh_lifetime()
+        self.add_local(family)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.set(REVOKED_KEY.format(family=family), 1, ex=lifetime)
+            pipe.zadd(REVOKED_INDEX_KEY, {family: time.time() + lifetime})
+            pipe.delete(FAMILY_KEY.format(family=family))
+            await pipe.execute()
+        try:
+            await emiter.publish(RedisEventsConfig.AUTH_CHANNEL, FAMILY_REVOKED_EVENT, {'family': family})
+        except RedisError as e:
+            # Остальные воркеры узнают об отзыве при пересборке фильтра
+            logger.warning("Не удалось оповестить воркеры об отзыве токенов: %s", e)
+
+    def add_local(self, family: str):
+        self._filter.add(family)
+        if self._building is not None:
+            self._building.add(family)
+
+    async def is_revoked(self, family: Optional[str]) -> bool:
+        if not family or family not in self._filter:
+            return False
+
+        # Фильтр мог ошибиться: подтверждаем по Redis
+        try:
+            return bool(await self._redis.exists(REVOKED_KEY.format(family=family)))
+        except RedisError as e:
+            logger.warning("Не удалось проверить отзыв токена, токен отклонен: %s", e)
+            return True
+
+    async def rebuild(self) -> bool:
+        """
+        Пересобирает фильтр из действующих записей в Redis.
+        False — Redis недоступен, остался прежний фильтр
+        """
+        self._building = set()
+        try:
+            now = time.time()
+            await self._redis.zremrangebyscore(REVOKED_INDEX_KEY, '-inf', now)
+            families: Iterable[str] = await self._redis.zrangebyscore(REVOKED_INDEX_KEY, now, '+inf')
+
+            bloom = BloomFilter(max(self.capacity, len(families) * 2), self.error_rate)
+            for family in families:
+                bloom.add(family)
+            # События, пришедшие во время загрузки
+            for family in self._building:
+                bloom.add(family)
+            self._filter = bloom
+            return True
+        except RedisError as e:
+            logger.warning("Не удалось загрузить отозванные токены: %s", e)
+            return False
+        finally:
+            self._building = None
+
+    def request_rebuild(self):
+        """
+        Пересобрать фильтр в run(), не дожидаясь окончания интервала
+        """
+        self._rebuild_requested.set()
+
+    async def run(self):
+        delay = AuthConfig.REVOCATION_REBUILD_INTERVAL
+        failures = 0
+        while True:
+            try:
+                await asyncio.wait_for(self._rebuild_requested.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._rebuild_requested.clear()
+
+            if await self.rebuild():
+                failures = 0
+                delay = AuthConfig.REVOCATION_REBUILD_INTERVAL
+            else:
+                failures += 1
+                delay = min(AuthConfig.REVOCATION_RETRY_DELAY * 2 ** (failures - 1),
+                            AuthConfig.REVOCATION_REBUILD_INTERVAL)
+
+
+token_revocations = TokenRevocationStore(redis_client)
+
+
+@emiter.subscribe_on(FAMILY_REVOKED_EVENT)
+async def on_family_revoked(data):
+    token_revocations.add_local(data['family'])
+
+
+@emiter.subscribe_on(SUBSCRIBED_EVENT)
+async def on_events_subscribed(data):
+    token_revocations.request_rebuild()
@@ -1,3 +1,10 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException, status
+
+from config import PasswordHashingConfig
 from models.users import User
 
 from typing import Tuple, Optional, Annotated
@@ -14,15 +21,87 @@ class UserAlreadyExists(BaseException):
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Хеш с той же стоимостью bcrypt, что и настоящие пароли. Проверяется для
+# несуществующих пользователей, чтобы время ответа не выдавало наличие аккаунта
+DUMMY_PASSWORD_HASH = "$2b$12$bW35O9caJWjmca9G1RY6..maK9V1wAaOeq8dhbxEfV2KvyEIi7Ioi"
+
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_password_or_dummy(plain_password, hashed_password: Optional[str]) -> bool:
+    """
+    Ровно одна проверка bcrypt: при отсутствии хеша проверяется DUMMY_PASSWORD_HASH
+    и возвращается False
+    """
+    if not hashed_password:
+        verify_password(plain_password, DUMMY_PASSWORD_HASH)
+        return False
+    return verify_password(plain_password, hashed_password)
+
+
 def get_password_hash(password):
     return pwd_context.hash(password)
 
 
+class PasswordHashPool():
+    """
+    Выполняет bcrypt в отдельных процессах, чтобы не блокировать event loop.
+    Если все процессы заняты и очередь заполнена, сразу отвечает 503
+    вместо неограниченного ожидания.
+    """
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_pending = workers + max_queue
+        self.pending = 0
+        self.rejected = 0
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Сервис перегружен, повторите попытку позже",
+                headers={"Retry-After": "1"},
+            )
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hash_pool = PasswordHashPool(
+    workers=PasswordHashingConfig.WORKERS,
+    max_queue=PasswordHashingConfig.MAX_QUEUE,
+)
+
+
+async def get_password_hash_async(password) -> str:
+    return await password_hash_pool.run(get_password_hash, password)
+
+
+async def verify_password_or_dummy_async(plain_password, hashed_password: Optional[str]) -> bool:
+    return await password_hash_pool.run(verify_password_or_dummy, plain_password, hashed_password)
+
+
 async def get_user(session, username: str | None = None, user_id: int | None = None) -> Optional[User]:
     try:
         user = await session.execute(select(User).where((User.username == username) | (User.id == user_id)))
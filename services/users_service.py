@@ -3,7 +3,8 @@ from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from repositories.users_repository import UserRepository
 from models.users import User, Referals, Sources
-from services.users import get_password_hash, verify_password
+from services.users import get_password_hash_async, verify_password_or_dummy_async
+from repositories.pagination import Page, DEFAULT_PAGE_SIZE
 
 class UserService:
     def __init__(self, db: AsyncSession):
@@ -13,28 +14,30 @@ class UserService:
                         telegram_id: Optional[int] = None, password: Optional[str] = None, 
                         is_admin: bool = False) -> User:
         try:
-            # Проверка на существование пользователя с таким же username или email
-            if await self.repository.get_user_by_username(username):
-                raise HTTPException(status_code=400, detail="Username already registered")
-            
-            if email and await self.repository.get_user_by_email(email):
-                raise HTTPException(status_code=400, detail="Email already registered")
-            
-            if telegram_id and await self.repository.get_user_by_telegram_id(telegram_id):
-                raise HTTPException(status_code=400, detail="Telegram ID already registered")
-            
             # Хеширование пароля, если он предоставлен
             hashed_password = None
             if password:
-                hashed_password = get_password_hash(password)
+                hashed_password = await get_password_hash_async(password)
             
-            return await self.repository.create_user(
+            user = await self.repository.create_user(
                 username=username,
                 email=email,
                 telegram_id=telegram_id,
                 password=hashed_password,
                 is_admin=is_admin
             )
+            if user is None:
+                # Вставка не прошла из-за уникальных ограничений: выясняем, какое поле занято
+                existing = await self.repository.get_conflicting_user(username, email, telegram_id)
+                if existing is None:
+                    raise HTTPException(status_code=400, detail="User already registered")
+                if existing.username == username:
+                    raise HTTPException(status_code=400, detail="Username already registered")
+                if email and existing.email == email:
+                    raise HTTPException(status_code=400, detail="Email already registered")
+                raise HTTPException(status_code=400, detail="Telegram ID already registered")
+            
+            return user
         except Exception as e:
             if isinstance(e, HTTPException):
                 raise e
@@ -64,13 +67,17 @@ class UserService:
             raise HTTPException(status_code=404, detail="User not found")
         return user
 
-    async def get_all_users(self) -> List[User]:
-        return await self.repository.get_all_users()
+    async def get_all_users(self, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Page:
+        return await self.repository.get_all_users(limit, cursor)
 
     async def update_user(self, user_id: str, **kwargs) -> User:
         # Если обновляется пароль, хешируем его
         if 'password' in kwargs and kwargs['password']:
-            kwargs['password'] = get_password_hash(kwargs['password'])
+            kwargs['password'] = await get_password_hash_async(kwargs['password'])
+
+        # Права и пароль попадают в токены: старые токены больше не обновляются
+        if kwargs.get('password') or 'is_admin' in kwargs:
+            kwargs['token_version'] = User.token_version + 1
             
         user = await self.repository.update_user(user_id, **kwargs)
         if not user:
@@ -98,12 +105,12 @@ class UserService:
                 raise e
             raise HTTPException(status_code=400, detail=str(e))
     
-    async def get_user_referals(self, parent_id: str) -> List[Referals]:
+    async def get_user_referals(self, parent_id: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Page:
         # Проверка существования пользователя
         if not await self.repository.get_user(parent_id):
             raise HTTPException(status_code=404, detail="User not found")
         
-        return await self.repository.get_user_referals(parent_id)
+        return await self.repository.get_user_referals(parent_id, limit, cursor)
     
     # Методы для работы с источниками
     async def create_source(self, name: str) -> Sources:
@@ -124,15 +131,18 @@ class UserService:
             raise HTTPException(status_code=404, detail="Source not found")
         return source
     
-    async def get_all_sources(self) -> List[Sources]:
-        return await self.repository.get_all_sources()
+    async def get_all_sources(self, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Page:
+        return await self.repository.get_all_sources(limit, cursor)
         
     # Метод для проверки пароля пользователя
-    async def verify_user_password(self, username: str, password: str) -> Optional[User]:
-        user = await self.repository.get_user_by_username(username)
-        if not user or not user.password:
-            return None
-        
-        if verify_password(password, user.password):
+    async def verify_user_password(self, login: str, password: str) -> Optional[User]:
+        """
+        Проверяет пароль пользователя, найденного по username или email одним запросом.
+        bcrypt выполняется ровно один раз, в том числе для несуществующих пользователей
+        """
+        user = await self.repository.get_user_by_username_or_email(login)
+        hashed_password = user.password if user else None
+
+        if await verify_password_or_dummy_async(password, hashed_password):
             return user
         return None
\ No newline at end of file
@@ -0,0 +1,51 @@
+import logging
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from redis.exceptions import RedisError
+
+from config import WebhookStreamConfig
+from dependencies import redis_client
+from metrics import registry
+from routers.api_v1.schemas.webhooks_schemas import YookassaWebhookEvent
+
+
+logger = logging.getLogger("webhook_stream")
+
+received_total = registry.counter(
+    'webhooks_received_total', 'Принятые webhook ЮKassa, поставленные в поток')
+rejected_total = registry.counter(
+    'webhooks_rejected_total', 'Отклоненные webhook ЮKassa')
+
+
+async def enqueue_yookassa_webhook(body: bytes) -> str:
+    """
+    Проверяет webhook и добавляет его в поток Redis без изменений.
+    Обрабатывают поток воркеры workers.webhook_consumer
+
+    Returns:
+        str: id записи в потоке
+
+    Raises:
+        HTTPException: 400 для некорректного события, 503 если поток недоступен
+            (ЮKassa повторит доставку)
+    """
+    try:
+        event = YookassaWebhookEvent.model_validate_json(body)
+    except ValidationError as e:
+        rejected_total.inc()
+        raise HTTPException(status_code=400, detail=f"Некорректные данные webhook: {e.error_count()} ошибок")
+
+    try:
+        message_id = await redis_client.xadd(
+            WebhookStreamConfig.STREAM,
+            {'event': event.event, 'payment_id': event.object.id, 'data': body.decode()},
+            maxlen=WebhookStreamConfig.MAX_LENGTH,
+            approximate=True,
+        )
+    except RedisError as e:
+        logger.warning("Не удалось поставить webhook %s в поток: %s", event.object.id, e)
+        raise HTTPException(status_code=503, detail="Webhook не принят, повторите позже")
+
+    received_total.inc(event=event.event)
+    return message_id
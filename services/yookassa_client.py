@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from config import YookassaConfig
+
+
+logger = logging.getLogger("yookassa_client")
+
+# Ответы, после которых запрос можно повторить с тем же ключом идемпотентности
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class YookassaError(Exception):
+    def __init__(self, status_code: Optional[int], message: str, body: Optional[dict] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body or {}
+
+
+class AsyncYookassaClient:
+    """
+    Асинхронный клиент API ЮKassa.
+
+    Держит пул keep-alive соединений (httpx) на процесс, поэтому запрос
+    не ждет TLS рукопожатия и не блокирует event loop, как синхронный SDK.
+    Запросы на создание передают Idempotence-Key, и при сетевой ошибке,
+    ответе 5xx/429 или 202 («обрабатывается») повторяются с тем же ключом:
+    ЮKassa вернет уже созданный объект, а не создаст второй. Все попытки
+    вместе с паузами укладываются в total_timeout: повтор, который
+    не успеет до этого срока, не выполняется.
+    """
+    def __init__(self, shop_id: Optional[str], secret_key: Optional[str],
+                 base_url: str = YookassaConfig.API_URL,
+                 timeout: float = YookassaConfig.TIMEOUT,
+                 connect_timeout: float = YookassaConfig.CONNECT_TIMEOUT,
+                 max_connections: int = YookassaConfig.MAX_CONNECTIONS,
+                 retries: int = YookassaConfig.RETRIES,
+                 retry_delay: float = YookassaConfig.RETRY_DELAY,
+                 total_timeout: float = YookassaConfig.TOTAL_TIMEOUT,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.shop_id = shop_id
+        self.secret_key = secret_key
+        self.base_url = base_url
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_connections)
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.total_timeout = total_timeout
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Клиент создается в работающем event loop при первом запросе
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                auth=(self.shop_id or '', self.secret_key or ''),
+                timeout=self.timeout,
+                limits=self.limits,
+                transport=self.transport,
+            )
+        return self._client
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        # На 202 ЮKassa сообщает, через сколько миллисекунд повторить запрос
+        if response is not None and response.status_code == 202:
+            try:
+                return float(response.json().get('retry_after', 1000)) / 1000
+            except ValueError:
+                pass
+        return self.retry_delay * 2 ** attempt * random.uniform(0.8, 1.2)
+
+    async def _request(self, method: str, path: str, json: Optional[dict] = None,
+                       idempotence_key: Optional[str] = None) -> Dict[str, Any]:
+        headers = {'Idempotence-Key': idempotence_key} if idempotence_key else None
+        client = self._get_client()
+        deadline = time.monotonic() + self.total_timeout
+
+        for attempt in range(self.retries + 1):
+            # Таймаут попытки не выходит за общий срок запроса
+            remaining = max(deadline - time.monotonic(), 0.001)
+            timeout = httpx.Timeout(min(self.timeout.read, remaining),
+                                    connect=min(self.timeout.connect, remaining))
+            try:
+                response = await client.request(method, path, json=json, headers=headers, timeout=timeout)
+            except httpx.TransportError as e:
+                delay = self._backoff(attempt)
+                if attempt == self.retries or time.monotonic() + delay >= deadline:
+                    raise YookassaError(None, f"ЮKassa недоступна: {e}")
+                logger.info("Ошибка соединения с ЮKassa, повтор %s: %s", attempt + 1, e)
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status_code == 202 or response.status_code in RETRY_STATUS_CODES:
+                delay = self._backoff(attempt, response)
+                if attempt == self.retries or time.monotonic() + delay >= deadline:
+                    raise YookassaError(response.status_code, f"ЮKassa не обработала запрос: {response.text}")
+                await asyncio.sleep(delay)
+                continue
+
+            try:
+                body = response.json()
+            except ValueError:
+                raise YookassaError(response.status_code, f"Некорректный ответ ЮKassa: {response.text}")
+            if response.is_error:
+                raise YookassaError(response.status_code, body.get('description', response.text), body)
+            return body
+
+    async def create_payment(self, payment_data: Dict[str, Any], idempotence_key: str) -> Dict[str, Any]:
+        return await self._request('POST', '/payments', json=payment_data, idempotence_key=idempotence_key)
+
+    async def get_payment(self, payment_id: str) -> Dict[str, Any]:
+        return await self._request('GET', f'/payments/{payment_id}')
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+yookassa_client = AsyncYookassaClient(YookassaConfig.SHOP_ID, YookassaConfig.SECRET_KEY)
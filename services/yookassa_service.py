@@ -1,6 +1,6 @@
 from typing import Optional, Dict, Any
-from yookassa import Configuration, Payment as YooKassaPayment
 from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import uuid4
 from datetime import datetime, timedelta
 
@@ -8,26 +8,32 @@ from models.payments import Payment, PaymentMethod, PaymentMethods, PaymentKassa
 from models.subscriptions import Subscription, SubscriptionStatus
 from services.subscriptions_service import SubscriptionService
 from services.payments_service import PaymentService
+from services.yookassa_client import AsyncYookassaClient, YookassaError, yookassa_client
+from database import UnitOfWork
+
+
+# Статусы, после которых платеж уже не меняется
+FINAL_PAYMENT_STATUSES = ("succeeded", "canceled")
 
 
 class YookassaService:
-    def __init__(self, shop_id: str, secret_key: str):
-        Configuration.account_id = shop_id
-        Configuration.secret_key = secret_key
-        self.payment_service = None
-        self.subscription_service = None
-    
-    def set_services(self, payment_service: PaymentService, subscription_service: SubscriptionService):
-        self.payment_service = payment_service
-        self.subscription_service = subscription_service
+    """
+    Платежи ЮKassa. Создается на запрос или на событие вместе с сессией,
+    с которой работают сервисы платежей и подписок
+    """
+    def __init__(self, db: AsyncSession, client: AsyncYookassaClient = yookassa_client):
+        self.db = db
+        self.client = client
+        self.payment_service = PaymentService(db)
+        self.subscription_service = SubscriptionService(db)
     
     async def create_payment(self, user_id: str, amount: float, currency: str, 
                            subscription_plan_id: str, description: str, 
-                           return_url: str) -> Dict[str, Any]:
+                           return_url: str, idempotence_key: Optional[str] = None) -> Dict[str, Any]:
         """
         Создает платеж в Yookassa и возвращает данные для оплаты
         """
-        idempotence_key = str(uuid4())
+        idempotence_key = idempotence_key or str(uuid4())
         
         payment_data = {
             "amount": {
@@ -48,36 +54,43 @@ class YookassaService:
         
         try:
             # Создаем платеж в Yookassa
-            yookassa_payment = YooKassaPayment.create(payment_data, idempotence_key)
+            yookassa_payment = await self.client.create_payment(payment_data, idempotence_key)
+            confirmation_url = yookassa_payment["confirmation"]["confirmation_url"]
             
             # Сохраняем платеж в нашей базе данных
-            if self.payment_service:
-                await self.payment_service.create_payment(
-                    user_id=user_id,
-                    amount=amount,
-                    currency=currency,
-                    subscription_plan_id=subscription_plan_id,
-                    payment_method=PaymentMethods.RU_DEBIT_CARD.value,  # По умолчанию, будет обновлено после оплаты
-                    payment_kassa=PaymentKassa.YOOKASSA.value,
-                    transaction_id=yookassa_payment.id,
-                    status=yookassa_payment.status,
-                    metadata={
-                        "yookassa_id": yookassa_payment.id,
-                        "confirmation_url": yookassa_payment.confirmation.confirmation_url
-                    }
-                )
+            await self.payment_service.create_payment(
+                user_id=user_id,
+                amount=amount,
+                currency=currency,
+                subscription_plan_id=subscription_plan_id,
+                payment_method=PaymentMethods.RU_DEBIT_CARD.value,  # По умолчанию, будет обновлено после оплаты
+                payment_kassa=PaymentKassa.YOOKASSA.value,
+                transaction_id=yookassa_payment["id"],
+                status=yookassa_payment["status"],
+                metadata={
+                    "yookassa_id": yookassa_payment["id"],
+                    "confirmation_url": confirmation_url
+                }
+            )
             
             return {
-                "payment_id": yookassa_payment.id,
-                "confirmation_url": yookassa_payment.confirmation.confirmation_url,
-                "status": yookassa_payment.status
+                "payment_id": yookassa_payment["id"],
+                "confirmation_url": confirmation_url,
+                "status": yookassa_payment["status"]
             }
+        except YookassaError as e:
+            # Сетевые ошибки и сбои на стороне ЮKassa — временная недоступность
+            status_code = 400 if e.status_code and e.status_code < 500 and e.status_code != 429 else 503
+            raise HTTPException(status_code=status_code, detail=f"Ошибка при создании платежа: {str(e)}")
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Ошибка при создании платежа: {str(e)}")
     
     async def process_webhook(self, event_data: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Обрабатывает webhook от Yookassa
+        Обрабатывает webhook от Yookassa.
+        Повторная доставка того же события ничего не меняет: строка платежа
+        блокируется на время обработки, а уже примененный или окончательный
+        статус не обрабатывается заново
         """
         try:
             event_type = event_data.get("event")
@@ -97,49 +110,56 @@ class YookassaService:
             if not payment_id or not user_id or not subscription_plan_id:
                 raise HTTPException(status_code=400, detail="Отсутствуют необходимые данные в метаданных")
             
-            # Обновляем статус платежа в нашей базе данных
-            if self.payment_service:
-                payment = await self.payment_service.get_payment_by_transaction_id(payment_id)
-                if payment:
-                    # Обновляем статус платежа
-                    await self.payment_service.update_payment(
-                        payment.id,
-                        status=status
+            # Обновляем статус платежа в нашей базе данных.
+            # Все изменения фиксируются одной транзакцией в конце обработки
+            async with UnitOfWork(self.db):
+                payment = await self.payment_service.get_payment_by_transaction_id(payment_id, for_update=True)
+                if payment.status == status or payment.status in FINAL_PAYMENT_STATUSES:
+                    return {"status": "success", "message": f"Webhook уже обработан: {event_type}"}
+
+                # Обновляем статус платежа
+                await self.payment_service.update_payment(
+                    payment.id,
+                    status=status
+                )
+            
+                # Если платеж успешен, создаем или продлеваем подписку
+                if status == "succeeded":
+                    # Сохраняем метод оплаты для автосписаний
+                    payment_method_id = payment_data.get("payment_method", {}).get("id")
+                    if payment_method_id:
+                        await self.payment_service.add_payment_method(
+                            user_id=user_id,
+                            method_name=payment_data.get("payment_method", {}).get("type", "card"),
+                            method_id=payment_method_id
+                        )
+                
+                    # Проверяем, есть ли активная подписка у пользователя.
+                    # Читается из основной базы с блокировкой строки, а не из кэша
+                    active_subscription = await self.subscription_service.get_active_subscription_for_user(
+                        user_id, for_update=True
                     )
-                    
-                    # Если платеж успешен, создаем или продлеваем подписку
-                    if status == "succeeded" and self.subscription_service:
-                        # Сохраняем метод оплаты для автосписаний
-                        payment_method_id = payment_data.get("payment_method", {}).get("id")
-                        if payment_method_id:
-                            await self.payment_service.add_payment_method(
-                                user_id=user_id,
-                                method_name=payment_data.get("payment_method", {}).get("type", "card"),
-                                method_id=payment_method_id
-                            )
-                        
-                        # Проверяем, есть ли активная подписка у пользователя
-                        active_subscription = await self.subscription_service.get_active_subscription_for_user(user_id)
-                        
-                        if active_subscription:
-                            # Продлеваем существующую подписку
-                            new_ends_at = active_subscription.ends_at + timedelta(days=30)  # Предполагаем месячную подписку
-                            await self.subscription_service.update_subscription(
-                                active_subscription.id,
-                                ends_at=new_ends_at
-                            )
-                        else:
-                            # Создаем новую подписку
-                            now = datetime.now()
-                            await self.subscription_service.create_subscription(
-                                customer_id=user_id,
-                                plan_id=subscription_plan_id,
-                                invoice_id=payment.id,
-                                starts_at=now,
-                                ends_at=now + timedelta(days=30),  # Предполагаем месячную подписку
-                                status=SubscriptionStatus.ACTIVE
-                            )
+                
+                    if active_subscription:
+                        # Продлеваем существующую подписку
+                        await self.subscription_service.extend_subscription(
+                            active_subscription.id,
+                            timedelta(days=30)  # Предполагаем месячную подписку
+                        )
+                    else:
+                        # Создаем новую подписку
+                        now = datetime.now()
+                        await self.subscription_service.create_subscription(
+                            customer_id=user_id,
+                            plan_id=subscription_plan_id,
+                            invoice_id=payment.id,
+                            starts_at=now,
+                            ends_at=now + timedelta(days=30),  # Предполагаем месячную подписку
+                            status=SubscriptionStatus.ACTIVE
+                        )
             
             return {"status": "success", "message": f"Webhook обработан успешно: {event_type}"}
+        except HTTPException:
+            raise
         except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Ошибка при обработке webhook: {str(e)}")
\ No newline at end of file
+            raise HTTPException(status_code=500, detail=f"Ошибка при обработке webhook: {str(e)}")
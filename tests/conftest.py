@@ -0,0 +1,141 @@
+import os
+import uuid
+
+# Модули конфигурации читают окружение при импорте
+os.environ.setdefault('POSTGRES_DB_PORT', '5432')
+os.environ.setdefault('SECRET_KEY', 'test-secret')
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+
+# Типы PostgreSQL, которые нужны моделям, для тестов на SQLite
+@compiles(UUID, 'sqlite')
+def _compile_uuid(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+@compiles(JSONB, 'sqlite')
+def _compile_jsonb(type_, compiler, **kw):
+    return "JSON"
+
+
+class FakeRedis:
+    """
+    Хранилище строк в памяти с подмножеством команд Redis, которые нужны кэшам
+    """
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+
+@pytest.fixture
+def fake_redis():
+    return FakeRedis()
+
+
+async def _create_sqlite_engine():
+    import models
+    from models.base import Base
+
+    # Значения по умолчанию outbox записаны на диалекте PostgreSQL
+    tables = [table for table in Base.metadata.sorted_tables if table.name != 'email_outbox']
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all, tables=tables)
+    return engine
+
+
+@pytest.fixture
+async def sqlite_engine():
+    """
+    Движок SQLite в памяти со схемой моделей: для тестов, которым не нужны
+    особенности PostgreSQL
+    """
+    engine = await _create_sqlite_engine()
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def sqlite_replica_engine():
+    """
+    Вторая, независимая база SQLite: реплика в тестах маршрутизации запросов
+    """
+    engine = await _create_sqlite_engine()
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def sqlite_session_factory(sqlite_engine):
+    return sessionmaker(bind=sqlite_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.fixture
+async def lua_redis():
+    """
+    Redis с поддержкой Lua-скриптов: TEST_REDIS_URL (redis://...), а без
+    него fakeredis с lupa. База очищается до и после теста
+    """
+    url = os.getenv('TEST_REDIS_URL')
+    if url:
+        import redis.asyncio as redis
+        client = redis.from_url(url, decode_responses=True)
+    else:
+        fakeredis = pytest.importorskip('fakeredis')
+        pytest.importorskip('lupa')
+        client = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    await client.flushdb()
+    yield client
+    await client.flushdb()
+    await client.close()
+
+
+@pytest.fixture
+async def pg_engine():
+    """
+    Движок PostgreSQL со схемой моделей в отдельной временной схеме.
+    Тесты, которым нужен планировщик PostgreSQL, пропускаются без
+    TEST_DATABASE_URL (postgresql+asyncpg://...)
+    """
+    url = os.getenv('TEST_DATABASE_URL')
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+
+    import models
+    from models.base import Base
+
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    admin = create_async_engine(url)
+    async with admin.begin() as connection:
+        await connection.execute(text(f'CREATE SCHEMA "{schema}"'))
+
+    engine = create_async_engine(url, connect_args={"server_settings": {"search_path": schema}})
+    try:
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        yield engine
+    finally:
+        await engine.dispose()
+        async with admin.begin() as connection:
+            await connection.execute(text(f'DROP SCHEMA "{schema}" CASCADE'))
+        await admin.dispose()
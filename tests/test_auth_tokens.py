@@ -0,0 +1,129 @@
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from redis.exceptions import ConnectionError
+
+import services.auth as auth
+import services.token_revocation as token_revocation
+from models.users import User
+from services.token_revocation import FAMILY_KEY, TokenRevocationStore
+
+
+pytestmark = pytest.mark.anyio
+
+
+class RevokedOnlyRedis:
+    """
+    Только проверка отзыва: считает обращения и может быть недоступен
+    """
+    def __init__(self, revoked=(), available: bool = True):
+        self.revoked = set(revoked)
+        self.available = available
+        self.checks = 0
+
+    def register_script(self, script):
+        return None
+
+    async def exists(self, key):
+        self.checks += 1
+        if not self.available:
+            raise ConnectionError("Connection refused")
+        return int(key in self.revoked)
+
+
+@pytest.fixture
+def store(lua_redis, monkeypatch):
+    store = TokenRevocationStore(lua_redis)
+    published = []
+
+    async def publish(channel, event, data):
+        published.append(data)
+
+    monkeypatch.setattr(auth, 'token_revocations', store)
+    monkeypatch.setattr(token_revocation.emiter, 'publish', publish)
+    store.published = published
+    return store
+
+
+@pytest.fixture
+def user(monkeypatch):
+    user = User(id=uuid.uuid4(), username='user', is_admin=False, email_verified=True, token_version=0)
+
+    async def get_user(database, user_id):
+        return user if user_id == str(user.id) else None
+
+    monkeypatch.setattr(auth, 'get_user', get_user)
+    return user
+
+
+async def test_rotate_is_compare_and_set(store, lua_redis):
+    await store.start_family('family', 'jti-1')
+
+    assert await store.rotate('family', 'jti-1', 'jti-2')
+    assert not await store.rotate('family', 'jti-1', 'jti-3')
+    assert await lua_redis.get(FAMILY_KEY.format(family='family')) == 'jti-2'
+
+
+async def test_refresh_token_reuse_revokes_family(store, user):
+    first = await auth.create_token_pair(user)
+    second = await auth.rotate_refresh_token(None, first['refresh_token'])
+    family = auth.verify_refresh_token(second['refresh_token'])['fam']
+
+    with pytest.raises(HTTPException) as error:
+        await auth.rotate_refresh_token(None, first['refresh_token'])
+
+    assert error.value.status_code == 401
+    assert await store.is_revoked(family)
+    assert store.published == [{'family': family}]
+    # Вместе с семейством отзываются и выданные ему токены
+    with pytest.raises(HTTPException):
+        await auth.rotate_refresh_token(None, second['refresh_token'])
+    with pytest.raises(HTTPException):
+        await auth.get_current_principal(second['access_token'])
+
+
+async def test_logout_revokes_access_token(store, user):
+    tokens = await auth.create_token_pair(user)
+    principal = await auth.get_current_principal(tokens['access_token'])
+
+    await auth.revoke_session(principal)
+
+    with pytest.raises(HTTPException) as error:
+        await auth.get_current_principal(tokens['access_token'])
+    assert error.value.status_code == 401
+    with pytest.raises(HTTPException):
+        await auth.rotate_refresh_token(None, tokens['refresh_token'])
+
+
+async def test_wrong_token_type_is_rejected(store, user):
+    tokens = await auth.create_token_pair(user)
+
+    assert auth.verify_token(tokens['refresh_token']) is None
+    assert auth.verify_refresh_token(tokens['access_token']) is None
+    with pytest.raises(HTTPException):
+        await auth.get_current_principal(tokens['refresh_token'])
+    with pytest.raises(HTTPException):
+        await auth.rotate_refresh_token(None, tokens['access_token'])
+
+
+async def test_is_revoked_checks_redis_only_on_filter_hit():
+    redis = RevokedOnlyRedis(revoked={'auth:revoked:revoked'})
+    store = TokenRevocationStore(redis)
+
+    assert not await store.is_revoked('active')
+    assert not await store.is_revoked(None)
+    assert redis.checks == 0
+
+    store.add_local('revoked')
+    assert await store.is_revoked('revoked')
+    assert redis.checks == 1
+
+
+async def test_is_revoked_fails_closed_without_redis():
+    redis = RevokedOnlyRedis(available=False)
+    store = TokenRevocationStore(redis)
+    store.add_local('family')
+
+    assert await store.is_revoked('family')
+    assert not await store.is_revoked('other')
@@ -0,0 +1,156 @@
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import workers.email_outbox as worker
+from config import EmailOutboxConfig
+from models.email_outbox import EmailOutbox, EmailOutboxStatus
+from repositories.email_outbox_repository import EmailOutboxRepository
+from services.email_outbox_service import EMAIL_VERIFICATION
+
+
+pytestmark = pytest.mark.anyio
+
+
+class RecordingRepository:
+    """
+    Очередь писем в памяти: выдает заданный пакет и записывает результаты
+    """
+    def __init__(self, emails):
+        self.emails = emails
+        self.sent = []
+        self.failed = {}
+
+    def __call__(self, session):
+        return self
+
+    async def claim_due(self, limit, lease_seconds):
+        emails, self.emails = self.emails[:limit], self.emails[limit:]
+        return emails
+
+    async def mark_sent(self, email_ids):
+        self.sent.extend(email_ids)
+
+    async def mark_failed(self, email_id, error, retry_in):
+        self.failed[email_id] = (error, retry_in)
+
+
+def _email(recipient, kind=EMAIL_VERIFICATION, attempts=1):
+    return SimpleNamespace(id=uuid.uuid4(), kind=kind, recipient=recipient, payload={'user_id': 'user'},
+                           attempts=attempts, created_at=datetime.now(timezone.utc))
+
+
+@pytest.fixture
+def backoff(monkeypatch):
+    monkeypatch.setattr(EmailOutboxConfig, 'MAX_ATTEMPTS', 4)
+    monkeypatch.setattr(EmailOutboxConfig, 'BACKOFF_BASE', 10)
+    monkeypatch.setattr(EmailOutboxConfig, 'BACKOFF_MAX', 25)
+
+
+def test_retry_delay_backs_off_until_attempts_run_out(backoff):
+    assert 8 <= worker.retry_delay(1) <= 12
+    assert 16 <= worker.retry_delay(2) <= 24
+    assert 20 <= worker.retry_delay(3) <= 30
+    assert worker.retry_delay(4) is None
+
+
+async def test_deliver_batch_records_results(backoff, monkeypatch, sqlite_session_factory):
+    delivered = _email('ok@example.com')
+    refused = _email('refused@example.com')
+    exhausted = _email('exhausted@example.com', attempts=4)
+    unknown = _email('unknown@example.com', kind='newsletter')
+    repository = RecordingRepository([delivered, refused, exhausted, unknown])
+
+    async def deliver_verification_email(user_id, recipient):
+        if recipient != delivered.recipient:
+            raise ConnectionError("SMTP unavailable")
+
+    monkeypatch.setattr(worker, 'async_session', sqlite_session_factory)
+    monkeypatch.setattr(worker, 'EmailOutboxRepository', repository)
+    monkeypatch.setattr(worker.email_service, 'deliver_verification_email', deliver_verification_email)
+
+    assert await worker.deliver_batch(10) == 4
+
+    assert repository.sent == [delivered.id]
+    error, retry_in = repository.failed[refused.id]
+    assert error == "ConnectionError: SMTP unavailable"
+    assert 8 <= retry_in <= 12
+    assert repository.failed[exhausted.id][1] is None
+    # Неизвестный тип не повторяется, хотя попытки не исчерпаны
+    assert repository.failed[unknown.id] == ("UndeliverableEmail: Unknown email kind: newsletter", None)
+
+
+async def test_deliver_batch_without_due_emails(monkeypatch, sqlite_session_factory):
+    monkeypatch.setattr(worker, 'async_session', sqlite_session_factory)
+    monkeypatch.setattr(worker, 'EmailOutboxRepository', RecordingRepository([]))
+
+    assert await worker.deliver_batch(10) == 0
+
+
+def _session(pg_engine):
+    return AsyncSession(pg_engine, expire_on_commit=False)
+
+
+async def _add_emails(pg_engine, count):
+    async with _session(pg_engine) as session:
+        repository = EmailOutboxRepository(session)
+        return [(await repository.add_email(EMAIL_VERIFICATION, f'{i}@example.com', {})).id
+                for i in range(count)]
+
+
+async def _row(pg_engine, email_id):
+    async with _session(pg_engine) as session:
+        return (await session.execute(select(EmailOutbox).where(EmailOutbox.id == email_id))).scalar_one()
+
+
+async def test_claim_due_leases_due_emails(pg_engine):
+    due, later = await _add_emails(pg_engine, 2)
+    async with _session(pg_engine) as session:
+        await session.execute(update(EmailOutbox).where(EmailOutbox.id == later)
+                              .values(next_attempt_at=datetime(2100, 1, 1, tzinfo=timezone.utc)))
+        await session.commit()
+
+    async with _session(pg_engine) as session:
+        claimed = await EmailOutboxRepository(session).claim_due(10, lease_seconds=60)
+        await session.commit()
+
+    assert [(email.id, email.attempts) for email in claimed] == [(due, 1)]
+    row = await _row(pg_engine, due)
+    assert 50 < (row.next_attempt_at - datetime.now(timezone.utc)).total_seconds() <= 60
+    # Пока аренда не истекла, письмо не выдается повторно
+    async with _session(pg_engine) as session:
+        assert await EmailOutboxRepository(session).claim_due(10, lease_seconds=60) == []
+
+
+async def test_claim_due_skips_rows_locked_by_another_worker(pg_engine):
+    await _add_emails(pg_engine, 2)
+
+    async with _session(pg_engine) as first, _session(pg_engine) as second:
+        [locked] = await EmailOutboxRepository(first).claim_due(1, lease_seconds=60)
+        # Первый воркер еще не зафиксировал аренду: строка заблокирована
+        claimed = await EmailOutboxRepository(second).claim_due(10, lease_seconds=60)
+        await first.rollback()
+
+    assert len(claimed) == 1
+    assert claimed[0].id != locked.id
+
+
+async def test_mark_failed_schedules_retry_or_gives_up(pg_engine):
+    retried, given_up = await _add_emails(pg_engine, 2)
+
+    async with _session(pg_engine) as session:
+        repository = EmailOutboxRepository(session)
+        await repository.mark_failed(retried, 'timeout', retry_in=120)
+        await repository.mark_failed(given_up, 'x' * 5000, retry_in=None)
+
+    row = await _row(pg_engine, retried)
+    assert row.status == EmailOutboxStatus.PENDING
+    assert row.last_error == 'timeout'
+    assert 110 < (row.next_attempt_at - datetime.now(timezone.utc)).total_seconds() <= 120
+    row = await _row(pg_engine, given_up)
+    assert row.status == EmailOutboxStatus.FAILED
+    assert len(row.last_error) == 1000
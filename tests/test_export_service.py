@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from models.users import User
+from services.export_service import ExportService, ExportFormat
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def _collect(chunks) -> str:
+    return ''.join([chunk async for chunk in chunks])
+
+
+async def test_empty_csv_export_has_header(sqlite_session_factory):
+    service = ExportService(sqlite_session_factory)
+
+    body = await _collect(service.export_subscriptions(ExportFormat.CSV))
+
+    assert body.splitlines() == [
+        "id,customer_id,plan_id,invoice_id,starts_at,ends_at,renewed_at,renewed_subscription_id,"
+        "downgraded_at,downgraded_to_plan_id,upgraded_at,upgraded_to_plan_id,cancelled_at,"
+        "created_at,deleted_at,status"
+    ]
+
+
+async def test_export_opens_its_own_session(sqlite_session_factory):
+    async with sqlite_session_factory() as session:
+        session.add(User(username='alice', email='alice@example.com', password='hash'))
+        await session.commit()
+
+    # Сессия запроса к моменту передачи ответа уже закрыта: выгрузка от нее не зависит
+    service = ExportService(sqlite_session_factory)
+    body = await _collect(service.export_users(ExportFormat.NDJSON))
+
+    rows = [json.loads(line) for line in body.splitlines()]
+    assert [row['username'] for row in rows] == ['alice']
+    assert 'password' not in rows[0]
@@ -0,0 +1,37 @@
+import uuid
+
+import httpx
+import pytest
+
+from main import init_app
+from models.payments import Payment
+from repositories.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+
+pytestmark = pytest.mark.anyio
+
+
+def test_cursor_round_trip():
+    key = uuid.uuid4()
+    assert decode_cursor(encode_cursor(key), Payment.id) == key
+
+
+@pytest.mark.parametrize('cursor', ['not base64!', encode_cursor('not a uuid'), 'e30'])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, Payment.id)
+
+
+async def test_invalid_cursor_is_bad_request():
+    app = init_app()
+
+    @app.get('/paged')
+    async def paged(cursor: str):
+        return decode_cursor(cursor, Payment.id)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+        response = await client.get('/paged', params={'cursor': 'broken'})
+
+    assert response.status_code == 400
+    assert response.json() == {'detail': 'Invalid cursor'}
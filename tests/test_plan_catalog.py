@@ -0,0 +1,68 @@
+import pytest
+
+from services import plan_catalog as plan_catalog_module
+from services.plan_catalog import PlanCatalog
+
+
+pytestmark = pytest.mark.anyio
+
+
+class ChangingCatalog(PlanCatalog):
+    """
+    Каталог, в котором во время первых загрузок приходят пометки об изменении
+    """
+    def __init__(self, changes_during_load: int):
+        super().__init__(ttl=300)
+        self.changes_during_load = changes_during_load
+        self.loads = 0
+
+    async def _load(self):
+        self.loads += 1
+        if self.loads <= self.changes_during_load:
+            self.on_invalidated(self.loads)
+        return (), {}
+
+
+@pytest.fixture(autouse=True)
+def catalog_redis(fake_redis, monkeypatch):
+    monkeypatch.setattr(plan_catalog_module, 'redis_client', fake_redis)
+    return fake_redis
+
+
+async def test_invalidation_during_load_triggers_another_rebuild():
+    catalog = ChangingCatalog(changes_during_load=1)
+
+    await catalog.get()
+
+    assert catalog.loads == 2
+    assert not catalog._needs_rebuild()
+
+
+async def test_snapshot_stays_stale_while_catalog_keeps_changing():
+    catalog = ChangingCatalog(changes_during_load=10)
+
+    await catalog.get()
+
+    # Число пересборок за один вызов ограничено, следующий вызов продолжит
+    assert catalog.loads == plan_catalog_module.MAX_REBUILD_ATTEMPTS
+    assert catalog._needs_rebuild()
+
+
+async def test_fresh_snapshot_is_not_rebuilt():
+    catalog = ChangingCatalog(changes_during_load=0)
+
+    await catalog.get()
+    await catalog.get()
+
+    assert catalog.loads == 1
+
+
+async def test_reconnect_of_event_reader_marks_catalog_stale(monkeypatch):
+    catalog = ChangingCatalog(changes_during_load=0)
+    monkeypatch.setattr(plan_catalog_module, 'plan_catalog', catalog)
+    await catalog.get()
+
+    await plan_catalog_module.on_events_subscribed({})
+    await catalog.get()
+
+    assert catalog.loads == 2
@@ -0,0 +1,124 @@
+import uuid
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.subscription_plans import SubscriptionPlan
+from models.users import User
+from repositories.payments_repository import PaymentRepository
+from repositories.subscription_plans_repository import SubscriptionPlanRepository
+from repositories.subscriptions_repository import SubscriptionRepository
+from repositories.users_repository import UserRepository
+
+
+pytestmark = pytest.mark.anyio
+
+# При выключенном последовательном чтении планировщик может выбрать любой из них
+INDEX_SCANS = ('Index Scan', 'Index Only Scan', 'Bitmap Index Scan')
+# Запросы, план которых проверяется (вставки тестовых данных пропускаются)
+EXPLAINED_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+
+
+def _plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from _plan_nodes(child)
+
+
+async def _add_plan(session) -> SubscriptionPlan:
+    user = User(id=uuid.uuid4(), username=f'user-{uuid.uuid4().hex}')
+    plan = SubscriptionPlan(id=uuid.uuid4(), name='Plan', transfer_plan_id=user.id)
+    session.add(user)
+    await session.flush()
+    session.add(plan)
+    await session.flush()
+    return plan
+
+
+async def _catalog(session):
+    plan = await _add_plan(session)
+    session.expunge_all()
+    await SubscriptionPlanRepository(session).get_subscription_plan_with_catalog(plan.id)
+
+
+async def _index_scans(pg_engine, call) -> set:
+    """
+    Выполняет call(session) в транзакции, которая затем откатывается,
+    и возвращает индексы, по которым идут планы его запросов
+    """
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+            statements.append((statement, parameters))
+
+    async with pg_engine.connect() as connection:
+        # На пустой таблице последовательное чтение всегда дешевле: проверяем,
+        # что условие запроса совпадает с индексом
+        await connection.execute(text("SET enable_seqscan = off"))
+        # Обобщенный план подготовленного запроса не знает значений параметров
+        await connection.execute(text("SET plan_cache_mode = force_generic_plan"))
+
+        event.listen(connection.sync_connection, 'before_cursor_execute', capture)
+        try:
+            await call(AsyncSession(bind=connection))
+        finally:
+            event.remove(connection.sync_connection, 'before_cursor_execute', capture)
+
+        scans = set()
+        for statement, parameters in statements:
+            result = await connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters)
+            scans.update(
+                node.get('Index Name') for node in _plan_nodes(result.scalar()[0]['Plan'])
+                if node['Node Type'] in INDEX_SCANS
+            )
+        await connection.rollback()
+    return scans
+
+
+QUERIES = [
+    ('active_subscription',
+     lambda session: SubscriptionRepository(session)._get_active_subscription_for_user(uuid.uuid4()),
+     'ix_subscriptions_customer_active'),
+    ('user_subscriptions',
+     lambda session: SubscriptionRepository(session).get_user_subscriptions(uuid.uuid4()),
+     'ix_subscriptions_customer_id'),
+    ('plan_subscriptions',
+     lambda session: SubscriptionRepository(session).get_plan_subscriptions(uuid.uuid4()),
+     'ix_subscriptions_plan_id'),
+    ('expire_due_subscriptions',
+     lambda session: SubscriptionRepository(session).expire_due_subscriptions(100),
+     'ix_subscriptions_status_ends_at'),
+    ('expiry_lag',
+     lambda session: SubscriptionRepository(session).get_expiry_lag(),
+     'ix_subscriptions_status_ends_at'),
+    ('user_payments',
+     lambda session: PaymentRepository(session).get_user_payments(uuid.uuid4()),
+     'ix_payments_user_id'),
+    ('payment_by_transaction_id',
+     lambda session: PaymentRepository(session).get_payment_by_transaction_id('tx-1', for_update=True),
+     'payments_transaction_id_key'),
+    ('user_payment_methods',
+     lambda session: PaymentRepository(session).get_user_payment_methods(uuid.uuid4()),
+     'ix_payment_methods_user'),
+    ('user_referals',
+     lambda session: UserRepository(session).get_user_referals(uuid.uuid4()),
+     'ix_referals_parent'),
+    ('plan_quotas',
+     lambda session: SubscriptionPlanRepository(session).get_plan_quotas(uuid.uuid4()),
+     'ix_quotas_subscription_plan_id'),
+    ('plan_prices',
+     lambda session: SubscriptionPlanRepository(session).get_plan_prices(uuid.uuid4()),
+     'ix_prices_subscription_plan_id'),
+    # selectinload квот и цен плана (WHERE subscription_plan_id IN (...))
+    ('catalog_quotas', _catalog, 'ix_quotas_subscription_plan_id'),
+    ('catalog_prices', _catalog, 'ix_prices_subscription_plan_id'),
+]
+
+
+@pytest.mark.parametrize('call, index', [(call, index) for _, call, index in QUERIES],
+                         ids=[name for name, _, _ in QUERIES])
+async def test_repository_query_uses_index(pg_engine, call, index):
+    scans = await _index_scans(pg_engine, call)
+    assert index in scans, scans
@@ -0,0 +1,77 @@
+import logging
+
+import pytest
+from redis.exceptions import ConnectionError, ResponseError
+
+from services.rate_limiter import Bucket, TokenBucketLimiter
+
+
+pytestmark = pytest.mark.anyio
+
+# Пополнение настолько медленное, что за время теста токены не появляются
+SLOW = 0.001
+
+
+async def _tokens(redis, key):
+    return float(await redis.hget(key, 'tokens'))
+
+
+async def test_denies_when_bucket_is_empty(lua_redis):
+    limiter = TokenBucketLimiter(lua_redis)
+    buckets = [Bucket('ip', 'rl:ip', 2, SLOW), Bucket('account', 'rl:account', 5, SLOW)]
+
+    assert (await limiter.acquire(buckets)).allowed
+    assert (await limiter.acquire(buckets)).allowed
+    result = await limiter.acquire(buckets)
+
+    assert not result.allowed
+    assert result.scope == 'ip'
+    assert result.retry_after > 0
+    assert await _tokens(lua_redis, 'rl:ip') < 1
+    # Отклоненная попытка не списывается ни из одной корзины
+    assert await _tokens(lua_redis, 'rl:account') == pytest.approx(3, abs=0.01)
+
+
+async def test_denial_reports_first_empty_bucket(lua_redis):
+    limiter = TokenBucketLimiter(lua_redis)
+    buckets = [Bucket('ip', 'rl:ip', 5, SLOW), Bucket('account', 'rl:account', 1, SLOW)]
+
+    assert (await limiter.acquire(buckets)).allowed
+    result = await limiter.acquire(buckets)
+
+    assert not result.allowed
+    assert result.scope == 'account'
+    assert await _tokens(lua_redis, 'rl:ip') == pytest.approx(4, abs=0.01)
+
+
+async def test_bucket_keys_expire(lua_redis):
+    limiter = TokenBucketLimiter(lua_redis)
+
+    await limiter.acquire([Bucket('ip', 'rl:ip', 10, 1)])
+
+    assert 0 < await lua_redis.ttl('rl:ip') <= 10
+
+
+async def test_script_error_is_raised_and_logged(lua_redis, caplog):
+    limiter = TokenBucketLimiter(lua_redis)
+    await lua_redis.set('rl:ip', 'not a hash')
+
+    with caplog.at_level(logging.ERROR, logger='rate_limiter'):
+        with pytest.raises(ResponseError):
+            await limiter.acquire([Bucket('ip', 'rl:ip', 5, SLOW)])
+
+    assert any(record.levelno == logging.ERROR for record in caplog.records)
+
+
+async def test_unavailable_redis_fails_open():
+    class UnavailableRedis:
+        def register_script(self, script):
+            async def call(keys, args):
+                raise ConnectionError("Connection refused")
+            return call
+
+    limiter = TokenBucketLimiter(UnavailableRedis())
+
+    result = await limiter.acquire([Bucket('ip', 'rl:ip', 1, SLOW)])
+
+    assert result.allowed
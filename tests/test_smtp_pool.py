@@ -0,0 +1,151 @@
+import asyncio
+import socket
+from email.message import EmailMessage
+
+import pytest
+
+pytest.importorskip('aiosmtplib')
+controller_module = pytest.importorskip('aiosmtpd.controller')
+
+from services.smtp_pool import DISCONNECT_ERRORS, SEND_TIMEOUT_ERRORS, SMTPConnectionPool
+
+
+pytestmark = pytest.mark.anyio
+
+
+class RecordingHandler:
+    """
+    Запоминает письма и соединения, по которым они пришли. Может разорвать
+    соединение на следующей команде MAIL, как сервер, закрывший его сам
+    """
+    def __init__(self):
+        self.messages = []
+        self.peers = []
+        self.servers = []
+        self.drop_next_mail = False
+
+    async def handle_MAIL(self, server, session, envelope, address, mail_options):
+        if server not in self.servers:
+            self.servers.append(server)
+        if self.drop_next_mail:
+            self.drop_next_mail = False
+            server.transport.close()
+        envelope.mail_from = address
+        envelope.mail_options.extend(mail_options)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope.content)
+        self.peers.append(session.peer)
+        return '250 Message accepted for delivery'
+
+    def drop_connections(self, loop):
+        # Сервер работает в цикле событий своего потока
+        for server in self.servers:
+            loop.call_soon_threadsafe(server.transport.close)
+        self.servers = []
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = controller_module.Controller(handler, hostname='127.0.0.1', port=_free_port())
+    controller.start()
+    yield controller, handler
+    controller.stop()
+
+
+@pytest.fixture
+async def pool(smtp_server):
+    controller, _ = smtp_server
+    pool = SMTPConnectionPool(controller.hostname, controller.port, None, None,
+                              size=1, timeout=5, idle_timeout=60, start_tls=False)
+    yield pool
+    await pool.close()
+
+
+def _message(number: int) -> EmailMessage:
+    message = EmailMessage()
+    message['From'] = 'noreply@ashleyvpn.com'
+    message['To'] = 'user@example.com'
+    message['Subject'] = f'Message {number}'
+    message.set_content('body')
+    return message
+
+
+async def test_connection_is_reused(pool, smtp_server):
+    _, handler = smtp_server
+    for number in range(3):
+        await pool.send(_message(number))
+
+    assert len(handler.messages) == 3
+    assert len(set(handler.peers)) == 1
+
+
+async def test_reconnects_after_server_drops_idle_connection(pool, smtp_server):
+    controller, handler = smtp_server
+    await pool.send(_message(1))
+    handler.drop_connections(controller.loop)
+    await asyncio.sleep(0.1)
+
+    await pool.send(_message(2))
+
+    assert len(handler.messages) == 2
+    assert len(set(handler.peers)) == 2
+
+
+async def test_retries_once_when_connection_drops_during_send(pool, smtp_server):
+    _, handler = smtp_server
+    await pool.send(_message(1))
+    handler.drop_next_mail = True
+
+    await pool.send(_message(2))
+
+    assert len(handler.messages) == 2
+    assert len(set(handler.peers)) == 2
+
+
+async def test_gives_up_after_second_disconnect(pool, smtp_server, monkeypatch):
+    _, handler = smtp_server
+    calls = []
+
+    async def handle_MAIL(server, session, envelope, address, mail_options):
+        calls.append(address)
+        server.transport.close()
+        return '250 OK'
+
+    monkeypatch.setattr(handler, 'handle_MAIL', handle_MAIL)
+
+    with pytest.raises(DISCONNECT_ERRORS):
+        await pool.send(_message(1))
+
+    assert len(calls) == 2
+    assert handler.messages == []
+
+
+async def test_timeout_during_send_is_not_retried(smtp_server, monkeypatch):
+    controller, handler = smtp_server
+    calls = []
+
+    async def handle_DATA(server, session, envelope):
+        # Письмо получено, но ответ не успевает до таймаута клиента
+        calls.append(envelope.content)
+        await asyncio.sleep(1)
+        return '250 Message accepted for delivery'
+
+    monkeypatch.setattr(handler, 'handle_DATA', handle_DATA)
+    pool = SMTPConnectionPool(controller.hostname, controller.port, None, None,
+                              size=1, timeout=0.3, idle_timeout=60, start_tls=False)
+    try:
+        with pytest.raises(SEND_TIMEOUT_ERRORS):
+            await pool.send(_message(1))
+    finally:
+        await pool.close()
+
+    assert len(calls) == 1
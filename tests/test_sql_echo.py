@@ -0,0 +1,30 @@
+import logging
+
+import pytest
+from sqlalchemy import text
+
+from database import _attach_sampled_echo, sql_logger
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def clean_sql_logger():
+    level, handlers = sql_logger.level, list(sql_logger.handlers)
+    sql_logger.setLevel(logging.NOTSET)
+    sql_logger.handlers.clear()
+    yield
+    sql_logger.setLevel(level)
+    sql_logger.handlers[:] = handlers
+
+
+async def test_sampled_echo_prints_without_logging_config(sqlite_engine, clean_sql_logger, capsys):
+    _attach_sampled_echo(sqlite_engine, sample_rate=1)
+    _attach_sampled_echo(sqlite_engine, sample_rate=0)
+
+    async with sqlite_engine.connect() as connection:
+        await connection.execute(text("SELECT 42"))
+
+    assert len(sql_logger.handlers) == 1
+    assert "SELECT 42" in capsys.readouterr().out
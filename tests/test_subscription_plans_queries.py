@@ -0,0 +1,58 @@
+import uuid
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from models.subscription_plans import (
+    BillingInterval, Currency, Price, Quota, ResourceType, SubscriptionPlan,
+)
+from repositories.subscription_plans_repository import SubscriptionPlanRepository
+
+
+pytestmark = pytest.mark.anyio
+
+
+@contextmanager
+def count_statements(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+
+
+async def _add_plans(session_factory, count: int):
+    async with session_factory() as session:
+        for number in range(count):
+            plan = SubscriptionPlan(id=uuid.uuid4(), name=f'Plan {number}', transfer_plan_id=uuid.uuid4())
+            session.add(plan)
+            session.add_all([
+                Quota(subscription_plan_id=plan.id, resource_type=ResourceType.LOCATIONS_COUNT, limit=3),
+                Quota(subscription_plan_id=plan.id, resource_type=ResourceType.PROTOCOLS_COUNT, limit=1),
+                Price(subscription_plan_id=plan.id, amount=199, currency=Currency.RUB, interval=BillingInterval.MONTH),
+                Price(subscription_plan_id=plan.id, amount=999, currency=Currency.RUB, interval=BillingInterval.YEAR),
+            ])
+        await session.commit()
+
+
+async def _load_catalog(session_factory, engine) -> int:
+    async with session_factory() as session:
+        with count_statements(engine) as statements:
+            plans = await SubscriptionPlanRepository(session).get_all_subscription_plans_with_catalog()
+            # Отношения уже загружены: обращение к ним не выполняет запросов
+            assert all(len(plan.quotas) == 2 and len(plan.prices) == 2 for plan in plans)
+    return len(statements)
+
+
+@pytest.mark.parametrize('plans', [1, 25])
+async def test_catalog_loads_in_constant_queries(sqlite_engine, sqlite_session_factory, plans):
+    await _add_plans(sqlite_session_factory, plans)
+
+    # Планы, квоты и цены — по одному запросу
+    assert await _load_catalog(sqlite_session_factory, sqlite_engine) == 3
@@ -0,0 +1,99 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+import database
+from database import UnitOfWork
+from models.subscriptions import Subscription, SubscriptionStatus
+from repositories import subscriptions_repository
+from repositories.subscriptions_repository import SubscriptionRepository
+
+
+pytestmark = pytest.mark.anyio
+
+
+def _subscription(customer_id, ends_at) -> Subscription:
+    return Subscription(
+        id=uuid.uuid4(),
+        customer_id=customer_id,
+        plan_id=uuid.uuid4(),
+        invoice_id=uuid.uuid4(),
+        starts_at=datetime.utcnow(),
+        ends_at=ends_at,
+        renewed_subscription_id=uuid.uuid4(),
+        downgraded_to_plan_id=uuid.uuid4(),
+        upgraded_to_plan_id=uuid.uuid4(),
+        status=SubscriptionStatus.ACTIVE,
+    )
+
+
+@pytest.fixture
+async def stale_cache(sqlite_session_factory, fake_redis, monkeypatch):
+    """
+    В базе подписка уже продлена, а в кэше осталась прежняя копия
+    """
+    monkeypatch.setattr(subscriptions_repository, 'redis_client', fake_redis)
+    customer_id = uuid.uuid4()
+    subscription = _subscription(customer_id, datetime.utcnow() + timedelta(days=60))
+    async with sqlite_session_factory() as session:
+        session.add(subscription)
+        await session.commit()
+
+    stale = _subscription(customer_id, datetime.utcnow() + timedelta(days=30))
+    stale.id = subscription.id
+    await fake_redis.set(subscriptions_repository._cache_key(customer_id),
+                         subscriptions_repository._dump_subscription(stale))
+    return subscription
+
+
+async def test_read_only_path_uses_cache(sqlite_session_factory, stale_cache):
+    async with sqlite_session_factory() as session:
+        subscription = await SubscriptionRepository(session).get_active_subscription_for_user(stale_cache.customer_id)
+
+    assert subscription.ends_at < stale_cache.ends_at
+
+
+async def test_unit_of_work_reads_bypass_cache(sqlite_session_factory, stale_cache):
+    async with sqlite_session_factory() as session:
+        async with UnitOfWork(session):
+            subscription = await SubscriptionRepository(session).get_active_subscription_for_user(stale_cache.customer_id)
+
+    assert subscription.ends_at.replace(tzinfo=None) == stale_cache.ends_at
+
+
+async def test_for_update_bypasses_cache(sqlite_session_factory, stale_cache):
+    async with sqlite_session_factory() as session:
+        subscription = await SubscriptionRepository(session).get_active_subscription_for_user(
+            stale_cache.customer_id, for_update=True)
+
+    assert subscription.ends_at.replace(tzinfo=None) == stale_cache.ends_at
+
+
+async def test_refill_reads_primary_without_pinning_session(sqlite_engine, sqlite_replica_engine,
+                                                             fake_redis, monkeypatch):
+    monkeypatch.setattr(subscriptions_repository, 'redis_client', fake_redis)
+    monkeypatch.setattr(database, 'engine', sqlite_engine)
+    monkeypatch.setattr(database, 'replica_engine', sqlite_replica_engine)
+    monkeypatch.setattr(database.replica_monitor, 'is_healthy', lambda: True)
+    session_factory = sessionmaker(class_=AsyncSession, sync_session_class=database.RoutingSession,
+                                   expire_on_commit=False)
+
+    # Реплика отстает: подписки в ней еще нет
+    subscription = _subscription(uuid.uuid4(), datetime.utcnow() + timedelta(days=10))
+    async with session_factory() as session:
+        session.add(subscription)
+        await session.commit()
+
+    async with session_factory() as session:
+        repository = SubscriptionRepository(session)
+        refilled = await repository.get_active_subscription_for_user(subscription.customer_id)
+        assert refilled.id == subscription.id
+        # Следующие чтения сессии по-прежнему идут на реплику
+        assert not session.info.get("use_primary")
+        assert await repository.get_subscription(subscription.id) is None
+
+    cached = fake_redis.data[subscriptions_repository._cache_key(subscription.customer_id)]
+    assert subscriptions_repository._load_subscription(cached).id == subscription.id
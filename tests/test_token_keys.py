@@ -0,0 +1,77 @@
+import json
+import logging
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip('cryptography')
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import JWTError, jwt
+
+from services.token_keys import TokenKeyring
+
+
+def _write_key(keys_dir, kid: str, algorithm: str):
+    if algorithm == 'ES256':
+        key = ec.generate_private_key(ec.SECP256R1())
+    else:
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption())
+    (keys_dir / f'{kid}.pem').write_bytes(pem)
+
+
+def _claims() -> dict:
+    return {'sub': 'user-1', 'type': 'access', 'exp': datetime.utcnow() + timedelta(minutes=5)}
+
+
+@pytest.mark.parametrize('algorithm', ['ES256', 'RS256'])
+def test_round_trip_with_parsed_keys(tmp_path, algorithm):
+    _write_key(tmp_path, 'k1', algorithm)
+    keyring = TokenKeyring(algorithm, keys_dir=str(tmp_path), active_kid='k1',
+                           secret_key='secret', accept_legacy=False)
+
+    token = keyring.sign(_claims())
+
+    assert jwt.get_unverified_header(token)['kid'] == 'k1'
+    assert keyring.decode(token)['sub'] == 'user-1'
+    assert [key['kid'] for key in json.loads(keyring.jwks_json)['keys']] == ['k1']
+
+
+def test_rotated_key_still_verifies(tmp_path):
+    _write_key(tmp_path, 'old', 'ES256')
+    old_token = TokenKeyring('ES256', keys_dir=str(tmp_path), active_kid='old').sign(_claims())
+    _write_key(tmp_path, 'new', 'ES256')
+
+    keyring = TokenKeyring('ES256', keys_dir=str(tmp_path), active_kid='new', accept_legacy=False)
+
+    assert keyring.decode(old_token)['sub'] == 'user-1'
+    assert jwt.get_unverified_header(keyring.sign(_claims()))['kid'] == 'new'
+
+
+def test_legacy_tokens_follow_accept_legacy(tmp_path):
+    _write_key(tmp_path, 'k1', 'ES256')
+    legacy_token = jwt.encode(_claims(), 'secret', algorithm='HS256')
+
+    accepting = TokenKeyring('ES256', keys_dir=str(tmp_path), active_kid='k1',
+                             secret_key='secret', accept_legacy=True)
+    rejecting = TokenKeyring('ES256', keys_dir=str(tmp_path), active_kid='k1',
+                             secret_key='secret', accept_legacy=False)
+
+    assert accepting.decode(legacy_token)['sub'] == 'user-1'
+    with pytest.raises(JWTError):
+        rejecting.decode(legacy_token)
+
+
+def test_legacy_acceptance_is_opt_in_and_warned(tmp_path, caplog):
+    _write_key(tmp_path, 'k1', 'ES256')
+
+    with caplog.at_level(logging.WARNING, logger='token_keys'):
+        TokenKeyring('ES256', keys_dir=str(tmp_path), active_kid='k1', secret_key='secret')
+        assert not caplog.records
+        TokenKeyring('ES256', keys_dir=str(tmp_path), active_kid='k1',
+                     secret_key='secret', accept_legacy=True)
+
+    assert [record.levelno for record in caplog.records] == [logging.WARNING]
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+from redis.exceptions import ConnectionError
+
+from config import AuthConfig
+from services.token_revocation import TokenRevocationStore, REVOKED_INDEX_KEY
+
+
+pytestmark = pytest.mark.anyio
+
+
+class FlakyRedis:
+    """
+    Индекс отозванных семейств, чтение которого первые failures раз падает
+    """
+    def __init__(self, families, failures: int = 0):
+        self.families = families
+        self.failures = failures
+        self.reads = 0
+
+    def register_script(self, script):
+        return None
+
+    async def zremrangebyscore(self, key, low, high):
+        return 0
+
+    async def zrangebyscore(self, key, low, high):
+        assert key == REVOKED_INDEX_KEY
+        self.reads += 1
+        if self.reads <= self.failures:
+            raise ConnectionError("Connection refused")
+        return self.families
+
+
+async def _run_until(store: TokenRevocationStore, condition):
+    task = asyncio.create_task(store.run())
+    try:
+        for _ in range(200):
+            if condition():
+                return
+            await asyncio.sleep(0.01)
+        pytest.fail("condition not reached")
+    finally:
+        task.cancel()
+
+
+async def test_rebuild_reports_failure():
+    store = TokenRevocationStore(FlakyRedis(['family'], failures=1))
+
+    assert not await store.rebuild()
+    assert 'family' not in store._filter
+    assert await store.rebuild()
+    assert 'family' in store._filter
+
+
+async def test_failed_rebuild_is_retried_before_interval(monkeypatch):
+    monkeypatch.setattr(AuthConfig, 'REVOCATION_REBUILD_INTERVAL', 3600)
+    monkeypatch.setattr(AuthConfig, 'REVOCATION_RETRY_DELAY', 0.01)
+    redis = FlakyRedis(['family'], failures=2)
+    store = TokenRevocationStore(redis)
+    store.request_rebuild()
+
+    await _run_until(store, lambda: 'family' in store._filter)
+    assert redis.reads == 3
+
+
+async def test_requested_rebuild_runs_without_waiting_for_interval(monkeypatch):
+    monkeypatch.setattr(AuthConfig, 'REVOCATION_REBUILD_INTERVAL', 3600)
+    store = TokenRevocationStore(FlakyRedis(['family']))
+    # Так реагирует подписчик события переподключения к каналу
+    store.request_rebuild()
+
+    await _run_until(store, lambda: 'family' in store._filter)
@@ -0,0 +1,44 @@
+import pytest
+
+from database import UnitOfWork
+from models.users import User
+from repositories import users_repository
+from repositories.users_repository import UserRepository, TELEGRAM_USER_KEY
+from services import entitlement_service
+from services.entitlement_service import EntitlementService
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def cached_user(sqlite_session_factory, fake_redis, monkeypatch):
+    monkeypatch.setattr(users_repository, 'redis_client', fake_redis)
+    monkeypatch.setattr(entitlement_service, 'redis_client', fake_redis)
+    user = User(username='bob', email='bob@example.com', telegram_id=1001)
+    async with sqlite_session_factory() as session:
+        session.add(user)
+        await session.commit()
+        assert await EntitlementService(session).resolve_user_id(1001) == str(user.id)
+    assert TELEGRAM_USER_KEY.format(telegram_id=1001) in fake_redis.data
+    return user
+
+
+async def test_rebinding_telegram_id_drops_both_keys(sqlite_session_factory, fake_redis, cached_user):
+    await fake_redis.set(TELEGRAM_USER_KEY.format(telegram_id=2002), 'someone-else')
+
+    async with sqlite_session_factory() as session:
+        async with UnitOfWork(session):
+            await UserRepository(session).update_user(cached_user.id, telegram_id=2002)
+            # Кэш, заполненный до фиксации, сбросится еще раз после нее
+            await fake_redis.set(TELEGRAM_USER_KEY.format(telegram_id=1001), str(cached_user.id))
+
+    assert fake_redis.data == {}
+
+
+async def test_delete_drops_key(sqlite_session_factory, fake_redis, cached_user):
+    async with sqlite_session_factory() as session:
+        assert await UserRepository(session).delete_user(cached_user.id)
+
+        assert fake_redis.data == {}
+        assert await EntitlementService(session).resolve_user_id(1001) is None
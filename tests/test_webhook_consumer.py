@@ -0,0 +1,167 @@
+import contextlib
+import json
+
+import pytest
+from fastapi import HTTPException
+
+import workers.webhook_consumer as consumer
+from config import WebhookStreamConfig
+
+
+pytestmark = pytest.mark.anyio
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def xadd(self, stream, fields):
+        self.commands.append(lambda: self.redis.xadd(stream, fields))
+
+    def xack(self, stream, group, message_id):
+        self.commands.append(lambda: self.redis.xack(stream, group, message_id))
+
+    async def execute(self):
+        return [await command() for command in self.commands]
+
+
+class FakeStreamRedis:
+    """
+    Подмножество команд потоков Redis, которыми пользуется обработчик webhook.
+    claims — ответы XAUTOCLAIM по порядку, deliveries — число доставок
+    ожидающих событий
+    """
+    def __init__(self, claims=(), deliveries=None):
+        self.claims = list(claims)
+        self.deliveries = deliveries or {}
+        self.acked = []
+        self.streams = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def xadd(self, stream, fields):
+        self.streams.setdefault(stream, []).append(fields)
+
+    async def xack(self, stream, group, message_id):
+        assert (stream, group) == (WebhookStreamConfig.STREAM, WebhookStreamConfig.GROUP)
+        self.acked.append(message_id)
+        return 1
+
+    async def xpending_range(self, stream, group, min, max, count):
+        assert min == max
+        if min not in self.deliveries:
+            return []
+        return [{'message_id': min, 'times_delivered': self.deliveries[min]}]
+
+    async def xautoclaim(self, stream, group, consumer, min_idle_time, start_id, count):
+        return self.claims.pop(0)
+
+    @property
+    def dead_letters(self):
+        return self.streams.get(WebhookStreamConfig.DEAD_LETTER_STREAM, [])
+
+
+class FakeYookassaService:
+    """
+    Обработка события по его содержимому: status_code — HTTPException
+    с этим кодом, crash — непредвиденная ошибка
+    """
+    processed = []
+
+    def __init__(self, session):
+        pass
+
+    async def process_webhook(self, event):
+        if 'status_code' in event:
+            raise HTTPException(status_code=event['status_code'], detail=f"status {event['status_code']}")
+        if event.get('crash'):
+            raise RuntimeError("database is unavailable")
+        self.processed.append(event['id'])
+
+
+@pytest.fixture(autouse=True)
+def yookassa(monkeypatch):
+    FakeYookassaService.processed = []
+    monkeypatch.setattr(consumer, 'YookassaService', FakeYookassaService)
+    monkeypatch.setattr(consumer, 'async_session', contextlib.nullcontext)
+    return FakeYookassaService
+
+
+def _fields(**event):
+    return {'data': json.dumps(event)}
+
+
+async def test_processed_event_is_acked(yookassa):
+    redis = FakeStreamRedis()
+
+    await consumer.handle(redis, '1-0', _fields(id='payment'))
+
+    assert yookassa.processed == ['payment']
+    assert redis.acked == ['1-0']
+    assert redis.dead_letters == []
+
+
+@pytest.mark.parametrize('event', [{'id': 'payment', 'status_code': 404},
+                                   {'id': 'payment', 'status_code': 503},
+                                   {'id': 'payment', 'crash': True}])
+async def test_failed_event_stays_pending(event):
+    redis = FakeStreamRedis()
+
+    await consumer.handle(redis, '1-0', _fields(**event))
+
+    assert redis.acked == []
+    assert redis.dead_letters == []
+
+
+@pytest.mark.parametrize('fields, reason', [
+    (_fields(id='payment', status_code=422), 'status 422'),
+    ({'data': 'not json'}, 'Некорректное событие'),
+    ({}, 'Некорректное событие'),
+])
+async def test_unprocessable_event_is_dead_lettered(fields, reason):
+    redis = FakeStreamRedis()
+
+    await consumer.handle(redis, '1-0', fields)
+
+    assert redis.acked == ['1-0']
+    [dead] = redis.dead_letters
+    assert dead['source_id'] == '1-0'
+    assert reason in dead['error']
+    assert dead.get('data') == fields.get('data')
+
+
+async def test_reclaim_handles_retries_and_dead_letters(monkeypatch, yookassa):
+    monkeypatch.setattr(WebhookStreamConfig, 'MAX_DELIVERIES', 3)
+    redis = FakeStreamRedis(
+        claims=[
+            ['3-0', [('1-0', _fields(id='retried')), ('2-0', _fields(id='exhausted'))], []],
+            ['0-0', [('3-0', _fields(id='still-missing', status_code=404))], []],
+        ],
+        deliveries={'1-0': 2, '2-0': 4, '3-0': 2},
+    )
+
+    await consumer.reclaim(redis, 'consumer')
+
+    assert yookassa.processed == ['retried']
+    assert redis.acked == ['1-0', '2-0']
+    assert [dead['source_id'] for dead in redis.dead_letters] == ['2-0']
+    assert redis.claims == []
+
+
+async def test_reclaim_acks_trimmed_entries(yookassa):
+    # Redis 6.2 возвращает записи, удаленные обрезкой потока, без полей
+    redis = FakeStreamRedis(claims=[['0-0', [('1-0', None), ('2-0', {})], []]])
+
+    await consumer.reclaim(redis, 'consumer')
+
+    assert redis.acked == ['1-0', '2-0']
+    assert yookassa.processed == []
+    assert redis.dead_letters == []
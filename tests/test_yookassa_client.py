@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+httpx = pytest.importorskip('httpx')
+
+from fastapi import HTTPException
+
+from services.yookassa_client import AsyncYookassaClient, YookassaError
+from services.yookassa_service import YookassaService
+
+
+pytestmark = pytest.mark.anyio
+
+PAYMENT = {
+    'id': 'payment-1',
+    'status': 'pending',
+    'confirmation': {'confirmation_url': 'https://yookassa.example/confirm'},
+}
+
+
+class FakeYookassa:
+    """
+    Отдает заранее заданные ответы по очереди и запоминает запросы
+    """
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def _client(server: FakeYookassa, **kwargs) -> AsyncYookassaClient:
+    kwargs.setdefault('retry_delay', 0)
+    return AsyncYookassaClient('shop', 'secret', base_url='https://yookassa.test/v3',
+                               transport=httpx.MockTransport(server), **kwargs)
+
+
+async def test_retries_reuse_idempotence_key():
+    server = FakeYookassa(
+        httpx.ConnectError("connection refused"),
+        httpx.Response(503, json={'type': 'error'}),
+        httpx.Response(202, json={'retry_after': 0}),
+        httpx.Response(200, json=PAYMENT),
+    )
+    client = _client(server, retries=3)
+
+    assert await client.create_payment({'amount': {}}, 'key-1') == PAYMENT
+    assert [request.headers['Idempotence-Key'] for request in server.requests] == ['key-1'] * 4
+    await client.close()
+
+
+async def test_total_timeout_stops_retries():
+    server = FakeYookassa(httpx.Response(503, json={'type': 'error'}))
+    client = _client(server, retries=3, retry_delay=10, total_timeout=0.5)
+
+    started = time.monotonic()
+    with pytest.raises(YookassaError) as error:
+        await client.create_payment({'amount': {}}, 'key-1')
+
+    assert error.value.status_code == 503
+    assert len(server.requests) == 1
+    assert time.monotonic() - started < 0.5
+    await client.close()
+
+
+@pytest.mark.parametrize('response, status_code', [
+    (httpx.Response(400, json={'type': 'error', 'description': 'invalid_request'}), 400),
+    (httpx.Response(401, json={'type': 'error', 'description': 'invalid_credentials'}), 400),
+    (httpx.Response(500, json={'type': 'error'}), 503),
+    (httpx.ConnectError("connection refused"), 503),
+])
+async def test_create_payment_maps_errors(response, status_code):
+    client = _client(FakeYookassa(response), retries=1)
+    # До сохранения платежа дело не доходит: сессия не нужна
+    service = YookassaService(None, client=client)
+
+    with pytest.raises(HTTPException) as error:
+        await service.create_payment('user-1', 100, 'RUB', 'plan-1', 'VPN', 'https://ashleyvpn.com')
+
+    assert error.value.status_code == status_code
+    await client.close()
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
+from config import EmailOutboxConfig
+from database import async_session, use_primary, UnitOfWork
+from dependencies import redis_client
+from metrics import registry
+from repositories.email_outbox_repository import EmailOutboxRepository
+from services.email_outbox_service import EMAIL_VERIFICATION
+from services.email_service import email_service
+
+
+logger = logging.getLogger("workers.email_outbox")
+
+METRICS_SOURCE = 'email_outbox'
+
+sent_total = registry.counter(
+    'email_outbox_sent_total', 'Отправленные письма')
+failed_total = registry.counter(
+    'email_outbox_failed_total', 'Неудачные попытки отправки (final="true" — попытки исчерпаны)')
+errors_total = registry.counter(
+    'email_outbox_errors_total', 'Ошибки прохода воркера')
+queue_depth = registry.gauge(
+    'email_outbox_queue_depth', 'Неотправленные письма')
+oldest_pending_seconds = registry.gauge(
+    'email_outbox_oldest_pending_seconds', 'Возраст самого старого неотправленного письма')
+send_duration_seconds = registry.gauge(
+    'email_outbox_send_duration_seconds', 'Наибольшая длительность отправки одного письма в последнем пакете')
+delivery_lag_seconds = registry.gauge(
+    'email_outbox_delivery_lag_seconds', 'Наибольшее время от постановки в очередь до отправки в последнем пакете')
+
+
+class UndeliverableEmail(Exception):
+    """
+    Письмо не будет отправлено ни одной попыткой: повторять бессмысленно
+    """
+
+
+class SendError(NamedTuple):
+    message: str
+    # Попытки не повторяются независимо от их числа
+    final: bool = False
+
+
+async def _deliver(email) -> None:
+    if email.kind == EMAIL_VERIFICATION:
+        await email_service.deliver_verification_email(email.payload['user_id'], email.recipient)
+    else:
+        raise UndeliverableEmail(f"Unknown email kind: {email.kind}")
+
+
+async def _send(email) -> Optional[SendError]:
+    """
+    Отправляет письмо, возвращает ошибку или None
+    """
+    started = time.monotonic()
+    try:
+        await _deliver(email)
+        return None
+    except UndeliverableEmail as e:
+        return SendError(f"{type(e).__name__}: {e}", final=True)
+    except Exception as e:
+        return SendError(f"{type(e).__name__}: {e}")
+    finally:
+        send_duration_seconds.set(max(send_duration_seconds.value(), time.monotonic() - started))
+
+
+def retry_delay(attempts: int) -> Optional[float]:
+    """
+    Задержка перед следующей попыткой или None, если попытки исчерпаны
+    """
+    if attempts >= EmailOutboxConfig.MAX_ATTEMPTS:
+        return None
+    delay = min(EmailOutboxConfig.BACKOFF_BASE * 2 ** (attempts - 1), EmailOutboxConfig.BACKOFF_MAX)
+    # Разброс, чтобы письма, упавшие вместе, не повторялись одновременно
+    return delay * random.uniform(0.8, 1.2)
+
+
+async def deliver_batch(batch_size: int) -> int:
+    """
+    Берет в работу пакет писем, отправляет их и записывает результат
+    """
+    async with async_session() as session:
+        use_primary(session)
+        emails = await EmailOutboxRepository(session).claim_due(batch_size, EmailOutboxConfig.LEASE_SECONDS)
+        await session.commit()
+    if not emails:
+        return 0
+
+    # Параллельность ограничивает пул SMTP соединений
+    send_duration_seconds.set(0)
+    errors = await asyncio.gather(*(_send(email) for email in emails))
+
+    sent = [email for email, error in zip(emails, errors) if error is None]
+    async with async_session() as session:
+        repository = EmailOutboxRepository(session)
+        async with UnitOfWork(session):
+            await repository.mark_sent([email.id for email in sent])
+            for email, error in zip(emails, errors):
+                if error is None:
+                    continue
+                delay = None if error.final else retry_delay(email.attempts)
+                await repository.mark_failed(email.id, error.message, delay)
+                failed_total.inc(final=str(delay is None).lower())
+                logger.warning("Письмо %s (%s) не отправлено, попытка %s: %s",
+                               email.id, email.kind, email.attempts, error.message)
+
+    sent_total.inc(len(sent))
+    if sent:
+        now = datetime.now(timezone.utc)
+        delivery_lag_seconds.set(max((now - email.created_at).total_seconds() for email in sent))
+    return len(emails)
+
+
+async def update_queue_stats():
+    async with async_session() as session:
+        use_primary(session)
+        stats = await EmailOutboxRepository(session).get_queue_stats()
+    queue_depth.set(stats.pending)
+    oldest_pending_seconds.set(float(stats.oldest_age))
+
+
+async def run():
+    while True:
+        processed = 0
+        try:
+            processed = await deliver_batch(EmailOutboxConfig.BATCH_SIZE)
+            await update_queue_stats()
+        except Exception:
+            errors_total.inc()
+            logger.exception("Ошибка при отправке писем из outbox")
+
+        await registry.publish(redis_client, METRICS_SOURCE)
+        # Полный пакет: в очереди могут быть еще письма
+        if processed < EmailOutboxConfig.BATCH_SIZE:
+            await asyncio.sleep(EmailOutboxConfig.POLL_INTERVAL)
+
+
+async def main():
+    try:
+        await run()
+    finally:
+        await email_service.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
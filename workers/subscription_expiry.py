@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import time
+
+from redis.exceptions import RedisError
+
+from config import SubscriptionExpiryConfig, RedisEventsConfig
+from database import async_session, use_primary
+from dependencies import emiter, redis_client
+from metrics import registry
+from repositories.subscriptions_repository import SubscriptionRepository, invalidate_active_subscription
+
+
+logger = logging.getLogger("workers.subscription_expiry")
+
+SUBSCRIPTION_EXPIRED_EVENT = 'subscription_expired'
+METRICS_SOURCE = 'subscription_expiry'
+
+expired_total = registry.counter(
+    'subscription_expiry_expired_total', 'Подписки, переведенные в EXPIRED')
+batches_total = registry.counter(
+    'subscription_expiry_batches_total', 'Выполненные пакеты закрытия подписок')
+errors_total = registry.counter(
+    'subscription_expiry_errors_total', 'Ошибки прохода закрытия подписок')
+lag_seconds = registry.gauge(
+    'subscription_expiry_lag_seconds', 'Сколько секунд назад истекла самая старая еще не закрытая подписка')
+batch_duration_seconds = registry.gauge(
+    'subscription_expiry_batch_duration_seconds', 'Длительность последнего пакета')
+last_run_timestamp = registry.gauge(
+    'subscription_expiry_last_run_timestamp', 'Время завершения последнего прохода')
+
+
+async def expire_batch(batch_size: int) -> int:
+    """
+    Закрывает один пакет истекших подписок, сбрасывает их кэш
+    и отправляет событие по каждой
+    """
+    started = time.monotonic()
+    async with async_session() as session:
+        use_primary(session)
+        rows = await SubscriptionRepository(session).expire_due_subscriptions(batch_size)
+        await session.commit()
+
+    for row in rows:
+        await invalidate_active_subscription(row.customer_id)
+        try:
+            await emiter.publish(RedisEventsConfig.SUBSCRIPTIONS_CHANNEL, SUBSCRIPTION_EXPIRED_EVENT, {
+                'subscription_id': str(row.id),
+                'customer_id': str(row.customer_id),
+                'plan_id': str(row.plan_id),
+                'ends_at': row.ends_at.isoformat(),
+            })
+        except RedisError as e:
+            logger.warning("Не удалось отправить событие об окончании подписки %s: %s", row.id, e)
+
+    batches_total.inc()
+    expired_total.inc(len(rows))
+    batch_duration_seconds.set(time.monotonic() - started)
+    return len(rows)
+
+
+async def sweep(batch_size: int = SubscriptionExpiryConfig.BATCH_SIZE) -> int:
+    """
+    Закрывает пакетами все подписки, срок которых уже прошел
+    """
+    total = 0
+    while True:
+        expired = await expire_batch(batch_size)
+        total += expired
+        if expired < batch_size:
+            return total
+
+
+async def update_lag():
+    async with async_session() as session:
+        use_primary(session)
+        lag_seconds.set(await SubscriptionRepository(session).get_expiry_lag())
+
+
+async def run():
+    while True:
+        try:
+            expired = await sweep()
+            if expired:
+                logger.info("Закрыто подписок: %s", expired)
+        except Exception:
+            errors_total.inc()
+            logger.exception("Ошибка при закрытии истекших подписок")
+
+        # Отдельно от закрытия: задержка должна расти и когда проход падает
+        try:
+            await update_lag()
+        except Exception:
+            errors_total.inc()
+            logger.exception("Не удалось получить задержку закрытия подписок")
+
+        last_run_timestamp.set(time.time())
+        await registry.publish(redis_client, METRICS_SOURCE)
+        await asyncio.sleep(SubscriptionExpiryConfig.INTERVAL)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run())
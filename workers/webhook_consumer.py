@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+
+from fastapi import HTTPException
+from redis.exceptions import RedisError, ResponseError
+
+from config import WebhookStreamConfig
+from database import async_session
+from dependencies import redis_client
+from metrics import registry
+from services.yookassa_service import YookassaService
+
+
+logger = logging.getLogger("workers.webhook_consumer")
+
+METRICS_SOURCE = 'webhook_consumer'
+RECONNECT_DELAY = 1
+
+processed_total = registry.counter(
+    'webhook_consumer_processed_total', 'Обработанные и подтвержденные события')
+failed_total = registry.counter(
+    'webhook_consumer_failed_total', 'Неудачные попытки обработки (событие будет повторено)')
+dead_lettered_total = registry.counter(
+    'webhook_consumer_dead_lettered_total', 'События, перенесенные в поток необработанных')
+reclaimed_total = registry.counter(
+    'webhook_consumer_reclaimed_total', 'События, забранные у зависших обработчиков')
+errors_total = registry.counter(
+    'webhook_consumer_errors_total', 'Ошибки работы с Redis')
+lag = registry.gauge(
+    'webhook_consumer_lag', 'События в потоке, еще не выданные группе')
+pending = registry.gauge(
+    'webhook_consumer_pending', 'Выданные, но не подтвержденные события')
+oldest_pending_seconds = registry.gauge(
+    'webhook_consumer_oldest_pending_seconds', 'Возраст самого старого неподтвержденного события')
+processing_duration_seconds = registry.gauge(
+    'webhook_consumer_processing_duration_seconds', 'Длительность обработки последнего события')
+
+
+def _message_age(message_id: str) -> float:
+    # id записи потока начинается со времени ее добавления в миллисекундах
+    return max(0.0, time.time() - int(message_id.split('-')[0]) / 1000)
+
+
+async def ensure_group(redis):
+    try:
+        await redis.xgroup_create(WebhookStreamConfig.STREAM, WebhookStreamConfig.GROUP, id='0', mkstream=True)
+    except ResponseError as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+
+async def dead_letter(redis, message_id: str, fields: dict, reason: str):
+    """
+    Переносит событие в поток необработанных и подтверждает его
+    """
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.xadd(WebhookStreamConfig.DEAD_LETTER_STREAM,
+                  {**(fields or {}), 'source_id': message_id, 'error': reason[:1000]})
+        pipe.xack(WebhookStreamConfig.STREAM, WebhookStreamConfig.GROUP, message_id)
+        await pipe.execute()
+    dead_lettered_total.inc()
+    logger.error("Webhook %s перенесен в %s: %s", message_id, WebhookStreamConfig.DEAD_LETTER_STREAM, reason)
+
+
+async def handle(redis, message_id: str, fields: dict):
+    """
+    Обрабатывает событие в своей сессии. Подтверждается только успешно
+    обработанное событие; при временной ошибке оно остается в списке
+    ожидающих и будет забрано повторно (доставка хотя бы один раз,
+    process_webhook идемпотентен)
+    """
+    started = time.monotonic()
+    try:
+        event = json.loads(fields['data'])
+        async with async_session() as session:
+            await YookassaService(session).process_webhook(event)
+    except (KeyError, ValueError) as e:
+        await dead_letter(redis, message_id, fields, f"Некорректное событие: {e}")
+        return
+    except HTTPException as e:
+        # 404 — платеж мог еще не попасть в базу, остальные 4xx не исправятся повтором
+        if e.status_code < 500 and e.status_code != 404:
+            await dead_letter(redis, message_id, fields, str(e.detail))
+            return
+        failed_total.inc()
+        logger.warning("Webhook %s не обработан, будет повторен: %s", message_id, e.detail)
+        return
+    except Exception:
+        failed_total.inc()
+        logger.exception("Webhook %s не обработан, будет повторен", message_id)
+        return
+    finally:
+        processing_duration_seconds.set(time.monotonic() - started)
+
+    await redis.xack(WebhookStreamConfig.STREAM, WebhookStreamConfig.GROUP, message_id)
+    processed_total.inc()
+
+
+async def _delivery_count(redis, message_id: str) -> int:
+    entries = await redis.xpending_range(WebhookStreamConfig.STREAM, WebhookStreamConfig.GROUP,
+                                         min=message_id, max=message_id, count=1)
+    return entries[0]['times_delivered'] if entries else 0
+
+
+async def reclaim(redis, consumer: str):
+    """
+    Забирает события, которые другие обработчики получили, но не подтвердили
+    за CLAIM_IDLE_MS (обработчик упал или событие не удалось обработать)
+    """
+    start_id = '0-0'
+    while True:
+        result = await redis.xautoclaim(
+            WebhookStreamConfig.STREAM, WebhookStreamConfig.GROUP, consumer,
+            min_idle_time=WebhookStreamConfig.CLAIM_IDLE_MS,
+            start_id=start_id,
+            count=WebhookStreamConfig.BATCH_SIZE,
+        )
+        start_id, messages = result[0], result[1]
+        for message_id, fields in messages:
+            if not fields:
+                # Запись уже удалена из потока обрезкой MAXLEN
+                await redis.xack(WebhookStreamConfig.STREAM, WebhookStreamConfig.GROUP, message_id)
+                continue
+
+            reclaimed_total.inc()
+            if await _delivery_count(redis, message_id) > WebhookStreamConfig.MAX_DELIVERIES:
+                await dead_letter(redis, message_id, fields, "Превышено число попыток обработки")
+                continue
+            await handle(redis, message_id, fields)
+
+        if start_id == '0-0':
+            return
+
+
+async def consume(redis, consumer: str):
+    next_claim_at = 0.0
+    while True:
+        try:
+            if time.monotonic() >= next_claim_at:
+                await reclaim(redis, consumer)
+                next_claim_at = time.monotonic() + WebhookStreamConfig.CLAIM_INTERVAL
+
+            response = await redis.xreadgroup(
+                WebhookStreamConfig.GROUP, consumer, {WebhookStreamConfig.STREAM: '>'},
+                count=WebhookStreamConfig.BATCH_SIZE,
+                block=WebhookStreamConfig.BLOCK_MS,
+            )
+            for _, messages in response or []:
+                for message_id, fields in messages:
+                    await handle(redis, message_id, fields)
+        except RedisError as e:
+            errors_total.inc()
+            logger.warning("Ошибка чтения потока webhook (%s): %s", consumer, e)
+            await asyncio.sleep(RECONNECT_DELAY)
+
+
+async def report(redis):
+    """
+    Периодически обновляет метрики группы и публикует их в Redis
+    """
+    while True:
+        try:
+            for group in await redis.xinfo_groups(WebhookStreamConfig.STREAM):
+                if group['name'] == WebhookStreamConfig.GROUP:
+                    pending.set(group['pending'])
+                    # lag есть только в Redis 7+
+                    if group.get('lag') is not None:
+                        lag.set(group['lag'])
+            summary = await redis.xpending(WebhookStreamConfig.STREAM, WebhookStreamConfig.GROUP)
+            oldest_pending_seconds.set(_message_age(summary['min']) if summary['pending'] else 0)
+        except RedisError as e:
+            errors_total.inc()
+            logger.warning("Не удалось получить состояние потока webhook: %s", e)
+
+        await registry.publish(redis, METRICS_SOURCE)
+        await asyncio.sleep(WebhookStreamConfig.METRICS_INTERVAL)
+
+
+async def run():
+    await ensure_group(redis_client)
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    await asyncio.gather(
+        report(redis_client),
+        *(consume(redis_client, f"{prefix}-{index}") for index in range(WebhookStreamConfig.CONSUMERS)),
+    )
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run())